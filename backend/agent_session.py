@@ -46,6 +46,30 @@ AGENT_TYPES = {
     "hirebot" : HirebotAgent,
 }
 
+# Telephony profile: phone audio ends up as 8 kHz G.711, so for phone calls
+# the TTS is asked for narrowband audio and the agent track is published at
+# that rate, instead of synthesising 24 kHz and resampling it back down.
+TELEPHONY_SAMPLE_RATE = int(os.getenv("TELEPHONY_TTS_SAMPLE_RATE", "16000"))
+PHONE_PARTICIPANT_SOURCES = ("exotel_bridge", "exotel_inbound_bridge")
+
+# After answer, the Exotel bridge sends "media_ready" once the caller's RTP is
+# flowing steadily, and the agent greets straight away. This is only how long
+# to wait for it before greeting anyway (and the whole wait for LiveKit SIP
+# calls, which have no such signal).
+MEDIA_READY_TIMEOUT = float(os.getenv("AGENT_MEDIA_READY_TIMEOUT", "1.0"))
+
+
+def is_telephony_job(ctx: JobContext) -> bool:
+    """Phone calls are dispatched with call_type inbound/outbound metadata
+    (see OutboundCall.make_call and handle_inbound_call), or "phone" for warm
+    rooms (services/room_pool.py), so the profile can be chosen before the
+    TTS is built — well before the participant joins."""
+    try:
+        meta = json.loads(ctx.job.metadata or "{}")
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return meta.get("call_type") in ("inbound", "outbound", "phone")
+
 
 async def vyom_demos(ctx: JobContext):
 
@@ -60,6 +84,12 @@ async def vyom_demos(ctx: JobContext):
 
     logger.info(f"Initialized {AgentClass.__name__} for room")
 
+    telephony = is_telephony_job(ctx)
+    if telephony:
+        logger.info(f"Telephony profile ON | TTS/output at {TELEPHONY_SAMPLE_RATE} Hz")
+    cartesia_rate = {"sample_rate": TELEPHONY_SAMPLE_RATE} if telephony else {}
+    sarvam_rate = {"speech_sample_rate": TELEPHONY_SAMPLE_RATE} if telephony else {}
+
 
     llm = realtime.RealtimeModel(
         model="gpt-realtime",
@@ -87,6 +117,7 @@ async def vyom_demos(ctx: JobContext):
                 model="sonic-3", 
                 voice=os.getenv("CARTESIA_VOICE_ID_HIREBOT", ""),
                 api_key=os.getenv("CARTESIA_API_KEY", ""),
+                **cartesia_rate,
                 )
         case "bandhan_banking":
             tts = sarvam.TTS(
@@ -95,6 +126,7 @@ async def vyom_demos(ctx: JobContext):
                 pace=1.1,
                 speaker=os.getenv("SARVAM_SPEAKER_BANDHAN_BANKING", ""),
                 api_key=os.getenv("SARVAM_API_KEY", ""),
+                **sarvam_rate,
                 )
         case _:
             tts = cartesia.TTS(
@@ -102,6 +134,7 @@ async def vyom_demos(ctx: JobContext):
                 speed=1.1,
                 voice=os.getenv("CARTESIA_VOICE_ID", ""),
                 api_key=os.getenv("CARTESIA_API_KEY", ""),
+                **cartesia_rate,
                 )
     
     session = AgentSession(
@@ -131,7 +164,11 @@ async def vyom_demos(ctx: JobContext):
         room_options = room_io.RoomOptions(
             text_input=False,  # Disabled: RealtimeModel handles transcription
             audio_input=True,
-            audio_output=True,
+            audio_output=(
+                room_io.AudioOutputOptions(sample_rate=TELEPHONY_SAMPLE_RATE)
+                if telephony
+                else True
+            ),
             close_on_disconnect=True,
             delete_room_on_close=True,
         )
@@ -143,6 +180,29 @@ async def vyom_demos(ctx: JobContext):
         )
         logger.info("AgentSession started successfully")
 
+        # Bridge events are listened for before the participant is awaited:
+        # an inbound call (or a warm room) can be answered moments after the
+        # bridge joins, and data messages are not replayed to late listeners.
+        call_answered = asyncio.Event()
+        media_ready = asyncio.Event()
+
+        @ctx.room.on("data_received")
+        def on_data_received(data: rtc.DataPacket):
+            if data.topic != "sip_bridge_events":
+                return
+            try:
+                msg = json.loads(data.data.decode())
+            except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
+                return
+            event = msg.get("event")
+            if event == "call_answered":
+                logger.info("Exotel bridge reported call answered (SIP 200 OK)")
+                call_answered.set()
+            elif event == "media_ready":
+                logger.info(f"Exotel bridge reported caller audio flowing: {msg}")
+                call_answered.set()
+                media_ready.set()
+
         # WAIT for participant
         logger.info("Waiting for participant...")
         participant = await ctx.wait_for_participant()
@@ -151,40 +211,36 @@ async def vyom_demos(ctx: JobContext):
 
         # Also detect Exotel bridge participants (they join as regular WebRTC
         # participants with metadata containing "source": "exotel_bridge")
-        is_exotel_bridge = False
+        is_bridge_participant = False
         if participant.metadata:
             try:
                 meta = json.loads(participant.metadata)
-                is_exotel_bridge = meta.get("source") == "exotel_bridge"
+                is_bridge_participant = meta.get("source") in PHONE_PARTICIPANT_SOURCES
             except (json.JSONDecodeError, TypeError):
                 pass
 
-        is_phone_call = is_sip or is_exotel_bridge
+        is_phone_call = is_sip or is_bridge_participant
         logger.info(
             f"Participant joined: {participant.identity}, "
             f"kind={participant.kind}, is_sip={is_sip}, "
-            f"is_exotel_bridge={is_exotel_bridge}"
+            f"is_bridge_participant={is_bridge_participant}"
         )
+        if telephony != is_phone_call:
+            logger.warning(
+                f"Telephony profile={telephony} but participant "
+                f"is_phone_call={is_phone_call} — dispatch metadata is missing call_type?"
+            )
 
-        audio_ready = asyncio.Event()
-
-        if is_exotel_bridge:
+        if is_bridge_participant:
             # For Exotel bridge: wait for the actual "call_answered" data message
             # from the SIP bridge (sent only after SIP 200 OK - phone picked up).
             # The bridge publishes its audio track IMMEDIATELY on joining,
             # which is BEFORE the phone even rings, so track_published is unreliable.
-            @ctx.room.on("data_received")
-            def on_data_received(data: rtc.DataPacket):
-                if data.topic == "sip_bridge_events":
-                    try:
-                        msg = json.loads(data.data.decode())
-                        if msg.get("event") == "call_answered":
-                            logger.info("Exotel bridge reported call answered (SIP 200 OK)")
-                            audio_ready.set()
-                    except (json.JSONDecodeError, TypeError):
-                        pass
+            audio_ready = call_answered
         else:
             # For standard SIP calls: use the track_published approach
+            audio_ready = asyncio.Event()
+
             @ctx.room.on("track_published")
             def on_track_published(publication: rtc.RemoteTrackPublication, p: rtc.RemoteParticipant):
                 if p.identity == participant.identity and publication.kind == rtc.TrackKind.KIND_AUDIO:
@@ -207,8 +263,12 @@ async def vyom_demos(ctx: JobContext):
                 except asyncio.TimeoutError:
                     logger.error("Timed out waiting for call to be answered (60s)")
                     return
-                # Buffer for RTP stabilization - longer delay ensures welcome message is heard
-                await asyncio.sleep(2.0)
+                # Greet once the caller's audio path is up, rather than after a
+                # fixed delay; fall back to greeting after MEDIA_READY_TIMEOUT
+                try:
+                    await asyncio.wait_for(media_ready.wait(), timeout=MEDIA_READY_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.info(f"No media_ready within {MEDIA_READY_TIMEOUT}s — greeting anyway")
 
             welcome_message = agent_instance.welcome_message
             logger.info(f"Sending welcome message: '{welcome_message}' for agent: {agent_type}")
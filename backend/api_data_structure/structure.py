@@ -1,6 +1,6 @@
 
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 class OutboundTrunkCreate(BaseModel):
     trunk_name: str
@@ -17,6 +17,15 @@ class OutboundCallRequest(BaseModel):
     agent_type: str = "invoice"
     call_from: Literal["exotel", "twilio"] = "exotel"
 
+# CAMPAIGN
+class CampaignCreateRequest(BaseModel):
+    name: str
+    agent_type: str = "invoice"
+    phone_numbers: list[str] = Field(..., min_length=1)
+    cps: Optional[float] = Field(None, gt=0)              # capped at CAMPAIGN_MAX_CPS
+    max_concurrent: Optional[int] = Field(None, ge=1)     # capped at CAMPAIGN_MAX_CONCURRENT
+    max_attempts: int = Field(3, ge=1, le=10)
+
 # SIP TEST
 class SIPTestRequest(BaseModel):
     exotel_ip: str
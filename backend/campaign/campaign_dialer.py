@@ -0,0 +1,321 @@
+import os
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+
+from campaign.campaign_store import (
+    CampaignStore,
+    COMPLETED,
+    FAILED,
+    FINISHED,
+    PENDING,
+)
+from custom_sip_reach import CallRejected
+
+# Calls per second the Exotel trunk accepts, shared by every campaign
+CAMPAIGN_MAX_CPS = float(os.getenv("CAMPAIGN_MAX_CPS", "1"))
+# Campaign calls in progress at once, across all campaigns
+CAMPAIGN_MAX_CONCURRENT = int(os.getenv("CAMPAIGN_MAX_CONCURRENT", "10"))
+# Retry backoff: base * 2^(attempt-1), capped, ±20% jitter
+CAMPAIGN_RETRY_BASE_SECONDS = float(os.getenv("CAMPAIGN_RETRY_BASE_SECONDS", "120"))
+CAMPAIGN_RETRY_MAX_SECONDS = float(os.getenv("CAMPAIGN_RETRY_MAX_SECONDS", "3600"))
+# A claim older than this is treated as orphaned at startup
+CAMPAIGN_ORPHAN_SECONDS = 6 * 3600
+# New campaigns from other processes are noticed within this long
+_IDLE_POLL_SECONDS = 5.0
+# Waits between attempts to record an outcome while the database is locked
+_RECORD_RETRY_SECONDS = (0.5, 1, 2, 4, 8)
+
+BUSY_CODES = {486, 600}
+NO_ANSWER_CODES = {408, 480, 487}
+
+
+class TokenBucket:
+    """Calls-per-second limiter. burst=1 spaces calls evenly at 1/rate."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is now)."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def take(self):
+        self._refill()
+        self._tokens -= 1
+
+
+def classify(result: dict | None) -> tuple[str, bool]:
+    """(outcome, retryable) for a finished call (run_bridge's result)."""
+    if not result:
+        return "no_result", True
+    if result.get("answered"):
+        return "answered", False
+    if result.get("reason") == "livekit_failed":
+        return "livekit_failed", True  # our side; the 487 is our own CANCEL
+    code = result.get("sip_code")
+    if code is None:
+        return result.get("reason") or "no_response", True
+    if code in BUSY_CODES:
+        return "busy", True
+    if code in NO_ANSWER_CODES:
+        return "no_answer", True
+    if code >= 500:
+        return "server_error", True
+    # 404, 484, 403, ...: the number or the request is bad, retrying won't help
+    return f"sip_{code}", False
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return False  # a previous incarnation that happened to get our pid
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class CampaignDialer:
+    """Dials queued campaign numbers through OutboundCall.make_call under the
+    trunk CPS limit and concurrency ceilings, and records every outcome.
+    Runs in the process that owns the SIP bridge runtime (one per host)."""
+
+    def __init__(self, store: CampaignStore, outbound_call):
+        self.store = store
+        self._outbound = outbound_call
+        self._trunk = TokenBucket(CAMPAIGN_MAX_CPS)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._inflight: dict[str, set] = {}  # campaign id → call tasks
+        self._wake = asyncio.Event()
+        self._hold_until = 0.0  # back off everything after the bridge says full
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.logger = logging.getLogger("campaign-dialer")
+
+    @property
+    def active(self) -> int:
+        return sum(len(t) for t in self._inflight.values())
+
+    def start(self):
+        if self._task is None:
+            recovered = self.store.recover_orphans(
+                _pid_alive, time.time() - CAMPAIGN_ORPHAN_SECONDS
+            )
+            if recovered:
+                self.logger.warning(f"Requeued {recovered} call(s) interrupted by a restart")
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Campaign created / resumed — look for work now."""
+        self._wake.set()
+
+    async def stop(self, timeout: float):
+        """Dial nothing new; give calls in progress ``timeout`` s to finish
+        and record their outcome."""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+        tasks = [t for ts in self._inflight.values() for t in ts]
+        if tasks:
+            self.logger.info(f"Waiting for {len(tasks)} campaign call(s) to finish")
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for t in pending:
+                t.cancel()
+
+    # ── Scheduling ─────────────────────────────────────────────────────
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                wait = self._dispatch()
+            except Exception as e:
+                self.logger.error(f"Dispatch failed: {e}", exc_info=True)
+                wait = _IDLE_POLL_SECONDS
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> float:
+        """Start every call the limits allow now; returns how long to sleep
+        before there could be more to do."""
+        now = time.time()
+        if now < self._hold_until:
+            return self._hold_until - now
+        wait = _IDLE_POLL_SECONDS
+        campaigns = self.store.running_campaigns()
+        # Round-robin: one call per campaign per pass, so campaigns share CPS
+        progressed = True
+        while progressed:
+            progressed = False
+            for campaign in campaigns:
+                if self.active >= CAMPAIGN_MAX_CONCURRENT:
+                    return wait
+                cid = campaign["id"]
+                if len(self._inflight.get(cid, ())) >= campaign["max_concurrent"]:
+                    continue
+                bucket = self._buckets.get(cid)
+                if bucket is None or bucket.rate != campaign["cps"]:
+                    bucket = self._buckets[cid] = TokenBucket(campaign["cps"])
+                delay = max(self._trunk.delay(), bucket.delay())
+                if delay > 0:
+                    wait = min(wait, delay)
+                    continue
+                call = self.store.claim(cid, os.getpid())
+                if call is None:
+                    self._check_finished(campaign)
+                    due = self.store.next_due_at(cid)
+                    if due is not None:
+                        wait = min(wait, max(0.0, due - now))
+                    continue
+                self._trunk.take()
+                bucket.take()
+                task = asyncio.create_task(self._place(campaign, call))
+                self._inflight.setdefault(cid, set()).add(task)
+                task.add_done_callback(lambda t, c=cid: self._on_call_done(c, t))
+                progressed = True
+        return wait
+
+    def _on_call_done(self, campaign_id: str, task: asyncio.Task):
+        self._inflight.get(campaign_id, set()).discard(task)
+        self._wake.set()
+
+    def _check_finished(self, campaign: dict):
+        pending, dialing = self.store.counts(campaign["id"])
+        if pending == 0 and dialing == 0:
+            self.store.set_campaign_status(campaign["id"], FINISHED)
+            self._buckets.pop(campaign["id"], None)
+            self.logger.info(f"Campaign {campaign['name']} ({campaign['id']}) finished")
+
+    # ── One attempt ────────────────────────────────────────────────────
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(
+            CAMPAIGN_RETRY_MAX_SECONDS,
+            CAMPAIGN_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        )
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _record(self, call_id: int, *args, **kwargs):
+        """store.record(), retried while another process holds the write
+        lock — the outcome of a placed call must not be lost."""
+        for delay in _RECORD_RETRY_SECONDS:
+            try:
+                self.store.record(call_id, *args, **kwargs)
+                return
+            except sqlite3.OperationalError as e:
+                self.logger.warning(f"Recording call {call_id} failed ({e}), retrying")
+                await asyncio.sleep(delay)
+        self.store.record(call_id, *args, **kwargs)
+
+    async def _place(self, campaign: dict, call: dict):
+        number = call["phone_number"]
+        if call["attempts"] > campaign["max_attempts"]:
+            # Requeued after an interruption with no attempts left
+            await self._record(call["id"], FAILED, call["last_outcome"] or "interrupted")
+            return
+        try:
+            res = await self._outbound.make_call(
+                number, campaign["agent_type"], "exotel", wait=True
+            )
+        except CallRejected as e:
+            # Bridge full or draining: not an attempt — requeue and hold off
+            self._hold_until = max(self._hold_until, time.time() + e.retry_after)
+            await self._record(
+                call["id"], PENDING, "deferred",
+                retry_at=time.time() + e.retry_after, count_attempt=False,
+            )
+            self.logger.info(f"{number}: bridge refused ({e}), retrying in {e.retry_after}s")
+            return
+        except asyncio.CancelledError:
+            # Only on shutdown, after the call itself was drained or cut off
+            try:
+                self.store.record(call["id"], PENDING, "interrupted", retry_at=time.time())
+            except sqlite3.OperationalError as e:
+                # Left "dialing"; recover_orphans() requeues it on restart
+                self.logger.error(f"{number}: could not requeue ({e})")
+            raise
+        except Exception as e:
+            self.logger.error(f"{number}: make_call failed: {e}", exc_info=True)
+            res = None
+
+        data = (res or {}).get("data") or {}
+        if res is None or res.get("status") != 0:
+            outcome, retry, result = "setup_error", True, {}
+        else:
+            result = data.get("result") or {}
+            outcome, retry = classify(result)
+
+        if outcome == "answered":
+            status, retry_at = COMPLETED, None
+        elif retry and call["attempts"] < campaign["max_attempts"]:
+            status, retry_at = PENDING, time.time() + self._backoff(call["attempts"])
+        else:
+            status, retry_at = FAILED, None
+
+        await self._record(
+            call["id"], status, outcome,
+            sip_code=result.get("sip_code"),
+            room=data.get("room"),
+            duration=result.get("duration_seconds"),
+            retry_at=retry_at,
+        )
+        self.logger.info(
+            f"{number}: {outcome} (attempt {call['attempts']}/"
+            f"{campaign['max_attempts']}) → {status}"
+        )
+
+    # ── API helpers ────────────────────────────────────────────────────
+
+    def create(self, name: str, agent_type: str, phone_numbers: list,
+               cps: float | None = None, max_concurrent: int | None = None,
+               max_attempts: int = 3) -> str:
+        cps = min(cps or CAMPAIGN_MAX_CPS, CAMPAIGN_MAX_CPS)
+        max_concurrent = min(
+            max_concurrent or CAMPAIGN_MAX_CONCURRENT, CAMPAIGN_MAX_CONCURRENT
+        )
+        campaign_id = self.store.create_campaign(
+            name, agent_type, phone_numbers, cps, max_concurrent, max_attempts
+        )
+        self.logger.info(
+            f"Campaign {name} ({campaign_id}): {len(phone_numbers)} numbers, "
+            f"agent={agent_type} cps={cps} max_concurrent={max_concurrent}"
+        )
+        self.notify()
+        return campaign_id
+
+    def status(self, campaign_id: str) -> dict | None:
+        campaign = self.store.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        campaign["progress"] = self.store.progress(campaign_id)
+        campaign["in_progress_here"] = len(self._inflight.get(campaign_id, ()))
+        return campaign
+
+
+_dialer: CampaignDialer | None = None
+
+
+def get_campaign_dialer(outbound_call=None) -> CampaignDialer:
+    global _dialer
+    if _dialer is None:
+        if outbound_call is None:
+            from outbound.outbound_call import OutboundCall
+            outbound_call = OutboundCall()
+        _dialer = CampaignDialer(CampaignStore(), outbound_call)
+    return _dialer
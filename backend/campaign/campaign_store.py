@@ -0,0 +1,223 @@
+import os
+import sqlite3
+import time
+import uuid
+import logging
+
+DB_FILE = os.getenv(
+    "CAMPAIGN_DB_PATH", os.path.join(os.path.dirname(__file__), "campaigns.db")
+)
+# How long a statement waits for another process's write lock. Store calls
+# run on the event loop, so this is kept short; past it sqlite3 raises
+# OperationalError ("database is locked") and the dialer retries.
+BUSY_TIMEOUT_MS = int(os.getenv("CAMPAIGN_DB_BUSY_TIMEOUT_MS", "200"))
+logger = logging.getLogger(__name__)
+
+# Call statuses
+PENDING = "pending"        # waiting for its (next) attempt
+DIALING = "dialing"        # claimed by a dialer, call in progress
+COMPLETED = "completed"    # answered
+FAILED = "failed"          # gave up: non-retryable outcome or attempts used up
+CANCELLED = "cancelled"    # campaign cancelled before it was dialled
+
+# Campaign statuses
+RUNNING = "running"
+PAUSED = "paused"
+FINISHED = "finished"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id             TEXT PRIMARY KEY,
+    name           TEXT NOT NULL,
+    agent_type     TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    cps            REAL NOT NULL,
+    max_concurrent INTEGER NOT NULL,
+    max_attempts   INTEGER NOT NULL,
+    created_at     REAL NOT NULL,
+    finished_at    REAL
+);
+CREATE TABLE IF NOT EXISTS campaign_calls (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id     TEXT NOT NULL REFERENCES campaigns(id),
+    phone_number    TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    owner           INTEGER,
+    last_outcome    TEXT,
+    last_sip_code   INTEGER,
+    room            TEXT,
+    duration        REAL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_due
+    ON campaign_calls (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_calls_campaign
+    ON campaign_calls (campaign_id, status);
+"""
+
+
+class CampaignStore:
+    """SQLite-backed campaign queue. Every method is a short synchronous
+    transaction; claim() is atomic, so two dialers never take the same row."""
+
+    def __init__(self, path: str = DB_FILE):
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._db.executescript(_SCHEMA)
+
+    # ── Campaigns ──────────────────────────────────────────────────────
+
+    def create_campaign(self, name: str, agent_type: str, phone_numbers: list,
+                        cps: float, max_concurrent: int, max_attempts: int) -> str:
+        campaign_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT INTO campaigns (id, name, agent_type, status, cps,"
+                " max_concurrent, max_attempts, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (campaign_id, name, agent_type, RUNNING, cps,
+                 max_concurrent, max_attempts, now),
+            )
+            self._db.executemany(
+                "INSERT INTO campaign_calls (campaign_id, phone_number, status,"
+                " next_attempt_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((campaign_id, number, PENDING, now, now) for number in phone_numbers),
+            )
+        return campaign_id
+
+    def get_campaign(self, campaign_id: str) -> dict | None:
+        row = self._db.execute(
+            "SELECT * FROM campaigns WHERE id = ?", (campaign_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def list_campaigns(self) -> list:
+        rows = self._db.execute("SELECT * FROM campaigns ORDER BY created_at DESC")
+        return [dict(r) for r in rows]
+
+    def running_campaigns(self) -> list:
+        rows = self._db.execute(
+            "SELECT * FROM campaigns WHERE status = ? ORDER BY created_at", (RUNNING,)
+        )
+        return [dict(r) for r in rows]
+
+    def set_campaign_status(self, campaign_id: str, status: str) -> bool:
+        finished_at = time.time() if status == FINISHED else None
+        cur = self._db.execute(
+            "UPDATE campaigns SET status = ?, finished_at = ?"
+            " WHERE id = ? AND status != ?",
+            (status, finished_at, campaign_id, FINISHED),
+        )
+        return cur.rowcount > 0
+
+    def cancel_campaign(self, campaign_id: str) -> bool:
+        """Stop dialling: pending numbers are cancelled, calls in progress
+        are left to finish."""
+        with self._db:
+            self._db.execute("BEGIN")
+            if not self.set_campaign_status(campaign_id, FINISHED):
+                return False
+            self._db.execute(
+                "UPDATE campaign_calls SET status = ?, updated_at = ?"
+                " WHERE campaign_id = ? AND status = ?",
+                (CANCELLED, time.time(), campaign_id, PENDING),
+            )
+        return True
+
+    def progress(self, campaign_id: str) -> dict:
+        by_status = dict(self._db.execute(
+            "SELECT status, COUNT(*) FROM campaign_calls"
+            " WHERE campaign_id = ? GROUP BY status", (campaign_id,)
+        ).fetchall())
+        by_outcome = dict(self._db.execute(
+            "SELECT last_outcome, COUNT(*) FROM campaign_calls"
+            " WHERE campaign_id = ? AND last_outcome IS NOT NULL"
+            " GROUP BY last_outcome", (campaign_id,)
+        ).fetchall())
+        return {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_last_outcome": by_outcome,
+        }
+
+    def results(self, campaign_id: str, status: str | None = None,
+                limit: int = 100, offset: int = 0) -> list:
+        query = "SELECT * FROM campaign_calls WHERE campaign_id = ?"
+        args = [campaign_id]
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY id LIMIT ? OFFSET ?"
+        rows = self._db.execute(query, (*args, limit, offset))
+        return [dict(r) for r in rows]
+
+    # ── Dialer ─────────────────────────────────────────────────────────
+
+    def counts(self, campaign_id: str) -> tuple[int, int]:
+        """(pending, dialing) for one campaign."""
+        row = self._db.execute(
+            "SELECT SUM(status = ?), SUM(status = ?) FROM campaign_calls"
+            " WHERE campaign_id = ?", (PENDING, DIALING, campaign_id)
+        ).fetchone()
+        return row[0] or 0, row[1] or 0
+
+    def next_due_at(self, campaign_id: str) -> float | None:
+        row = self._db.execute(
+            "SELECT MIN(next_attempt_at) FROM campaign_calls"
+            " WHERE campaign_id = ? AND status = ?", (campaign_id, PENDING)
+        ).fetchone()
+        return row[0]
+
+    def claim(self, campaign_id: str, owner: int) -> dict | None:
+        """Atomically take the longest-due pending number of a campaign."""
+        now = time.time()
+        # fetchall() steps the statement to completion, ending the implicit
+        # write transaction; fetchone() would keep the database locked
+        rows = self._db.execute(
+            "UPDATE campaign_calls"
+            " SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ?"
+            " WHERE id = (SELECT id FROM campaign_calls"
+            "             WHERE campaign_id = ? AND status = ? AND next_attempt_at <= ?"
+            "             ORDER BY next_attempt_at, id LIMIT 1)"
+            " RETURNING *",
+            (DIALING, owner, now, campaign_id, PENDING, now),
+        ).fetchall()
+        return dict(rows[0]) if rows else None
+
+    def record(self, call_id: int, status: str, outcome: str,
+               sip_code: int | None = None, room: str | None = None,
+               duration: float | None = None, retry_at: float | None = None,
+               count_attempt: bool = True):
+        """Store an attempt's outcome. ``retry_at`` requeues the number;
+        ``count_attempt=False`` gives back the attempt (call never placed)."""
+        self._db.execute(
+            "UPDATE campaign_calls SET status = ?, last_outcome = ?,"
+            " last_sip_code = ?, room = COALESCE(?, room), duration = ?,"
+            " next_attempt_at = COALESCE(?, next_attempt_at), owner = NULL,"
+            " attempts = attempts - ?, updated_at = ? WHERE id = ?",
+            (status, outcome, sip_code, room, duration, retry_at,
+             0 if count_attempt else 1, time.time(), call_id),
+        )
+
+    def recover_orphans(self, alive, stale_before: float) -> int:
+        """Requeue numbers left 'dialing' by a dialer process that died (its
+        calls died with it). ``alive(pid)`` says whether an owner lives;
+        claims older than ``stale_before`` are orphans either way, in case
+        the pid has been reused."""
+        rows = self._db.execute(
+            "SELECT id, owner, updated_at FROM campaign_calls WHERE status = ?",
+            (DIALING,),
+        ).fetchall()
+        orphans = [
+            r["id"] for r in rows
+            if r["owner"] is None or r["updated_at"] < stale_before or not alive(r["owner"])
+        ]
+        for call_id in orphans:
+            self.record(call_id, PENDING, "interrupted", retry_at=time.time())
+        return len(orphans)
@@ -8,8 +8,32 @@ Usage:
     from custom_sip_reach import run_bridge
 
     await run_bridge(phone_number="08697421450", agent_type="invoice")
+
+    # or start it wherever calls run — the bridge service, a media worker
+    # process, or a supervised task in this process:
+    await launch_bridge(phone_number="08697421450", agent_type="invoice")
 """
 
+from .admission import CallOverloaded  # noqa: F401
 from .bridge import run_bridge  # noqa: F401
+from .bridge_service import (  # noqa: F401
+    accepting_calls,
+    launch_bridge,
+    reserve_call_slot,
+    service_mode,
+    start_bridge_runtime,
+    stop_bridge_runtime,
+)
+from .call_supervisor import CallRejected  # noqa: F401
 
-__all__ = ["run_bridge"]
+__all__ = [
+    "run_bridge",
+    "launch_bridge",
+    "reserve_call_slot",
+    "accepting_calls",
+    "service_mode",
+    "start_bridge_runtime",
+    "stop_bridge_runtime",
+    "CallRejected",
+    "CallOverloaded",
+]
@@ -0,0 +1,6 @@
+"""Run the standalone bridge service: ``python -m custom_sip_reach``."""
+
+from .bridge_service import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Admission control — decides whether a new call can start now, before any
+room, dispatch or port is spent on it.
+
+Capacity is the tightest of:
+  • RTP port pairs — the whole range, or per slice with media workers
+    (outbound calls use the worker slices, inbound calls the signalling
+    process's slice); no limit in mux mode
+  • SIP_BRIDGE_MAX_CONCURRENT_CALLS and AGENT_WORKER_CAPACITY, when set
+  • CPU — the 1-min load average per core must be under ADMISSION_MAX_LOAD
+
+Outbound requests over capacity wait in a bounded FIFO queue for up to
+ADMISSION_MAX_WAIT_SECONDS (HTTP 429 when it is full or the wait runs out).
+Inbound INVITEs never queue: they are admitted or answered 503 Retry-After.
+An AdmissionTicket holds the slot until the call ends and release() is called.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+
+from .call_supervisor import CallRejected, get_call_supervisor
+from .config import (
+    ADMISSION_MAX_LOAD,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    AGENT_WORKER_CAPACITY,
+    MAX_CONCURRENT_CALLS,
+    MEDIA_WORKERS,
+    RTP_MUX_PORT,
+    RTP_PORT_END,
+    RTP_PORT_START,
+)
+from .port_pool import split_port_range
+
+logger = logging.getLogger("sip_bridge_v3")
+
+INBOUND = "inbound"
+OUTBOUND = "outbound"
+
+
+class CallOverloaded(CallRejected):
+    """Raised when there is no capacity for a call (HTTP 429 / SIP 503)."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message, retry_after=ADMISSION_RETRY_AFTER_SECONDS)
+        self.reason = reason
+
+
+class AdmissionTicket:
+    """One admitted call's slot. release() is idempotent."""
+
+    __slots__ = ("id", "kind", "label", "waited", "_controller")
+
+    def __init__(self, controller, ticket_id: int, kind: str, label: str, waited: float):
+        self.id = ticket_id
+        self.kind = kind
+        self.label = label
+        self.waited = waited  # seconds spent in the queue
+        self._controller = controller
+
+    def release(self):
+        if self._controller is not None:
+            self._controller._release(self)
+            self._controller = None
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        port_slots: int | dict[str, int] | None,
+        max_calls: int = MAX_CONCURRENT_CALLS,
+        agent_capacity: int = AGENT_WORKER_CAPACITY,
+        max_load: float = ADMISSION_MAX_LOAD,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+    ):
+        """
+        port_slots : Port pairs for calls — one shared count, a count per
+                     kind (media workers), or None for no port limit (mux).
+        """
+        self._port_slots = port_slots
+        self._max_calls = max_calls
+        self._agent_capacity = agent_capacity
+        self._max_load = max_load
+        self._queue_size = queue_size
+        self._max_wait = max_wait
+
+        self._active = {INBOUND: 0, OUTBOUND: 0}
+        self._waiters: deque[tuple[asyncio.Future, str, str, float]] = deque()
+        self._ids = itertools.count(1)
+        self._load_timer: asyncio.TimerHandle | None = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.refused: dict[str, int] = {}
+
+    @property
+    def active(self) -> int:
+        return self._active[INBOUND] + self._active[OUTBOUND]
+
+    def _refusal(self, kind: str) -> str | None:
+        """Why a ``kind`` call cannot start right now, or None if it can."""
+        if not get_call_supervisor().accepting:
+            return "draining"
+        if isinstance(self._port_slots, dict):
+            if self._active[kind] >= self._port_slots[kind]:
+                return "ports"
+        elif self._port_slots is not None and self.active >= self._port_slots:
+            return "ports"
+        if self._max_calls and self.active >= self._max_calls:
+            return "calls"
+        if self._agent_capacity and self.active >= self._agent_capacity:
+            return "agents"
+        if self._max_load and os.getloadavg()[0] / (os.cpu_count() or 1) > self._max_load:
+            return "cpu"
+        return None
+
+    def _grant(self, kind: str, label: str, waited: float) -> AdmissionTicket:
+        self._active[kind] += 1
+        self.admitted += 1
+        return AdmissionTicket(self, next(self._ids), kind, label, waited)
+
+    def _refuse(self, reason: str, label: str) -> CallOverloaded:
+        self.refused[reason] = self.refused.get(reason, 0) + 1
+        logger.warning(
+            f"[ADMISSION] Refused {label} ({reason}) — "
+            f"{self.active} active, {len(self._waiters)} queued"
+        )
+        if reason == "draining":
+            # Same signal (and Retry-After) as every other drain rejection
+            return CallRejected(f"Bridge is draining, not accepting {label}")
+        return CallOverloaded(f"No capacity for {label} ({reason})", reason)
+
+    def _queued(self, kind: str) -> bool:
+        return any(w[1] == kind for w in self._waiters)
+
+    def try_admit(self, kind: str, label: str) -> AdmissionTicket:
+        """Admit now or raise CallRejected / CallOverloaded. Queued requests
+        keep their place: nothing jumps a queue of the same kind."""
+        reason = "queue" if self._queued(kind) else self._refusal(kind)
+        if reason is not None:
+            raise self._refuse(reason, label)
+        return self._grant(kind, label, 0.0)
+
+    async def admit(
+        self, kind: str, label: str, max_wait: float | None = None
+    ) -> AdmissionTicket:
+        """Admit now, or queue for up to ``max_wait`` seconds (default
+        ADMISSION_MAX_WAIT_SECONDS). Raises CallOverloaded if the queue is
+        full or the wait runs out, CallRejected while draining."""
+        reason = "queue" if self._queued(kind) else self._refusal(kind)
+        if reason is None:
+            return self._grant(kind, label, 0.0)
+        if reason == "draining":
+            raise self._refuse(reason, label)
+        if len(self._waiters) >= self._queue_size:
+            raise self._refuse("queue_full", label)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, kind, label, time.monotonic())
+        self._waiters.append(entry)
+        self.queued += 1
+        logger.info(f"[ADMISSION] Queued {label} ({reason}) at position {len(self._waiters)}")
+        self._schedule_load_recheck()
+        try:
+            return await asyncio.wait_for(
+                future, self._max_wait if max_wait is None else max_wait
+            )
+        except asyncio.TimeoutError:
+            raise self._refuse("queue_timeout", label) from None
+        except asyncio.CancelledError:
+            # Caller went away (e.g. HTTP client disconnect) after a grant
+            if future.done() and not future.cancelled() and not future.exception():
+                future.result().release()
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+
+    def _release(self, ticket: AdmissionTicket):
+        self._active[ticket.kind] -= 1
+        self._wake()
+
+    def _wake(self):
+        """Hand freed capacity to queued requests, oldest first."""
+        while self._waiters:
+            future, kind, label, queued_at = self._waiters[0]
+            if future.done():  # timed out / cancelled
+                self._waiters.popleft()
+                continue
+            reason = self._refusal(kind)
+            if reason == "draining":
+                self._waiters.popleft()
+                future.set_exception(self._refuse(reason, label))
+                continue
+            if reason is not None:
+                break
+            self._waiters.popleft()
+            future.set_result(self._grant(kind, label, time.monotonic() - queued_at))
+        self._schedule_load_recheck()
+
+    def _schedule_load_recheck(self):
+        # Load average changes without any call ending, so a queue held back
+        # only by CPU is re-checked once a second rather than waiting for a
+        # release that may not come.
+        if self._waiters and self._load_timer is None and self._max_load:
+            self._load_timer = asyncio.get_running_loop().call_later(
+                1.0, self._on_load_timer
+            )
+
+    def _on_load_timer(self):
+        self._load_timer = None
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "active": dict(self._active),
+            "queued_now": len(self._waiters),
+            "port_slots": self._port_slots,
+            "max_calls": self._max_calls or None,
+            "agent_capacity": self._agent_capacity or None,
+            "load_per_core": round(os.getloadavg()[0] / (os.cpu_count() or 1), 2),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "refused": dict(self.refused),
+        }
+
+
+def _default_port_slots() -> int | dict[str, int] | None:
+    if RTP_MUX_PORT:
+        return None
+    if MEDIA_WORKERS > 0:
+        # Same split as MediaWorkerPool
+        inbound, workers = split_port_range(RTP_PORT_START, RTP_PORT_END, MEDIA_WORKERS)
+        return {
+            INBOUND: (inbound[1] - inbound[0]) // 2,
+            OUTBOUND: sum((end - start) // 2 for start, end in workers),
+        }
+    return (RTP_PORT_END - RTP_PORT_START) // 2
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(_default_port_slots())
+    return _controller
@@ -0,0 +1,109 @@
+"""
+Benchmark: event-loop wakeups and capture_frame() calls on the inbound RTP path.
+
+Runs N simulated calls on localhost. Each call gets a real RTPMediaBridge and
+UDP socket, plus a stand-in AudioSource that only counts frames. Senders
+emit 50 packets/s per call, in pairs every 40 ms, the way bursty mobile
+routes deliver them. It compares the pre-drain behaviour (one datagram per
+wakeup, one capture per packet) against drain-all with coalesced frames, and
+against mux mode (one shared socket for every call, see media_mux.py).
+
+Usage:
+    python -m custom_sip_reach.bench_rtp_wakeups --calls 20 --seconds 5
+"""
+
+import argparse
+import asyncio
+import socket
+import struct
+import time
+
+from .media_mux import MediaMux
+from .rtp_bridge import RTPMediaBridge
+
+
+class _CountingSource:
+    async def capture_frame(self, frame):
+        pass
+
+
+async def _run(
+    calls: int, seconds: float, drain: int, frame_ms: int, use_mux: bool
+) -> dict:
+    mux = MediaMux(0) if use_mux else None
+    bridges, senders = [], []
+    for _ in range(calls):
+        b = RTPMediaBridge("127.0.0.1", 0, capture_frame_ms=frame_ms, mux=mux)
+        b._max_drain = drain
+        b._audio_source = _CountingSource()
+        b._start_receiving()
+        # One sender socket per call — the mux routes on the source address
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tx.bind(("127.0.0.1", 0))
+        if mux:
+            mux.rtp.set_remote(b, tx.getsockname())
+        bridges.append(b)
+        senders.append(tx)
+
+    payload = bytes([0xD5]) * 160
+    seq = 0
+    t0 = time.monotonic()
+    next_burst = t0
+    while time.monotonic() - t0 < seconds:
+        for _ in range(2):
+            pkt = struct.pack("!BBHII", 0x80, 8, seq & 0xFFFF, seq * 160, 1) + payload
+            for b, tx in zip(bridges, senders):
+                tx.sendto(pkt, ("127.0.0.1", b.local_port))
+            seq += 1
+        next_burst += 0.04
+        await asyncio.sleep(max(0.0, next_burst - time.monotonic()))
+    await asyncio.sleep(0.3)
+    elapsed = time.monotonic() - t0
+
+    stats = [b.stats() for b in bridges]
+    for b in bridges:
+        b.stop()
+    for tx in senders:
+        tx.close()
+    if mux:
+        process_wakeups = mux.rtp.wakeups
+        mux.close()
+    else:
+        process_wakeups = sum(s["rx_wakeups"] for s in stats)
+
+    def per_call_rate(key):
+        return sum(s[key] for s in stats) / calls / elapsed
+
+    return {
+        "rx_pps": per_call_rate("rx"),
+        "reader_wakeups_s": per_call_rate("rx_wakeups"),
+        "captures_s": per_call_rate("captures"),
+        "process_wakeups_s": process_wakeups / elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--calls", type=int, default=20)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--frame-ms", type=int, default=40)
+    args = ap.parse_args()
+
+    modes = [
+        ("before (1 datagram/wakeup, 20 ms frames)", 1, 20, False),
+        (f"after  (drain-all, {args.frame_ms} ms frames)", 64, args.frame_ms, False),
+        (f"mux    (shared socket, {args.frame_ms} ms frames)", 64, args.frame_ms, True),
+    ]
+    print(f"{args.calls} calls x {args.seconds:.0f}s, per-call rates:")
+    for name, drain, frame_ms, use_mux in modes:
+        r = asyncio.run(_run(args.calls, args.seconds, drain, frame_ms, use_mux))
+        print(
+            f"  {name}: rx={r['rx_pps']:.1f} pkt/s  "
+            f"reader wakeups={r['reader_wakeups_s']:.1f}/s  "
+            f"capture_frame={r['captures_s']:.1f}/s  "
+            f"process reader wakeups={r['process_wakeups_s']:.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: SIP framing throughput, the old per-path parsers against SipFramer.
+
+The old parsers (sip_client / inbound_listener before sip_message.py) kept a
+bytes buffer, appended each read to it, searched it from the start and
+decoded the whole header block of every message on every pass. The
+benchmark replays the messages in sip_corpus/ as one pipelined stream, cut
+into reads of a fixed size, through both, and reports messages per second.
+
+For reads the size the connections use (8 KiB) and anything else up to a
+few dozen messages per read, the old loop is faster: SipFramer runs at
+roughly 0.55-0.7x its rate. Per message it checks the start line, honours
+folded lines, compact forms and repeated headers, and enforces the size
+limits, none of which the old loop did. That is under 10 us a message,
+at a few messages per call. The old loop re-slices the
+whole buffer for every message, so it is quadratic in the backlog: with a
+pipelined backlog in one read, SipFramer is ~10x faster and the gap grows
+with the backlog.
+
+Usage:
+    python -m custom_sip_reach.bench_sip_framer --messages 5000 --read-size 512
+"""
+
+import argparse
+import pathlib
+import time
+
+from .sip_message import SipFramer
+
+CORPUS = pathlib.Path(__file__).with_name("sip_corpus")
+
+
+def _legacy_parse(chunks) -> int:
+    """The loop the signalling paths used to carry, minus the handling."""
+    buf, count = b"", 0
+    for chunk in chunks:
+        buf += chunk
+        while b"\r\n\r\n" in buf:
+            he = buf.index(b"\r\n\r\n")
+            hb = buf[:he].decode(errors="replace")
+            rest = buf[he + 4 :]
+            lines = hb.split("\r\n")
+            hdrs = {}
+            for l in lines[1:]:
+                if ":" in l:
+                    k, v = l.split(":", 1)
+                    hdrs[k.strip().lower()] = v.strip()
+            cl = int(hdrs.get("content-length", hdrs.get("l", "0")))
+            if len(rest) < cl:
+                break
+            buf = rest[cl:]
+            count += 1
+    return count
+
+
+def _framer_parse(chunks) -> int:
+    framer, count = SipFramer(), 0
+    for chunk in chunks:
+        for msg in framer.feed(chunk):
+            # What every handler reads first
+            msg.get("call-id"), msg.cseq_method
+            count += 1
+    return count
+
+
+def _stream(messages: int) -> tuple[bytes, int]:
+    # Keep-alive CRLFs are left out: the old parsers cannot skip them
+    samples = [
+        p.read_bytes().lstrip(b"\r\n")
+        for p in sorted(CORPUS.glob("*.sip"))
+        if p.name != "keepalive_pipeline.sip"
+    ]
+    parts = [samples[i % len(samples)] for i in range(messages)]
+    return b"".join(parts), len(parts)
+
+
+def _time(parse, chunks, expected: int) -> float:
+    t0 = time.perf_counter()
+    count = parse(chunks)
+    elapsed = time.perf_counter() - t0
+    assert count == expected, f"{parse.__name__}: framed {count}/{expected}"
+    return expected / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--messages", type=int, default=5000)
+    ap.add_argument("--read-size", type=int, default=512)
+    args = ap.parse_args()
+
+    stream, total = _stream(args.messages)
+    print(f"{total} messages, {len(stream) / 1024:.0f} KiB:")
+    for read_size in (args.read_size, 8192, 65536, len(stream)):
+        chunks = [stream[i : i + read_size] for i in range(0, len(stream), read_size)]
+        label = "one read" if read_size == len(stream) else f"{read_size} B reads"
+        before = _time(_legacy_parse, chunks, total)
+        after = _time(_framer_parse, chunks, total)
+        print(
+            f"  {label:>12}: before={before:,.0f} msg/s  "
+            f"after={after:,.0f} msg/s  ({after / before:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
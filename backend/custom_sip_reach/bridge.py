@@ -3,10 +3,17 @@ Main bridge orchestrator — wires SIP, RTP, and LiveKit together.
 
 run_bridge() is the single entry point that:
   1. Acquires a port from the pool
-  2. Connects to LiveKit and publishes the SIP audio track
-  3. Sends a SIP INVITE to Exotel
-  4. Monitors for hang-up signals (BYE, RTP silence, LiveKit disconnect)
-  5. Cleans up everything on exit
+  2. Sets up both legs at once:
+       LiveKit: connect → publish the SIP audio track
+       SIP:     DNS + TCP connect → INVITE (needs the inbound listener too)
+     The phone rings while LiveKit connects; the answer is only acted on
+     once LiveKit is ready, and a LiveKit failure CANCELs the INVITE.
+     A 180/183 with SDP opens the RTP path right away (early media), so it
+     is already through NATs when the callee picks up.
+  3. Waits for the first hang-up signal (BYE, RTP silence, LiveKit disconnect)
+  4. Cleans up everything on exit
+
+Each call's stage timings (see call_trace.py) are returned in its result.
 """
 
 import asyncio
@@ -18,6 +25,7 @@ import uuid
 from livekit import rtc
 from livekit.api import AccessToken, VideoGrants
 
+from .call_trace import CallTrace
 from .config import (
     EXOTEL_MEDIA_IP,
     LK_API_KEY,
@@ -25,13 +33,16 @@ from .config import (
     LK_URL,
     NO_RTP_AFTER_ANSWER_SECONDS,
     RTP_SILENCE_TIMEOUT_SECONDS,
+    SAMPLE_RATE_LK,
     validate_config,
 )
+from .hangup import wait_for_hangup
 from .inbound_listener import (
     ensure_inbound_server,
     register_call_id,
     unregister_call_id,
 )
+from .media_mux import get_media_mux
 from .port_pool import get_port_pool
 from .rtp_bridge import RTPMediaBridge
 from .sip_client import ExotelSipClient
@@ -40,28 +51,57 @@ logger = logging.getLogger("sip_bridge_v3")
 
 
 async def run_bridge(
-    phone_number: str, agent_type: str = "invoice", room_name: str | None = None
-):
+    phone_number: str,
+    agent_type: str = "invoice",
+    room_name: str | None = None,
+    requested_at: float | None = None,
+) -> dict:
+    """Place and bridge one call; returns its outcome:
+    {"sip_code": final INVITE response (None if never completed),
+     "answered": bool, "reason": why it ended, "duration_seconds": talk time,
+     "trace": stage timings, in ms since ``requested_at`` (epoch seconds,
+              default now)}
+    """
+    trace = CallTrace(requested_at)
+    trace.mark("setup_started")
+    result = {
+        "sip_code": None,
+        "answered": False,
+        "reason": "error",
+        "duration_seconds": 0.0,
+    }
     if not validate_config():
-        return
+        result["reason"] = "config"
+        return result
 
     if not room_name:
         room_name = f"sip-bridge-{phone_number}-{uuid.uuid4().hex[:6]}"
 
     pool = get_port_pool()
-    port = await pool.acquire()
+    mux = get_media_mux()
+    port = mux.port if mux else await pool.acquire()
     logger.info(f"[BRIDGE] phone={phone_number} room={room_name} rtp_port={port}")
 
     rtp_bridge = None
     sip_client = None
     forward_task = None
+    media_task = None
     inbound_bye = None
+    livekit_task = None
     room = rtc.Room()
 
     try:
-        await ensure_inbound_server()
-        rtp_bridge = RTPMediaBridge(public_ip=EXOTEL_MEDIA_IP, bind_port=port)
-        sip_client = ExotelSipClient(callee=phone_number, rtp_port=port)
+        rtp_bridge = RTPMediaBridge(
+            public_ip=EXOTEL_MEDIA_IP, bind_port=port, mux=mux, trace=trace
+        )
+        sip_client = ExotelSipClient(
+            callee=phone_number,
+            rtp_port=port,
+            trace=trace,
+            on_early_media=lambda m: rtp_bridge.set_remote_endpoint(
+                m["remote_ip"], m["remote_port"], m["pt"], early=True
+            ),
+        )
         inbound_bye = register_call_id(sip_client.call_id)
 
         @room.on("track_subscribed")
@@ -84,21 +124,44 @@ async def run_bridge(
             .with_grants(VideoGrants(room_join=True, room=room_name))
             .to_jwt()
         )
-        await room.connect(LK_URL, token)
-        logger.info(f"[BRIDGE] LiveKit connected: {room_name}")
-        await rtp_bridge.start_inbound(room)
 
-        await sip_client.connect()
-        res = await sip_client.send_invite()
+        async def connect_livekit():
+            await room.connect(LK_URL, token)
+            trace.mark("livekit_connected")
+            logger.info(f"[BRIDGE] LiveKit connected: {room_name}")
+            await rtp_bridge.start_inbound(room)
+            trace.mark("livekit_ready")
+
+        livekit_task = asyncio.create_task(connect_livekit())
+        # The INVITE only waits for the signalling path
+        await asyncio.gather(ensure_inbound_server(), sip_client.connect())
+        invite_task = asyncio.create_task(sip_client.send_invite())
+        await asyncio.wait(
+            {livekit_task, invite_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if livekit_task.done() and livekit_task.exception() and not invite_task.done():
+            logger.error(
+                f"[BRIDGE] LiveKit setup failed while ringing: {livekit_task.exception()}"
+            )
+            await sip_client.send_cancel()
+        res = await invite_task
+        result["sip_code"] = sip_client.final_status
         if not res:
             logger.error("[BRIDGE] SIP failed")
-            return
+            lk_failed = livekit_task.done() and livekit_task.exception()
+            result["reason"] = "livekit_failed" if lk_failed else "sip_failed"
+            return result
+        result["answered"] = True
+        try:
+            await livekit_task  # answered quicker than LiveKit came up (rare)
+        except Exception:
+            result["reason"] = "livekit_failed"
+            raise
+        answered_at = time.monotonic()
 
-        # Flush buffered agent audio + open RTP path
+        # Flush buffered agent audio (the path may be open since a 183)
         rtp_bridge.set_remote_endpoint(res["remote_ip"], res["remote_port"], res["pt"])
 
-        answered_at = time.time()
-
         # Notify agent that call is answered
         try:
             await room.local_participant.publish_data(
@@ -108,65 +171,36 @@ async def run_bridge(
             logger.info("[BRIDGE] Published call_answered event")
         except Exception as e:
             logger.error(f"[BRIDGE] Failed to publish call_answered event: {e}")
+        media_task = asyncio.create_task(announce_media_ready(room, rtp_bridge, "BRIDGE"))
 
-        disconnect_reason = "unknown"
         sip_mon = asyncio.create_task(sip_client.wait_for_disconnection())
-        while True:
-            # ── Signal 1: LiveKit room disconnected ──
-            if room.connection_state != rtc.ConnectionState.CONN_CONNECTED:
-                disconnect_reason = "livekit_disconnected"
-                logger.info("[BRIDGE] LiveKit room disconnected")
-                break
-
-            # ── Signal 2: SIP BYE on outbound TCP (same connection as INVITE) ──
-            if sip_mon.done():
-                disconnect_reason = "sip_bye_outbound_tcp"
-                logger.info("[BRIDGE] SIP BYE received on outbound TCP")
-                break
-
-            # ── Signal 3: SIP BYE on inbound TCP listener (new connection from Exotel) ──
-            if inbound_bye and inbound_bye.is_set():
-                disconnect_reason = "sip_bye_inbound_tcp"
-                logger.info("[BRIDGE] SIP BYE received on inbound TCP listener")
-                break
-
-            since_rx = rtp_bridge.seconds_since_rx()
-
-            # ── Signal 4: No RTP ever arrived after answer — call setup failure ──
-            if (
-                since_rx is None
-                and NO_RTP_AFTER_ANSWER_SECONDS > 0
-                and (time.time() - answered_at) > NO_RTP_AFTER_ANSWER_SECONDS
-            ):
-                disconnect_reason = "no_rtp_after_answer"
-                logger.error(
-                    "[RTP] No inbound RTP after %ss — call never connected, ending",
-                    NO_RTP_AFTER_ANSWER_SECONDS,
-                )
-                break
-
-            # ── Signal 5: RTP was flowing but stopped — caller hung up ──
-            if (
-                since_rx is not None
-                and RTP_SILENCE_TIMEOUT_SECONDS > 0
-                and since_rx > RTP_SILENCE_TIMEOUT_SECONDS
-            ):
-                disconnect_reason = "rtp_silence_after_flow"
-                logger.info(
-                    "[RTP] No audio for %.0fs (threshold=%ss) — caller hung up",
-                    since_rx,
-                    RTP_SILENCE_TIMEOUT_SECONDS,
-                )
-                break
-
-            await asyncio.sleep(1)
-
+        disconnect_reason = await wait_for_hangup(
+            room,
+            rtp_bridge,
+            sip_monitor=sip_mon,
+            inbound_bye=inbound_bye,
+            no_rtp_timeout=NO_RTP_AFTER_ANSWER_SECONDS,
+            silence_timeout=RTP_SILENCE_TIMEOUT_SECONDS,
+        )
+        result["reason"] = disconnect_reason
+        result["duration_seconds"] = round(time.monotonic() - answered_at, 1)
         logger.info(f"[BRIDGE] Call ended — reason={disconnect_reason}")
 
     except Exception as e:
         logger.error(f"[BRIDGE] Error: {e}", exc_info=True)
 
     finally:
+        result["trace"] = trace.as_dict()
+        logger.info(f"[BRIDGE] Stage trace ({phone_number}): {trace.summary()}")
+
+        if livekit_task:
+            livekit_task.cancel()  # no-op once finished
+            try:
+                await livekit_task
+            except (asyncio.CancelledError, Exception):
+                pass  # already logged / reflected in the reason
+        if media_task:
+            media_task.cancel()
         if forward_task:
             forward_task.cancel()
             try:
@@ -184,13 +218,33 @@ async def run_bridge(
 
         await room.disconnect()
         # ← This is the critical step that was missing before
-        await pool.release(port)
-        logger.info(f"[BRIDGE] Port {port} released")
+        if not mux:
+            await pool.release(port)
+            logger.info(f"[BRIDGE] Port {port} released")
         if sip_client:
             unregister_call_id(sip_client.call_id)
 
+    return result
+
+
+async def announce_media_ready(room: rtc.Room, rtp_bridge: RTPMediaBridge, tag: str):
+    """Tell the agent the caller's audio is flowing steadily, so it can
+    greet now instead of after a fixed delay. The agent has a short fallback
+    timeout of its own in case this never comes."""
+    await rtp_bridge.media_ready.wait()
+    try:
+        await room.local_participant.publish_data(
+            json.dumps({"event": "media_ready", **rtp_bridge.media_ready_info()}).encode(),
+            topic="sip_bridge_events",
+        )
+        logger.info(f"[{tag}] Published media_ready event")
+    except Exception as e:
+        logger.error(f"[{tag}] Failed to publish media_ready event: {e}")
+
 
 async def _forward_audio(track: rtc.Track, bridge: RTPMediaBridge):
-    stream = rtc.AudioStream(track, sample_rate=48000, num_channels=1)
+    # libwebrtc resamples to SAMPLE_RATE_LK natively; at the SIP rate (narrowband
+    # profile) send_to_rtp() gets 8 kHz frames and skips its own resampler.
+    stream = rtc.AudioStream(track, sample_rate=SAMPLE_RATE_LK, num_channels=1)
     async for event in stream:
         await bridge.send_to_rtp(event.frame)
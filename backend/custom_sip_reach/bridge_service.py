@@ -0,0 +1,339 @@
+"""
+Bridge runtime lifecycle, and the standalone long-lived bridge service.
+
+gunicorn recycles HTTP workers (--max-requests), and any call running inside
+one dies with it. Two ways to run the bridge:
+
+  • In the HTTP worker (default): the FastAPI lifespan calls
+    start_bridge_runtime() / stop_bridge_runtime(). On shutdown, new calls get
+    503 and active calls are drained for up to CALL_DRAIN_TIMEOUT_SECONDS
+    (gunicorn's --graceful-timeout is set to cover it). server_run.py turns
+    --max-requests recycling off in this mode, as the single worker would
+    be out of service for the whole drain.
+  • As a separate process (SIP_BRIDGE_SERVICE_ADDR=host:port):
+    ``python -m custom_sip_reach`` owns the SIP listener, media
+    workers, every call and the campaign dialer, and is never recycled. HTTP
+    workers only send reserve / dial requests over a local newline-delimited
+    JSON control socket, so they can be recycled freely. Admission
+    (admission.py) runs where the calls run, and so does the dialer: a
+    campaign number stays "dialing" exactly as long as its call, whatever
+    happens to the HTTP workers.
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import sys
+
+from .admission import (
+    OUTBOUND,
+    AdmissionTicket,
+    CallOverloaded,
+    get_admission_controller,
+)
+from .call_supervisor import CallRejected, get_call_supervisor
+from .config import (
+    ADMISSION_MAX_WAIT_SECONDS,
+    BRIDGE_SERVICE_ADDR,
+    CALL_DRAIN_TIMEOUT_SECONDS,
+)
+from .digest_auth import get_digest_cache
+from .inbound_listener import close_inbound_server, ensure_inbound_server
+from .media_workers import dispatch_bridge, get_media_worker_pool, start_media_workers
+from .port_pool import get_port_pool
+from .sip_trunk import close_sip_trunk, get_sip_trunk, start_sip_trunk, trunk_enabled
+
+logger = logging.getLogger("sip_bridge_v3")
+
+# A reserved slot the HTTP side never dials with is freed after this long
+_RESERVATION_TTL_SECONDS = 60.0
+
+# True inside the bridge service, which runs calls itself although
+# service_mode() is set there too
+_in_service = False
+
+
+def _service_address() -> tuple[str, int]:
+    host, _, port = BRIDGE_SERVICE_ADDR.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def service_mode() -> bool:
+    """True when calls are run by the standalone bridge service."""
+    return bool(BRIDGE_SERVICE_ADDR)
+
+
+def _calls_run_here() -> bool:
+    return _in_service or not service_mode()
+
+
+def accepting_calls() -> bool:
+    """Whether this process can take a new call. In service mode the service
+    decides (launch_bridge raises CallRejected if it is draining)."""
+    return not _calls_run_here() or get_call_supervisor().accepting
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Runtime (SIP listener + media workers + call supervisor)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def start_bridge_runtime():
+    await ensure_inbound_server()
+    if not start_media_workers():
+        start_sip_trunk()  # outbound calls run here, not in workers
+
+
+async def stop_bridge_runtime(timeout: float = CALL_DRAIN_TIMEOUT_SECONDS):
+    """Refuse new calls, drain active ones (here and in media workers), then
+    close the SIP listener and trunk. The listener stays up during the drain so BYEs
+    still arrive and new INVITEs get a 503."""
+    supervisor = get_call_supervisor()
+    supervisor.begin_drain()
+    pool = get_media_worker_pool()
+    await asyncio.gather(
+        supervisor.drain(timeout),
+        pool.stop(timeout) if pool else asyncio.sleep(0),
+    )
+    await close_inbound_server()
+    await close_sip_trunk()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Client side (HTTP workers)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+async def _control_request(
+    msg: dict, timeout: float = 5.0, reply_timeout: float | None = 5.0
+) -> dict:
+    """One request / reply. ``reply_timeout=None`` waits as long as it takes
+    (dial with wait=True replies when the call ends)."""
+    host, port = _service_address()
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout
+    )
+    try:
+        writer.write(json.dumps(msg).encode() + b"\n")
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), reply_timeout)
+    finally:
+        writer.close()
+    return json.loads(line) if line else {"ok": False, "error": "no reply"}
+
+
+class _RemoteTicket:
+    """A slot reserved in the bridge service's admission controller."""
+
+    def __init__(self, ticket_id: int, waited: float):
+        self.id = ticket_id
+        self.waited = waited
+
+    def release(self):
+        # Only needed when the call is abandoned before dialling
+        asyncio.create_task(self._release())
+
+    async def _release(self):
+        try:
+            await _control_request({"op": "release", "ticket": self.id})
+        except (OSError, asyncio.TimeoutError):
+            pass  # the service frees it after _RESERVATION_TTL_SECONDS anyway
+
+
+def _raise_refusal(reply: dict):
+    error = reply.get("error")
+    if error == "draining":
+        raise CallRejected("Bridge service is draining")
+    if error == "overloaded":
+        raise CallOverloaded(
+            reply.get("message", "Bridge service is at capacity"),
+            reply.get("reason", "unknown"),
+        )
+    raise RuntimeError(f"Bridge service refused call: {error}")
+
+
+async def _service_request(msg: dict, reply_timeout: float | None = 5.0) -> dict:
+    try:
+        reply = await _control_request(msg, reply_timeout=reply_timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise RuntimeError(f"Bridge service at {BRIDGE_SERVICE_ADDR} unreachable: {e}")
+    if not reply.get("ok"):
+        _raise_refusal(reply)
+    return reply
+
+
+async def reserve_call_slot(label: str, max_wait: float | None = None):
+    """Reserve admission for an outbound bridged call, queueing for up to
+    ``max_wait`` s. Pass the ticket to launch_bridge(), or release() it if
+    the call is abandoned. Raises CallRejected / CallOverloaded."""
+    if _calls_run_here():
+        return await get_admission_controller().admit(OUTBOUND, label, max_wait)
+    wait = ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait
+    reply = await _service_request(
+        {"op": "reserve", "label": label, "max_wait": wait}, reply_timeout=wait + 5
+    )
+    return _RemoteTicket(reply["ticket"], reply["waited"])
+
+
+async def launch_bridge(ticket=None, wait: bool = False, **kwargs) -> dict | None:
+    """Start an outbound bridged call (run_bridge kwargs) wherever calls run:
+    the bridge service, a media worker, or this process. ``ticket`` is the
+    slot from reserve_call_slot(); without one the call is admitted now.
+    With ``wait`` returns run_bridge's outcome once the call has ended.
+    Raises CallRejected while draining, CallOverloaded at capacity."""
+    if _calls_run_here():
+        outcome = dispatch_bridge(ticket=ticket, **kwargs)
+        return await outcome if wait else None
+    msg = {"op": "dial", "kwargs": kwargs, "wait": wait}
+    if ticket is not None:
+        msg["ticket"] = ticket.id
+    reply = await _service_request(msg, reply_timeout=None if wait else 5.0)
+    return reply.get("result")
+
+
+async def bridge_stats() -> dict:
+    """Active calls, RTP ports and media workers, from wherever calls run."""
+    if not _calls_run_here():
+        return await _control_request({"op": "stats"})
+    return _local_stats()
+
+
+def _local_stats() -> dict:
+    pool = get_media_worker_pool()
+    return {
+        "ok": True,
+        "calls": get_call_supervisor().stats(),
+        "admission": get_admission_controller().stats(),
+        "ports": get_port_pool().stats(),
+        "workers": pool.stats() if pool else [],
+        "sip_trunk": get_sip_trunk().stats() if trunk_enabled() else None,
+        "digest_auth": get_digest_cache().stats(),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Service side
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+_reserved: dict[int, tuple[AdmissionTicket, asyncio.TimerHandle]] = {}
+
+
+def _reserve(ticket: AdmissionTicket) -> int:
+    expiry = asyncio.get_running_loop().call_later(
+        _RESERVATION_TTL_SECONDS, _release_reserved, ticket.id
+    )
+    _reserved[ticket.id] = (ticket, expiry)
+    return ticket.id
+
+
+def _take_reserved(ticket_id: int) -> AdmissionTicket | None:
+    entry = _reserved.pop(ticket_id, None)
+    if entry is None:
+        return None
+    entry[1].cancel()
+    return entry[0]
+
+
+def _release_reserved(ticket_id: int):
+    ticket = _take_reserved(ticket_id)
+    if ticket is not None:
+        ticket.release()
+
+
+async def _handle_control(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while line := await reader.readline():
+            try:
+                msg = json.loads(line)
+                op = msg.get("op")
+                if op == "dial":
+                    ticket = None
+                    if "ticket" in msg:
+                        # An expired reservation is simply re-admitted
+                        ticket = _take_reserved(msg["ticket"])
+                    outcome = dispatch_bridge(ticket=ticket, **msg["kwargs"])
+                    reply = {"ok": True}
+                    if msg.get("wait"):
+                        reply["result"] = await outcome
+                elif op == "reserve":
+                    ticket = await get_admission_controller().admit(
+                        OUTBOUND, msg["label"], msg.get("max_wait")
+                    )
+                    reply = {
+                        "ok": True,
+                        "ticket": _reserve(ticket),
+                        "waited": ticket.waited,
+                    }
+                elif op == "release":
+                    _release_reserved(msg["ticket"])
+                    reply = {"ok": True}
+                elif op == "stats":
+                    reply = _local_stats()
+                else:
+                    reply = {"ok": False, "error": f"unknown op {op!r}"}
+            except CallOverloaded as e:
+                reply = {
+                    "ok": False,
+                    "error": "overloaded",
+                    "reason": e.reason,
+                    "message": str(e),
+                }
+            except CallRejected:
+                reply = {"ok": False, "error": "draining"}
+            except Exception as e:
+                logger.error(f"[SERVICE] Control request failed: {e}", exc_info=True)
+                reply = {"ok": False, "error": str(e)}
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _serve():
+    global _in_service
+    _in_service = True
+    host, port = _service_address()
+    await start_bridge_runtime()
+    from services.room_pool import get_room_pool
+    get_room_pool().start()  # warm rooms for inbound calls
+    from campaign.campaign_dialer import get_campaign_dialer
+    dialer = get_campaign_dialer()
+    dialer.start()
+    server = await asyncio.start_server(_handle_control, host, port)
+    logger.info(f"[SERVICE] Bridge service listening on {host}:{port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # The control socket stays open while draining so dials get "draining"
+    logger.info("[SERVICE] Shutdown requested — draining calls")
+    # The dialer stops dialling; its calls end with the drain and their
+    # outcomes are recorded
+    await asyncio.gather(
+        dialer.stop(CALL_DRAIN_TIMEOUT_SECONDS + 5),
+        stop_bridge_runtime(),
+        get_room_pool().stop(),
+    )
+    from services.lvk_services import close_livekit_api
+    await close_livekit_api()
+    server.close()
+    await server.wait_closed()
+    logger.info("[SERVICE] Stopped")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if not service_mode():
+        logger.error(
+            "[SERVICE] SIP_BRIDGE_SERVICE_ADDR is not set — the HTTP server runs "
+            "the bridge itself; not starting a separate service."
+        )
+        sys.exit(0)
+    asyncio.run(_serve())
@@ -0,0 +1,110 @@
+"""
+Call-lifecycle supervisor — tracks every bridged call running in this process.
+
+  • Every run_bridge / handle_inbound_call task is started through track(),
+    so nothing is a fire-and-forget create_task that shutdown cannot see
+  • begin_drain() stops new calls: track() raises CallRejected, the HTTP
+    layer answers 503 and the SIP listener answers INVITEs with 503
+  • drain() waits up to a deadline for active calls to end, then cancels
+    the rest (their finally blocks still send BYE and release ports)
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Coroutine
+
+from .config import CALL_DRAIN_TIMEOUT_SECONDS, DRAIN_RETRY_AFTER_SECONDS
+
+logger = logging.getLogger("sip_bridge_v3")
+
+
+class CallRejected(RuntimeError):
+    """Raised when a new call arrives while the bridge is draining.
+    ``retry_after`` (seconds) goes into the 503's Retry-After header."""
+
+    def __init__(self, message: str, retry_after: int = DRAIN_RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CallSupervisor:
+    def __init__(self):
+        self._tasks: dict[asyncio.Task, str] = {}
+        self._accepting = True
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.started = 0
+        self.rejected = 0
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def track(self, coro: Coroutine, label: str) -> asyncio.Task:
+        """Run ``coro`` as a supervised call task. Raises CallRejected (and
+        closes the coroutine) while draining."""
+        if not self._accepting:
+            coro.close()
+            self.rejected += 1
+            raise CallRejected(f"Bridge is draining, not accepting {label}")
+        task = asyncio.create_task(coro)
+        self._tasks[task] = label
+        self._idle.clear()
+        self.started += 1
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task):
+        label = self._tasks.pop(task, "?")
+        if not task.cancelled() and task.exception():
+            logger.error(f"[SUPERVISOR] {label} crashed", exc_info=task.exception())
+        if not self._tasks:
+            self._idle.set()
+
+    def begin_drain(self):
+        if self._accepting:
+            self._accepting = False
+            logger.info(f"[SUPERVISOR] Draining — {self.active} active call(s)")
+
+    async def drain(self, timeout: float = CALL_DRAIN_TIMEOUT_SECONDS):
+        """Stop accepting calls and wait up to ``timeout`` s for active ones."""
+        self.begin_drain()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            logger.info(
+                f"[SUPERVISOR] All calls ended after {time.monotonic() - started:.1f}s"
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"[SUPERVISOR] Drain deadline ({timeout:g}s) hit — "
+                f"cancelling {self.active} call(s): {sorted(self._tasks.values())}"
+            )
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "accepting": self._accepting,
+            "active": self.active,
+            "started": self.started,
+            "rejected": self.rejected,
+            "calls": sorted(self._tasks.values()),
+        }
+
+
+_supervisor: CallSupervisor | None = None
+
+
+def get_call_supervisor() -> CallSupervisor:
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = CallSupervisor()
+    return _supervisor
@@ -0,0 +1,65 @@
+"""
+Per-call stage trace — where the time between "make the call" and the first
+word goes.
+
+A CallTrace records the first time each stage is reached, as milliseconds
+since the call was requested. Outbound stages, in the order they usually
+happen (the LiveKit and SIP branches of setup run concurrently):
+
+  setup_started     run_bridge() began (after queueing, room and dispatch)
+  sip_connected     TCP connection to the SIP proxy is up
+  invite_sent       INVITE written (with Authorization if a nonce was cached)
+  auth_challenged   401/407 answered with a re-INVITE (no usable nonce)
+  livekit_connected room.connect() returned
+  livekit_ready     bridge audio track published
+  ringing           first 180 / 183
+  early_media       180 / 183 with SDP: RTP path opened before answer
+  early_media_in    first packet from the far end before answer (ring-back)
+  answered          200 OK to the INVITE
+  first_rtp_in      first packet from the far end
+  first_rtp_out     first packet to the far end
+  media_ready       inbound RTP steady (the agent is told it can greet)
+
+Inbound calls (inbound_listener.py / inbound_bridge.py) trace from the moment
+the INVITE is parsed:
+
+  invite_received   INVITE framed
+  trying_sent       100 Trying written
+  admitted          passed admission control
+  ringing           port and room reserved, 180 Ringing written
+  agent_dispatched  room created and agent dispatched (cold rooms only)
+  livekit_connected / livekit_ready   as above
+  agent_joined      agent participant in the room
+  answered          200 OK written
+  first_rtp_in / first_rtp_out / media_ready   as above
+
+Wall-clock times are used so a trace started in the HTTP process can be
+continued in a media worker or the bridge service.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger("sip_bridge_v3")
+
+
+class CallTrace:
+    __slots__ = ("started_at", "stages")
+
+    def __init__(self, started_at: float | None = None):
+        self.started_at = started_at or time.time()
+        self.stages: dict[str, float] = {}
+
+    def mark(self, stage: str):
+        """Record ``stage`` now; later marks of the same stage are ignored."""
+        if stage not in self.stages:
+            self.stages[stage] = round((time.time() - self.started_at) * 1000, 1)
+
+    def as_dict(self) -> dict:
+        return {"started_at": self.started_at, "stages_ms": dict(self.stages)}
+
+    def summary(self) -> str:
+        return " ".join(
+            f"{stage}=+{ms:.0f}ms"
+            for stage, ms in sorted(self.stages.items(), key=lambda kv: kv[1])
+        )
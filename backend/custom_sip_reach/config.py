@@ -35,6 +35,12 @@ EXOTEL_FROM_DOMAIN = os.getenv("EXOTEL_FROM_DOMAIN", "lokaviveka1m.sip.exotel.co
 EXOTEL_AUTH_USERNAME = os.getenv("EXOTEL_AUTH_USERNAME")
 EXOTEL_AUTH_PASSWORD = os.getenv("EXOTEL_AUTH_PASSWORD")
 
+# Outbound calls share this many persistent TCP connections to the proxy
+# (see sip_trunk.py); 0 = each call opens its own, as before.
+SIP_TRUNK_CONNECTIONS = int(os.getenv("SIP_TRUNK_CONNECTIONS", "2"))
+# Idle trunk connections send a CRLFCRLF keep-alive this often.
+SIP_TRUNK_KEEPALIVE_SECONDS = float(os.getenv("SIP_TRUNK_KEEPALIVE_SECONDS", "30"))
+
 # ─────────────────────────────────────────────────────────────────────────────
 # LiveKit Configuration
 # ─────────────────────────────────────────────────────────────────────────────
@@ -57,12 +63,75 @@ RTP_PORT_END = int(
     os.getenv("SIP_BRIDGE_PORT_RANGE_END", os.getenv("RTP_PORT_END", "31100"))
 )  # 50 simultaneous calls max
 
+# A released port pair is not reused for this long, so RTP the previous far
+# end keeps sending after BYE cannot reach the next call on that port.
+RTP_PORT_COOLDOWN_SECONDS = float(os.getenv("SIP_BRIDGE_PORT_COOLDOWN_SECONDS", "15"))
+# A pair found bound by another process is skipped for this long.
+RTP_PORT_RETRY_SECONDS = float(os.getenv("SIP_BRIDGE_PORT_RETRY_SECONDS", "60"))
+
+# Optional mux mode: when set, every call shares one RTP socket on this port
+# (and RTCP on port + 1) instead of taking a port pair from the pool above.
+RTP_MUX_PORT = int(os.getenv("SIP_BRIDGE_MUX_PORT", "0"))
+
+# Media worker processes for outbound calls (0 = run calls in this process).
+# The signalling process keeps the first SIP_BRIDGE_INBOUND_PORT_PAIRS pairs of
+# the port range above for inbound calls and the workers split the rest
+# evenly. Unset (-1), inbound gets an equal share while INBOUND_SIP_LISTEN is
+# on and none while it is off. In mux mode worker i uses
+# SIP_BRIDGE_MUX_PORT + 2 * (i + 1).
+MEDIA_WORKERS = int(os.getenv("SIP_BRIDGE_MEDIA_WORKERS", "0"))
+MEDIA_INBOUND_PORT_PAIRS = int(os.getenv("SIP_BRIDGE_INBOUND_PORT_PAIRS", "-1"))
+
 RTP_HEADER_SIZE = 12
 PCMU_PAYLOAD_TYPE = 0
 PCMA_PAYLOAD_TYPE = 8
 SAMPLE_RATE_SIP = 8000
-SAMPLE_RATE_LK = 48000
-MAX_FRAME_BUFFER = 300  # ~6 seconds of 20ms frames
+
+# LiveKit-side rate of the bridge track and of the AudioStream the bridge reads
+# the agent from. "wideband" (default) publishes a 48 kHz track with
+# PolyphaseResampler in between; "narrowband" (opt-in) keeps LiveKit at the SIP
+# rate, so the bridge does no resampling in Python at all (libwebrtc converts
+# to/from Opus natively).
+BRIDGE_AUDIO_PROFILE = os.getenv("SIP_BRIDGE_AUDIO_PROFILE", "wideband").lower()
+SAMPLE_RATE_LK = SAMPLE_RATE_SIP if BRIDGE_AUDIO_PROFILE == "narrowband" else 48000
+RTP_PTIME_MS = 20  # SDP advertises a=ptime:20
+RTP_RX_SLOT_BYTES = 1536  # one receive-ring slot; larger than any G.711 datagram
+RTP_RX_MAX_DRAIN = 64  # datagrams read per reader wakeup before yielding
+
+# Inbound audio per AudioSource.capture_frame() call. 20 = one packet per
+# frame; 40/60 coalesce packets, cutting playout wakeups and FFI calls at the
+# cost of one extra ptime of latency per coalesced packet.
+RTP_CAPTURE_FRAME_MS = int(os.getenv("RTP_CAPTURE_FRAME_MS", "20"))
+
+# Outbound playout queue bound. Agent audio arrives in real time, so this only
+# fills before answer or during a loop stall; beyond it the oldest audio is
+# dropped rather than delaying everything the agent says afterwards.
+RTP_PLAYOUT_MAX_MS = int(os.getenv("RTP_PLAYOUT_MAX_MS", "400"))
+
+# Early media (SDP in a 180/183): until answer, one silence packet this often
+# keeps our NAT binding open and lets the far end latch onto our address.
+RTP_EARLY_KEEPALIVE_MS = int(os.getenv("RTP_EARLY_KEEPALIVE_MS", "200"))
+
+# Phone audio is often very quiet after G.711 decode — linear gain applied
+# to inbound audio (folded into the decode table, so it costs nothing per packet).
+INBOUND_AUDIO_GAIN = float(os.getenv("SIP_INBOUND_AUDIO_GAIN", "3.0"))
+
+# Inbound jitter buffer: depth adapts between MIN and MAX from measured jitter;
+# anything beyond MAX_LATENCY is discarded oldest-first.
+JITTER_MIN_DELAY_MS = int(os.getenv("RTP_JITTER_MIN_DELAY_MS", "40"))
+JITTER_MAX_DELAY_MS = int(os.getenv("RTP_JITTER_MAX_DELAY_MS", "200"))
+JITTER_MAX_LATENCY_MS = int(os.getenv("RTP_JITTER_MAX_LATENCY_MS", "300"))
+
+# "media_ready" is sent to the agent once this many consecutive inbound
+# packets arrive within MEDIA_READY_JITTER_MS of their RTP timestamp spacing,
+# i.e. the far end's audio is really flowing; the agent then greets.
+MEDIA_READY_PACKETS = int(os.getenv("MEDIA_READY_PACKETS", "5"))
+MEDIA_READY_JITTER_MS = float(os.getenv("MEDIA_READY_JITTER_MS", "15"))
+
+# RTCP on RTP port + 1: SR/RR every RTCP_INTERVAL_SECONDS (randomised ±50%),
+# giving per-call loss, jitter, RTT and a MOS estimate.
+RTCP_ENABLED = os.getenv("RTCP_ENABLED", "true").lower() in ("1", "true", "yes")
+RTCP_INTERVAL_SECONDS = float(os.getenv("RTCP_INTERVAL_SECONDS", "5"))
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Timeout Configuration
@@ -75,6 +144,42 @@ INBOUND_SIP_LISTEN = os.getenv("INBOUND_SIP_LISTEN", "true").lower() in (
     "true",
     "yes",
 )
+# An inbound INVITE is answered (200 OK) once the agent has joined the room;
+# past this it is answered anyway, as it was before agents were waited for.
+INBOUND_AGENT_JOIN_TIMEOUT_SECONDS = float(
+    os.getenv("INBOUND_AGENT_JOIN_TIMEOUT_SECONDS", "15")
+)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Call Lifecycle
+# ─────────────────────────────────────────────────────────────────────────────
+
+# On shutdown, new calls are refused (HTTP 503 / SIP 503 with Retry-After)
+# and active calls get this long to finish before they are torn down.
+CALL_DRAIN_TIMEOUT_SECONDS = float(os.getenv("CALL_DRAIN_TIMEOUT_SECONDS", "120"))
+DRAIN_RETRY_AFTER_SECONDS = int(os.getenv("DRAIN_RETRY_AFTER_SECONDS", "30"))
+
+# host:port of the standalone bridge service (python -m custom_sip_reach).
+# When set, HTTP workers hand calls to it
+# instead of running SIP signalling and media themselves.
+BRIDGE_SERVICE_ADDR = os.getenv("SIP_BRIDGE_SERVICE_ADDR", "")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Admission Control
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Calls are admitted against the RTP port range (per slice with media
+# workers; unlimited in mux mode) and these optional limits (0 = no limit).
+MAX_CONCURRENT_CALLS = int(os.getenv("SIP_BRIDGE_MAX_CONCURRENT_CALLS", "0"))
+# Concurrent jobs the LiveKit agent worker fleet can take.
+AGENT_WORKER_CAPACITY = int(os.getenv("AGENT_WORKER_CAPACITY", "0"))
+# Refuse new calls while the 1-min load average per core is above this.
+ADMISSION_MAX_LOAD = float(os.getenv("ADMISSION_MAX_LOAD", "1.0"))
+# Outbound requests over capacity wait in a FIFO queue of this size, each
+# for at most ADMISSION_MAX_WAIT_SECONDS; beyond that they get HTTP 429.
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "20"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "10"))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1,29 +1,48 @@
 """
 SIP Digest Authentication helper.
 
-Implements RFC 2617 digest-auth calculation for SIP INVITE challenges.
+Implements RFC 2617 digest-auth calculation for SIP INVITE challenges, and
+a per-process credential cache so later INVITEs carry Authorization up
+front instead of drawing a 401/407 first:
+
+  • the cache keeps, per realm, the last challenge's nonce / opaque / qop
+    and a nonce count that goes up with every request signed with it
+  • authorize() signs a new request with the most recent realm's nonce;
+    challenge() stores a fresh challenge and signs the retry
+  • a 401/407 with stale=true just means the nonce has expired — the
+    client answers it and the cache moves on to the new nonce
 """
 
 import hashlib
 import re
 import uuid
 
+_PARAM = re.compile(r'(\w+)\s*=\s*(?:"([^"]*)"|([^\s,]+))')
+
+
+def parse_challenge(auth_header: str) -> dict:
+    """WWW-Authenticate / Proxy-Authenticate parameters, names lower-cased."""
+    _, _, rest = auth_header.partition(" ")
+    return {k.lower(): quoted or bare for k, quoted, bare in _PARAM.findall(rest)}
+
+
+def is_stale(auth_header: str) -> bool:
+    """The challenge only says the nonce has expired (RFC 2617 §3.2.1)."""
+    return parse_challenge(auth_header).get("stale", "").lower() == "true"
 
-def calculate_digest_auth(method, uri, username, password, auth_header):
-    """Build an Authorization / Proxy-Authorization header value."""
-    params = {}
-    for k, v in re.findall(r'(\w+)="?([^",]+)"?', auth_header.split(" ", 1)[1]):
-        params[k] = v
 
+def _sign(method, uri, username, password, params: dict, nc: int = 1) -> str:
     realm, nonce = params.get("realm"), params.get("nonce")
-    opaque, qop = params.get("opaque"), params.get("qop")
+    opaque = params.get("opaque")
+    # qop may offer a list ("auth,auth-int"); only auth is supported
+    qop = "auth" if "auth" in (params.get("qop") or "").replace(" ", "").split(",") else None
     algo = params.get("algorithm", "MD5").upper()
 
     ha1 = hashlib.md5(f"{username}:{realm}:{password}".encode()).hexdigest()
     ha2 = hashlib.md5(f"{method}:{uri}".encode()).hexdigest()
 
     if qop == "auth":
-        nc, cnonce = "00000001", uuid.uuid4().hex[:8]
+        nc, cnonce = f"{nc:08x}", uuid.uuid4().hex[:8]
         resp = hashlib.md5(
             f"{ha1}:{nonce}:{nc}:{cnonce}:{qop}:{ha2}".encode()
         ).hexdigest()
@@ -36,3 +55,75 @@ def calculate_digest_auth(method, uri, username, password, auth_header):
         s = f'Digest username="{username}", realm="{realm}", nonce="{nonce}", uri="{uri}", response="{resp}", algorithm={algo}'
 
     return s + (f', opaque="{opaque}"' if opaque else "")
+
+
+def calculate_digest_auth(method, uri, username, password, auth_header):
+    """Build an Authorization / Proxy-Authorization header value."""
+    return _sign(method, uri, username, password, parse_challenge(auth_header))
+
+
+class _Nonce:
+    __slots__ = ("params", "proxy", "nc")
+
+    def __init__(self, params: dict, proxy: bool):
+        self.params = params
+        self.proxy = proxy  # 407 / Proxy-Authorization
+        self.nc = 0
+
+
+class DigestCredentialCache:
+    """Last nonce per realm, reused for pre-emptive Authorization."""
+
+    def __init__(self):
+        self._realms: dict[str, _Nonce] = {}
+        self._last_realm: str | None = None
+        self.preemptive = 0
+        self.challenges = 0
+        self.stale = 0
+
+    def authorize(self, method: str, uri: str, username: str, password: str):
+        """(header value, proxy) for a new request, or None before the first
+        challenge."""
+        entry = self._realms.get(self._last_realm)
+        if entry is None:
+            return None
+        entry.nc += 1
+        self.preemptive += 1
+        return _sign(method, uri, username, password, entry.params, entry.nc), entry.proxy
+
+    def challenge(self, method: str, uri: str, username: str, password: str,
+                  auth_header: str, proxy: bool) -> str:
+        """Store the challenge in a 401/407 and sign the retry with it."""
+        params = parse_challenge(auth_header)
+        if is_stale(auth_header):
+            self.stale += 1
+        else:
+            self.challenges += 1
+        realm = params.get("realm", "")
+        entry = self._realms[realm] = _Nonce(params, proxy)
+        self._last_realm = realm
+        entry.nc = 1
+        return _sign(method, uri, username, password, params, entry.nc)
+
+    def forget(self):
+        """Drop every nonce (credentials were refused outright)."""
+        self._realms.clear()
+        self._last_realm = None
+
+    def stats(self) -> dict:
+        return {
+            "realms": list(self._realms),
+            "preemptive": self.preemptive,
+            "challenges": self.challenges,
+            "stale": self.stale,
+        }
+
+
+_cache: DigestCredentialCache | None = None
+
+
+def get_digest_cache() -> DigestCredentialCache:
+    global _cache
+    if _cache is None:
+        _cache = DigestCredentialCache()
+    return _cache
@@ -0,0 +1,130 @@
+"""
+Fuzz the SIP framer (sip_message.py) with the sample messages in sip_corpus/.
+
+For every corpus file, and for random concatenations of them (pipelined
+signalling), it checks that:
+  • feeding the stream in random-sized chunks yields exactly the messages a
+    single feed() does — same start lines, headers and bodies;
+  • get() (a search of the raw header block) agrees with the first value
+    of get_all() (the full header index), and no value keeps a CR or LF;
+  • the multi-value headers in the corpus come out whole (every Via and
+    Record-Route, compact forms, folded lines);
+and for mutated streams (bit flips, truncation, spliced and random bytes)
+that nothing but SipFramingError escapes feed() or the header accessors.
+
+Usage:
+    python -m custom_sip_reach.fuzz_sip_framer --iterations 20000 --seed 1
+"""
+
+import argparse
+import pathlib
+import random
+
+from .sip_message import SipFramer, SipFramingError
+
+CORPUS = pathlib.Path(__file__).with_name("sip_corpus")
+
+# file → (header, expected number of values)
+_EXPECT = {
+    "invite_sdp.sip": [("via", 2), ("record-route", 2), ("content-type", 1)],
+    "ok_multi_via_rr.sip": [("via", 2), ("record-route", 3), ("contact", 1)],
+    "compact_folded.sip": [("via", 1), ("call-id", 1), ("content-length", 1)],
+    "options_no_length.sip": [("content-length", 0)],
+}
+
+_LOOKUPS = ("via", "record-route", "call-id", "cseq", "to", "from", "content-length", "contact")
+
+
+def _load() -> dict[str, bytes]:
+    return {p.name: p.read_bytes() for p in sorted(CORPUS.glob("*.sip"))}
+
+
+def _snapshot(messages) -> list[tuple]:
+    return [
+        (m.start_line, sorted((k, tuple(v)) for k, v in m._headers().items()), m.body)
+        for m in messages
+    ]
+
+
+def _feed_chunked(data: bytes, rng: random.Random) -> list:
+    framer, out, i = SipFramer(), [], 0
+    while i < len(data):
+        n = rng.choice((1, 2, 3, 4, 7, 64, 512, 4096))
+        out += framer.feed(data[i : i + n])
+        i += n
+    return out
+
+
+def _mutate(data: bytes, rng: random.Random) -> bytes:
+    buf = bytearray(data)
+    for _ in range(rng.randint(1, 8)):
+        op = rng.randrange(5)
+        pos = rng.randrange(len(buf) + 1)
+        if op == 0 and buf:
+            buf[pos % len(buf)] ^= 1 << rng.randrange(8)
+        elif op == 1:
+            del buf[pos : pos + rng.randint(1, 64)]
+        elif op == 2:
+            buf[pos:pos] = rng.choice((b"\r\n", b"\r\n\r\n", b":", b",", b" ", b"\x00", b"<"))
+        elif op == 3:
+            buf[pos:pos] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 32)))
+        else:
+            buf[pos:pos] = rng.choice((b"Content-Length: 99999999\r\n", b"l: 5\r\n", b"Via: a, b\r\n"))
+    return bytes(buf)
+
+
+def run(iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    corpus = _load()
+    if not corpus:
+        raise SystemExit(f"no corpus files in {CORPUS}")
+
+    for name, data in corpus.items():
+        messages = SipFramer().feed(data)
+        assert messages, f"{name}: no message framed"
+        for header, count in _EXPECT.get(name, ()):
+            got = len(messages[0].get_all(header))
+            assert got == count, f"{name}: {header} has {got} value(s), expected {count}"
+
+    samples = list(corpus.values())
+    stats = {"streams": 0, "messages": 0, "mutated": 0, "framing_errors": 0}
+    for _ in range(iterations):
+        stream = b"".join(rng.choice(samples) for _ in range(rng.randint(1, 5)))
+        expected = _snapshot(SipFramer().feed(stream))
+        got = _snapshot(_feed_chunked(stream, rng))
+        assert got == expected, f"chunked feed differs (seed={seed})"
+        for msg in SipFramer().feed(stream):
+            for header in _LOOKUPS:
+                first = (msg.get_all(header) or [None])[0]
+                assert msg.get(header) == first, f"{msg!r}: get({header!r}) != get_all()[0]"
+            for values in msg._headers().values():
+                assert not any("\r" in v or "\n" in v for v in values), f"{msg!r}: CR/LF in a value"
+        stats["streams"] += 1
+        stats["messages"] += len(expected)
+
+        mutated = _mutate(stream, rng)
+        try:
+            for msg in _feed_chunked(mutated, rng):
+                msg.get_all("via"), msg.get("call-id"), msg.cseq_method, msg.tag("to")
+                msg.body_text
+        except SipFramingError:
+            stats["framing_errors"] += 1
+        stats["mutated"] += 1
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    stats = run(args.iterations, args.seed)
+    print(
+        f"OK: {stats['streams']} streams ({stats['messages']} messages) framed identically "
+        f"in random chunks; {stats['mutated']} mutated streams, "
+        f"{stats['framing_errors']} rejected with SipFramingError"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+G.711 codec (PCMA / PCMU) built on precomputed NumPy lookup tables.
+
+Replaces the deprecated ``audioop`` module (removed in Python 3.13):
+  • Decode: one 256-entry int16 table per law, indexed by the payload bytes
+  • Encode: one 65536-entry uint8 table per law, indexed by the raw 16-bit sample
+  • Both directions are a single vectorised table lookup per packet
+
+The tables are bit-exact with ``audioop.alaw2lin`` / ``ulaw2lin`` /
+``lin2alaw`` / ``lin2ulaw``.
+"""
+
+import numpy as np
+
+from .config import PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Table construction (runs once at import)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _build_alaw_decode() -> np.ndarray:
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    t = (a & 0x0F) << 4
+    seg = (a & 0x70) >> 4
+    t = np.where(seg == 0, t + 8, t + 0x108)
+    t = np.where(seg > 1, t << np.maximum(seg - 1, 0), t)
+    return np.where(a & 0x80, t, -t).astype(np.int16)
+
+
+def _build_ulaw_decode() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + 0x84) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+
+def _segment(mag: np.ndarray, seg_end: tuple[int, ...]) -> np.ndarray:
+    return np.searchsorted(np.array(seg_end), mag, side="left")
+
+
+def _build_alaw_encode() -> np.ndarray:
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    mag = np.where(pcm >= 0, pcm, -pcm - 1)
+    seg = _segment(mag, (0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF))
+    shift = np.where(seg < 2, 1, seg)
+    aval = (np.minimum(seg, 7) << 4) | ((mag >> shift) & 0x0F)
+    aval = np.where(seg >= 8, 0x7F, aval)
+    return _index_by_uint16((aval ^ mask).astype(np.uint8))
+
+
+def _build_ulaw_encode() -> np.ndarray:
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(pcm), 8159) + (0x84 >> 2)
+    seg = _segment(mag, (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF))
+    uval = (np.minimum(seg, 7) << 4) | ((mag >> (np.minimum(seg, 7) + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return _index_by_uint16((uval ^ mask).astype(np.uint8))
+
+
+def _index_by_uint16(table_by_value: np.ndarray) -> np.ndarray:
+    """Reorder a table built over -32768..32767 so it is indexed by the
+    sample's bit pattern viewed as uint16 (0..32767, then -32768..-1)."""
+    return np.roll(table_by_value, -32768)
+
+
+ALAW_DECODE = _build_alaw_decode()
+ULAW_DECODE = _build_ulaw_decode()
+ALAW_ENCODE = _build_alaw_encode()
+ULAW_ENCODE = _build_ulaw_encode()
+
+SILENCE_BYTE = {PCMA_PAYLOAD_TYPE: 0xD5, PCMU_PAYLOAD_TYPE: 0xFF}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Codec
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class G711Codec:
+    """Vectorised G.711 encoder/decoder for a single payload type."""
+
+    def __init__(self, payload_type: int, gain: float = 1.0):
+        """
+        payload_type : PCMA_PAYLOAD_TYPE (8) or PCMU_PAYLOAD_TYPE (0).
+        gain         : Linear gain folded into the decode table (clipped to int16).
+        """
+        if payload_type == PCMA_PAYLOAD_TYPE:
+            decode, encode = ALAW_DECODE, ALAW_ENCODE
+        elif payload_type == PCMU_PAYLOAD_TYPE:
+            decode, encode = ULAW_DECODE, ULAW_ENCODE
+        else:
+            raise ValueError(f"Unsupported G.711 payload type: {payload_type}")
+
+        self.payload_type = payload_type
+        self.silence_byte = SILENCE_BYTE[payload_type]
+        if gain != 1.0:
+            decode = np.clip(
+                np.rint(decode.astype(np.float64) * gain), -32768, 32767
+            ).astype(np.int16)
+        self._decode = decode
+        self._encode = encode
+
+    def decode(self, payload, out: np.ndarray | None = None) -> np.ndarray:
+        """G.711 bytes → int16 PCM. ``payload`` may be any bytes-like object."""
+        idx = np.frombuffer(payload, dtype=np.uint8)
+        if out is None:
+            return self._decode[idx]
+        return np.take(self._decode, idx, out=out)
+
+    def encode(self, pcm, out: np.ndarray | None = None) -> np.ndarray:
+        """int16 PCM (ndarray or bytes-like) → G.711 bytes as a uint8 array."""
+        if not isinstance(pcm, np.ndarray):
+            pcm = np.frombuffer(pcm, dtype=np.int16)
+        if out is None:
+            return self._encode[pcm.view(np.uint16)]
+        return np.take(self._encode, pcm.view(np.uint16), out=out)
@@ -0,0 +1,117 @@
+"""
+Hang-up detection for a bridged call — one wait over every end-of-call signal.
+
+wait_for_hangup() resolves as soon as the first of these fires, with its
+reason string:
+  • "livekit_disconnected"   — room "disconnected" event
+  • "sip_bye_outbound_tcp"   — BYE on the INVITE's own TCP connection
+  • "sip_bye_inbound_tcp"    — BYE on the inbound listener (register_call_id)
+  • "no_rtp_after_answer"    — no RTP at all N s after answer
+  • "rtp_silence_after_flow" — RTP was flowing, then stopped for N s
+
+Nothing polls: the RTP checks are loop timers scheduled for the nearer of the
+two deadlines (no media since answer, silence since the last packet) and
+re-armed from the last packet time when media has arrived since — a few
+wakeups per timeout period, not one per second.
+"""
+
+import asyncio
+import logging
+
+from livekit import rtc
+
+from .rtp_bridge import RTPMediaBridge
+
+logger = logging.getLogger("sip_bridge_v3")
+
+
+async def wait_for_hangup(
+    room: rtc.Room,
+    rtp_bridge: RTPMediaBridge,
+    *,
+    sip_monitor: asyncio.Task | None = None,
+    inbound_bye: asyncio.Event | None = None,
+    no_rtp_timeout: float = 0,
+    silence_timeout: float = 0,
+    tag: str = "BRIDGE",
+) -> str:
+    """Wait for the call to end and return why. Timeouts of 0 disable the
+    corresponding RTP check; ``no_rtp_timeout`` counts from now (answer)."""
+    loop = asyncio.get_running_loop()
+    ended: asyncio.Future[str] = loop.create_future()
+    timer: asyncio.TimerHandle | None = None
+    bye_waiter: asyncio.Task | None = None
+
+    def fire(reason: str):
+        if not ended.done():
+            ended.set_result(reason)
+
+    def on_disconnected(*_args):
+        fire("livekit_disconnected")
+
+    def no_rtp_delay() -> float:
+        """Time to the next check while no RTP has arrived yet: the no-RTP
+        deadline, or sooner so that media starting (and stopping) before it
+        is caught by the silence check on time."""
+        delay = silence_timeout if silence_timeout > 0 else float("inf")
+        if no_rtp_timeout > 0:
+            delay = min(delay, no_rtp_timeout - (loop.time() - answered_at))
+        return delay
+
+    def check_rtp():
+        nonlocal timer
+        timer = None
+        since_rx = rtp_bridge.seconds_since_rx()
+        if since_rx is None:
+            if no_rtp_timeout > 0 and loop.time() - answered_at >= no_rtp_timeout:
+                logger.error(
+                    "[RTP] No inbound RTP after %ss — call never connected, ending",
+                    no_rtp_timeout,
+                )
+                fire("no_rtp_after_answer")
+                return
+            # Silence detection only starts once media has flowed
+            arm(no_rtp_delay())
+            return
+        if silence_timeout <= 0:
+            return
+        if since_rx >= silence_timeout:
+            logger.info(
+                "[RTP] No audio for %.1fs (threshold=%ss) — caller hung up",
+                since_rx,
+                silence_timeout,
+            )
+            fire("rtp_silence_after_flow")
+            return
+        arm(silence_timeout - since_rx)
+
+    def arm(delay: float):
+        nonlocal timer
+        if not ended.done():
+            timer = loop.call_later(max(0.0, delay), check_rtp)
+
+    room.on("disconnected", on_disconnected)
+    try:
+        if room.connection_state != rtc.ConnectionState.CONN_CONNECTED:
+            fire("livekit_disconnected")
+        if sip_monitor is not None:
+            sip_monitor.add_done_callback(lambda _t: fire("sip_bye_outbound_tcp"))
+        if inbound_bye is not None:
+            bye_waiter = asyncio.create_task(inbound_bye.wait())
+            bye_waiter.add_done_callback(
+                lambda t: t.cancelled() or fire("sip_bye_inbound_tcp")
+            )
+        answered_at = loop.time()
+        if no_rtp_timeout > 0 or silence_timeout > 0:
+            arm(no_rtp_delay())
+
+        reason = await ended
+        if reason.startswith(("livekit", "sip_bye")):
+            logger.info(f"[{tag}] Hang-up signal: {reason}")
+        return reason
+    finally:
+        room.off("disconnected", on_disconnected)
+        if timer is not None:
+            timer.cancel()
+        if bye_waiter is not None and not bye_waiter.done():
+            bye_waiter.cancel()
@@ -1,12 +1,21 @@
 """
 Main inbound bridge orchestrator — handles incoming SIP INVITEs from Exotel,
 wires up RTP, and connects an agent via LiveKit.
+
+The INVITE has had its 100 Trying from the listener already. Here:
+  1. Reserve the call's RTP port and room → 180 Ringing
+  2. Create the room and agent dispatch (cold rooms), connect to LiveKit,
+     publish the SIP audio track
+  3. Wait for the agent to join → 200 OK, so the caller is answered by
+     someone who can speak
+Stage timings are recorded on the INVITE's CallTrace (see call_trace.py) and
+logged when the call ends. A failure before the answer gets a final error
+response instead of leaving the INVITE unanswered.
 """
 
 import asyncio
 import json
 import logging
-import time
 import uuid
 
 from livekit import rtc
@@ -19,18 +28,43 @@ from .config import (
     LK_API_KEY,
     LK_API_SECRET,
     LK_URL,
+    INBOUND_AGENT_JOIN_TIMEOUT_SECONDS,
     RTP_SILENCE_TIMEOUT_SECONDS,
     validate_config,
 )
-from .inbound_listener import register_call_id, unregister_call_id
+from .hangup import wait_for_hangup
+from .inbound_listener import InboundInvite, register_call_id, unregister_call_id
+from .media_mux import get_media_mux
 from .port_pool import get_port_pool
 from .rtp_bridge import RTPMediaBridge
+from .sip_message import SipMessage
 
 logger = logging.getLogger("sip_bridge_v3")
 
 
+async def _wait_for_agent(room: rtc.Room, timeout: float) -> bool:
+    """True once an agent participant is in the room (a warm room's already
+    is), False after ``timeout`` seconds without one."""
+    joined = asyncio.Event()
+
+    def on_participant(participant: rtc.RemoteParticipant):
+        if participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
+            joined.set()
+
+    room.on("participant_connected", on_participant)
+    try:
+        for participant in room.remote_participants.values():
+            on_participant(participant)
+        await asyncio.wait_for(joined.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        room.off("participant_connected", on_participant)
+
+
 async def handle_inbound_call(
-    hdrs: dict,
+    hdrs: SipMessage,
     raw_invite: bytes,
     sdp_body: str,
     writer: asyncio.StreamWriter,
@@ -41,9 +75,12 @@ async def handle_inbound_call(
     cseq: str,
     via_headers: list[str],
     record_routes: list[str],
+    invite: InboundInvite,
 ):
+    trace = invite.trace
     if not validate_config():
         logger.error("[INBOUND] Config validation failed")
+        await invite.respond("500 Server Internal Error")
         return
 
     # Extract remote RTP endpoint from Exotel's SDP
@@ -61,6 +98,7 @@ async def handle_inbound_call(
         logger.error(
             f"[INBOUND] Failed to extract RTP info from SDP. call-id={call_id}"
         )
+        await invite.respond("488 Not Acceptable Here")
         return
 
     phone_number = "Unknown"
@@ -73,56 +111,62 @@ async def handle_inbound_call(
     logger.info(f"[INBOUND] call-id={call_id} phone={phone_number}")
     agent_type = get_agent_for_number(phone_number)
 
-    # agent_session.py expects room_name to start with {agent_type}-...
-    room_name = f"{agent_type}-inbound-{phone_number[-4:] if len(phone_number) >= 4 else phone_number}-{uuid.uuid4().hex[:6]}"
+    room_metadata = {"call_type": "inbound", "agent": agent_type, "phone": phone_number, "trunk": "exotel"}
+    from services.room_pool import PHONE, get_room_pool
 
     pool = get_port_pool()
-    port = await pool.acquire()
-    logger.info(
-        f"[INBOUND] call-id={call_id} phone={phone_number} room={room_name} rtp_port={port}"
-    )
-
-    try:
-        from services.lvk_services import create_room, create_agent_dispatch
-        room_metadata = {"call_type": "inbound", "agent": agent_type, "phone": phone_number, "trunk": "exotel"}
-        await create_room(room_name=room_name, agent=agent_type, empty_timeout=60, max_participants=3, metadata=room_metadata)
-        dispatch_metadata = {"agent": agent_type, "phone": phone_number, "call_type": "inbound"}
-        logger.info(f"[INBOUND] Creating dispatch for agent {agent_type} in room {room_name}")
-        await create_agent_dispatch(room=room_name, agent_name="vyom_demos", metadata=dispatch_metadata)
-    except Exception as e:
-        logger.error(f"[INBOUND] Failed to create room/dispatch: {e}")
-
+    mux = get_media_mux()
+    room_name = None
+    warm = False
+    port = None
     rtp_bridge = None
     forward_task = None
+    media_task = None
     inbound_bye = None
     room = rtc.Room()
 
-    def build_200_ok() -> bytes:
-        from .sip_client import ExotelSipClient
+    # 180 and 200 both set up the dialog (RFC 3261 §12.1.1)
+    dialog_headers = [f"Record-Route: {rr}" for rr in record_routes]
+    dialog_headers += [
+        "Supported: 100rel, timer, replaces",
+        "Allow: INVITE, ACK, CANCEL, BYE, OPTIONS, UPDATE",
+        f"Contact: <sip:{EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};transport=tcp>",
+    ]
 
-        sdp = ExotelSipClient._generate_sdp(port)
-        h = ["SIP/2.0 200 OK"]
-        for via in via_headers:
-            h.append(f"Via: {via}")
-        for rr in record_routes:
-            h.append(f"Record-Route: {rr}")
-        h.append(f"From: {from_header}")
-        h.append(f"To: {to_header};tag=inbound-{port}-{uuid.uuid4().hex[:4]}")
-        h.append(f"Call-ID: {call_id}")
-        h.append(f"CSeq: {cseq}")
-        h.append("Supported: 100rel, timer, replaces")
-        h.append("Allow: INVITE, ACK, CANCEL, BYE, OPTIONS, UPDATE")
-        h.append(
-            f"Contact: <sip:{EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};transport=tcp>"
+    try:
+        # A warm room already has its agent connected; otherwise create one below
+        room_name = get_room_pool().take(agent_type, PHONE, room_metadata)
+        warm = room_name is not None
+        if not warm:
+            # agent_session.py expects room_name to start with {agent_type}-...
+            room_name = f"{agent_type}-inbound-{phone_number[-4:] if len(phone_number) >= 4 else phone_number}-{uuid.uuid4().hex[:6]}"
+
+        port = mux.port if mux else await pool.acquire()
+        logger.info(
+            f"[INBOUND] call-id={call_id} phone={phone_number} room={room_name} rtp_port={port}"
+            + (" (warm)" if warm else "")
         )
-        h.append("Content-Type: application/sdp")
-        h.append(f"Content-Length: {len(sdp.encode())}")
 
-        return ("\r\n".join(h) + "\r\n\r\n" + sdp).encode()
+        # Admitted, with a port and a room: the caller hears ringing while
+        # the room, the agent and LiveKit come up
+        await invite.respond("180 Ringing", extra=dialog_headers)
+        trace.mark("ringing")
+
+        if not warm:
+            try:
+                from services.lvk_services import create_room, create_agent_dispatch
+                await create_room(room_name=room_name, agent=agent_type, empty_timeout=60, max_participants=3, metadata=room_metadata)
+                dispatch_metadata = {"agent": agent_type, "phone": phone_number, "call_type": "inbound"}
+                logger.info(f"[INBOUND] Creating dispatch for agent {agent_type} in room {room_name}")
+                await create_agent_dispatch(room=room_name, agent_name="vyom_demos", metadata=dispatch_metadata)
+                trace.mark("agent_dispatched")
+            except Exception as e:
+                logger.error(f"[INBOUND] Failed to create room/dispatch: {e}")
 
-    try:
         inbound_bye = register_call_id(call_id)
-        rtp_bridge = RTPMediaBridge(public_ip=EXOTEL_MEDIA_IP, bind_port=port)
+        rtp_bridge = RTPMediaBridge(
+            public_ip=EXOTEL_MEDIA_IP, bind_port=port, mux=mux, trace=trace
+        )
 
         @room.on("track_subscribed")
         def on_track(track, publication, participant):
@@ -147,17 +191,30 @@ async def handle_inbound_call(
             .to_jwt()
         )
         await room.connect(LK_URL, token)
+        trace.mark("livekit_connected")
         logger.info(f"[INBOUND] LiveKit connected: {room_name}")
         await rtp_bridge.start_inbound(room)
+        trace.mark("livekit_ready")
+
+        if await _wait_for_agent(room, INBOUND_AGENT_JOIN_TIMEOUT_SECONDS):
+            trace.mark("agent_joined")
+        else:
+            logger.warning(
+                f"[INBOUND] No agent in {room_name} after "
+                f"{INBOUND_AGENT_JOIN_TIMEOUT_SECONDS:g}s — answering anyway"
+            )
 
         # Set remote endpoint from what Exotel sent us
         rtp_bridge.set_remote_endpoint(remote_ip, remote_port, pt)
 
-        # Send 200 OK Response
-        resp_200 = build_200_ok()
-        logger.info("[INBOUND] Sending 200 OK ->")
-        writer.write(resp_200)
-        await writer.drain()
+        from .sip_client import ExotelSipClient
+
+        await invite.respond(
+            "200 OK",
+            extra=dialog_headers + ["Content-Type: application/sdp"],
+            body=ExotelSipClient._generate_sdp(port),
+        )
+        trace.mark("answered")
 
         # Let agent know call is connected
         try:
@@ -167,36 +224,41 @@ async def handle_inbound_call(
             )
         except Exception as e:
             logger.error(f"[INBOUND] Failed to publish call_answered event: {e}")
+        from .bridge import announce_media_ready
 
-        # Watch for BYE and RTP Silence
-        disconnect_reason = "unknown"
-        while True:
-            if room.connection_state != rtc.ConnectionState.CONN_CONNECTED:
-                disconnect_reason = "livekit_disconnected"
-                break
-
-            if inbound_bye and inbound_bye.is_set():
-                disconnect_reason = "sip_bye_inbound_tcp"
-                break
-
-            since_rx = rtp_bridge.seconds_since_rx()
-
-            if (
-                since_rx is not None
-                and RTP_SILENCE_TIMEOUT_SECONDS > 0
-                and since_rx > RTP_SILENCE_TIMEOUT_SECONDS
-            ):
-                disconnect_reason = "rtp_silence_after_flow"
-                break
-
-            await asyncio.sleep(1)
+        media_task = asyncio.create_task(announce_media_ready(room, rtp_bridge, "INBOUND"))
 
+        # Watch for BYE and RTP Silence
+        disconnect_reason = await wait_for_hangup(
+            room,
+            rtp_bridge,
+            inbound_bye=inbound_bye,
+            silence_timeout=RTP_SILENCE_TIMEOUT_SECONDS,
+            tag="INBOUND",
+        )
         logger.info(f"[INBOUND] Call ended — reason={disconnect_reason}")
 
     except Exception as e:
         logger.error(f"[INBOUND] Error: {e}", exc_info=True)
 
     finally:
+        if invite.final_status is None:
+            # Setup failed (or was cancelled) before the answer; without a
+            # media port (pool exhausted) it is a capacity problem
+            try:
+                await invite.respond(
+                    "500 Server Internal Error" if port is not None
+                    else "503 Service Unavailable"
+                )
+            except Exception:
+                pass
+        if warm and port is None:
+            # Nobody joined the warm room; the next call can have it
+            get_room_pool().give_back(agent_type, PHONE, room_name)
+        logger.info(f"[INBOUND] Stage trace ({phone_number}): {trace.summary()}")
+
+        if media_task:
+            media_task.cancel()
         if forward_task:
             forward_task.cancel()
             try:
@@ -208,6 +270,7 @@ async def handle_inbound_call(
             rtp_bridge.stop()
 
         await room.disconnect()
-        await pool.release(port)
-        logger.info(f"[INBOUND] Port {port} released")
+        if not mux and port is not None:
+            await pool.release(port)
+            logger.info(f"[INBOUND] Port {port} released")
         unregister_call_id(call_id)
@@ -1,16 +1,31 @@
 """
-Inbound SIP TCP listener — handles BYE and OPTIONS from Exotel.
+Inbound SIP TCP listener — handles INVITE, CANCEL, BYE and OPTIONS from Exotel.
 
 When Exotel initiates a BYE on a *new* TCP connection (rather than the
 outbound INVITE connection), this listener catches it and signals the
 bridge to tear down the call.
+
+An inbound INVITE gets 100 Trying as soon as it is parsed, before admission
+or any setup; inbound_bridge.py sends 180 Ringing once the call's port and
+room are reserved and 200 OK once the agent is in the room (InboundInvite).
+A retransmitted INVITE is answered with the latest provisional instead of
+starting a second call.
 """
 
 import asyncio
 import logging
+import uuid
+from collections.abc import Callable
 
-from .config import EXOTEL_CUSTOMER_SIP_PORT, INBOUND_SIP_LISTEN
+from .admission import INBOUND, CallOverloaded, get_admission_controller
+from .call_supervisor import CallRejected, get_call_supervisor
+from .call_trace import CallTrace
+from .config import (
+    EXOTEL_CUSTOMER_SIP_PORT,
+    INBOUND_SIP_LISTEN,
+)
 from .sip_client import ExotelSipClient
+from .sip_message import SipFramer, SipMessage, render_response
 
 logger = logging.getLogger("sip_bridge_v3")
 
@@ -21,6 +36,12 @@ logger = logging.getLogger("sip_bridge_v3")
 _inbound_server: asyncio.AbstractServer | None = None
 _inbound_lock = asyncio.Lock()
 _call_registry: dict[str, asyncio.Event] = {}
+# Call-ID → inbound INVITE still waiting for its final response
+_pending_invites: dict[str, "InboundInvite"] = {}
+_listen_enabled = INBOUND_SIP_LISTEN
+# Called with the Call-ID of a BYE for a call this process does not own
+# (e.g. one running in a media worker process).
+_bye_fallback: Callable[[str], None] | None = None
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -40,6 +61,34 @@ def unregister_call_id(call_id: str):
     _call_registry.pop(call_id, None)
 
 
+def signal_bye(call_id: str) -> bool:
+    """Fire the BYE event for a registered call-ID. Returns False if unknown."""
+    event = _call_registry.get(call_id)
+    if event is None:
+        return False
+    event.set()
+    return True
+
+
+def deliver_bye(call_id: str | None):
+    """Hand a BYE to the call it ends, here or through the fallback."""
+    if call_id and not signal_bye(call_id) and _bye_fallback:
+        _bye_fallback(call_id)
+
+
+def set_bye_fallback(handler: Callable[[str], None] | None):
+    """Route BYEs for unknown call-IDs to ``handler``."""
+    global _bye_fallback
+    _bye_fallback = handler
+
+
+def disable_inbound_server():
+    """Never bind the SIP listener in this process (media workers: the
+    signalling process owns the port and relays BYEs)."""
+    global _listen_enabled
+    _listen_enabled = False
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Server lifecycle
 # ─────────────────────────────────────────────────────────────────────────────
@@ -48,7 +97,7 @@ def unregister_call_id(call_id: str):
 async def ensure_inbound_server():
     """Start the inbound SIP listener (once, idempotent)."""
     global _inbound_server
-    if not INBOUND_SIP_LISTEN:
+    if not _listen_enabled:
         return
     async with _inbound_lock:
         if _inbound_server is not None:
@@ -65,85 +114,187 @@ async def ensure_inbound_server():
             logger.error(f"[SIP-IN] Failed to bind {EXOTEL_CUSTOMER_SIP_PORT}: {e}")
 
 
+async def close_inbound_server():
+    """Stop accepting SIP connections (after the call drain has finished)."""
+    global _inbound_server
+    async with _inbound_lock:
+        if _inbound_server is None:
+            return
+        _inbound_server.close()
+        await _inbound_server.wait_closed()
+        _inbound_server = None
+        logger.info("[SIP-IN] Listener closed")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Inbound INVITE transactions
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class InboundInvite:
+    """Responses to one inbound INVITE, in order: 100 Trying (the listener),
+    180 Ringing and the final one (inbound_bridge.py). Every response after
+    the 100 carries the same To tag, so the 180 and 200 are one dialog."""
+
+    def __init__(
+        self,
+        msg: SipMessage,
+        writer: asyncio.StreamWriter,
+        via_headers: list[str],
+        trace: CallTrace,
+    ):
+        self.msg = msg
+        self.writer = writer
+        self.via_headers = via_headers
+        self.trace = trace
+        self.call_id = msg.call_id
+        self.to = f"{msg.get('to', '')};tag=inbound-{uuid.uuid4().hex[:8]}"
+        self.task: asyncio.Task | None = None  # the call, once it is set up
+        self.final_status: int | None = None
+        self._last_provisional: bytes | None = None
+
+    async def respond(
+        self,
+        status: str,
+        extra: list[str] | None = None,
+        body: str | bytes = b"",
+    ):
+        """Send a response to the INVITE; once a final one (>= 200) has gone
+        out, later calls do nothing."""
+        if self.final_status is not None:
+            return
+        code = int(status.split()[0])
+        data = render_response(
+            self.msg,
+            status,
+            self.via_headers,
+            extra,
+            body,
+            to=self.to if code > 100 else None,
+        )
+        if code < 200:
+            self._last_provisional = data
+        else:
+            self.final_status = code
+            if _pending_invites.get(self.call_id) is self:
+                del _pending_invites[self.call_id]
+        self.writer.write(data)
+        await self.writer.drain()
+        logger.info(f"[SIP-IN] → {status} call-id={self.call_id}")
+
+    async def retransmitted(self):
+        """The INVITE came again: repeat the latest provisional."""
+        if self._last_provisional and self.final_status is None:
+            self.writer.write(self._last_provisional)
+            await self.writer.drain()
+
+    def done(self):
+        """The call task has finished (or was never started)."""
+        if _pending_invites.get(self.call_id) is self:
+            del _pending_invites[self.call_id]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Connection handler
 # ─────────────────────────────────────────────────────────────────────────────
 
 
+async def _reject_invite(invite: InboundInvite, err: CallRejected):
+    why = "overloaded" if isinstance(err, CallOverloaded) else "draining"
+    logger.info(f"[SIP-IN] Rejecting ({why}) call-id={invite.call_id}")
+    await invite.respond(
+        "503 Service Unavailable", extra=[f"Retry-After: {err.retry_after}"]
+    )
+    invite.done()
+
+
 async def _handle_inbound_sip(
     reader: asyncio.StreamReader, writer: asyncio.StreamWriter
 ):
-    buf = b""
+    framer = SipFramer()
     peer = writer.get_extra_info("peername")
     try:
         while True:
             data = await reader.read(4096)
             if not data:
                 break
-            buf += data
-
-            while b"\r\n\r\n" in buf:
-                he = buf.index(b"\r\n\r\n")
-                hb = buf[:he].decode(errors="replace")
-                rest = buf[he + 4 :]
-                lines = hb.split("\r\n")
-                start = lines[0]
-                hdrs = {}
-                via_headers = []
-                record_routes = []
-                
-                for l in lines[1:]:
-                    if ":" in l:
-                        k, v = l.split(":", 1)
-                        k = k.strip().lower()
-                        v = v.strip()
-                        if k == "via":
-                            via_headers.append(v)
-                        elif k == "record-route":
-                            record_routes.append(v)
-                        else:
-                            hdrs[k] = v
-
-                cl = int(hdrs.get("content-length", "0"))
-                if len(rest) < cl:
-                    break
-                    
-                body = rest[:cl].decode(errors="replace")
-                buf = rest[cl:]
-
-                if start.startswith("BYE "):
-                    call_id = hdrs.get("call-id")
+
+            for msg in framer.feed(data):
+                # Every Via and Record-Route is kept, in order (RFC 3261 §8.2.6)
+                via_headers = msg.get_all("via")
+                call_id = msg.call_id
+                if msg.method == "BYE":
                     logger.info(f"[SIP-IN] ← BYE from {peer} call-id={call_id}")
-                    if call_id and call_id in _call_registry:
-                        _call_registry[call_id].set()
-                    writer.write(ExotelSipClient._response_200_ok(hdrs, via_headers=via_headers))
+                    deliver_bye(call_id)
+                    writer.write(ExotelSipClient._response_200_ok(msg, via_headers=via_headers))
                     await writer.drain()
                     logger.info("[SIP-IN] → 200 OK (BYE)")
-                elif start.startswith("OPTIONS "):
-                    writer.write(ExotelSipClient._response_200_ok(hdrs, via_headers=via_headers))
+                elif msg.method == "OPTIONS":
+                    writer.write(ExotelSipClient._response_200_ok(msg, via_headers=via_headers))
                     await writer.drain()
                     logger.info(f"[SIP-IN] → 200 OK (OPTIONS) from {peer}")
-                elif start.startswith("INVITE "):
-                    call_id = hdrs.get("call-id")
+                elif msg.method == "INVITE":
+                    pending = _pending_invites.get(call_id)
+                    if pending is not None:
+                        logger.info(f"[SIP-IN] ← INVITE retransmission call-id={call_id}")
+                        await pending.retransmitted()
+                        continue
                     logger.info(f"[SIP-IN] ← INVITE from {peer} call-id={call_id}")
+                    invite = InboundInvite(msg, writer, via_headers, CallTrace())
+                    invite.trace.mark("invite_received")
+                    _pending_invites[call_id] = invite
+                    # Stops Exotel's retransmission timer while the call is set up
+                    await invite.respond("100 Trying")
+                    invite.trace.mark("trying_sent")
                     from .inbound_bridge import handle_inbound_call
-                    asyncio.create_task(
-                        handle_inbound_call(
-                            hdrs=hdrs,
-                            raw_invite=hb.encode(),
-                            sdp_body=body,
-                            writer=writer,
-                            reader=reader,
-                            from_header=hdrs.get("from", ""),
-                            to_header=hdrs.get("to", ""),
-                            call_id=call_id,
-                            cseq=hdrs.get("cseq", ""),
-                            via_headers=via_headers,
-                            record_routes=record_routes,
+                    try:
+                        # Refuse before anything is reserved for the call
+                        ticket = get_admission_controller().try_admit(
+                            INBOUND, f"inbound:{call_id}"
                         )
+                    except CallRejected as e:
+                        await _reject_invite(invite, e)
+                        continue
+                    invite.trace.mark("admitted")
+                    call = handle_inbound_call(
+                        hdrs=msg,
+                        raw_invite=msg.header_block,
+                        sdp_body=msg.body_text,
+                        writer=writer,
+                        reader=reader,
+                        from_header=msg.get("from", ""),
+                        to_header=msg.get("to", ""),
+                        call_id=call_id,
+                        cseq=msg.get("cseq", ""),
+                        via_headers=via_headers,
+                        record_routes=msg.get_all("record-route"),
+                        invite=invite,
                     )
-                elif start.startswith("ACK "):
-                    call_id = hdrs.get("call-id")
+                    try:
+                        task = get_call_supervisor().track(call, f"inbound:{call_id}")
+                    except CallRejected as e:
+                        ticket.release()
+                        await _reject_invite(invite, e)
+                        continue
+                    invite.task = task
+
+                    def _on_call_done(_t, t=ticket, i=invite):
+                        t.release()
+                        i.done()
+
+                    task.add_done_callback(_on_call_done)
+                elif msg.method == "CANCEL":
+                    pending = _pending_invites.get(call_id)
+                    logger.info(f"[SIP-IN] ← CANCEL from {peer} call-id={call_id}")
+                    status = "200 OK" if pending else "481 Call/Transaction Does Not Exist"
+                    writer.write(ExotelSipClient._response(msg, status, via_headers=via_headers))
+                    await writer.drain()
+                    if pending:
+                        # The caller hung up while it was ringing
+                        await pending.respond("487 Request Terminated")
+                        if pending.task:
+                            pending.task.cancel()
+                elif msg.method == "ACK":
                     logger.info(f"[SIP-IN] ← ACK from {peer} call-id={call_id}")
     except Exception as e:
         logger.info(f"[SIP-IN] Connection ended: {e}")
@@ -0,0 +1,222 @@
+"""
+Adaptive jitter buffer for inbound RTP.
+
+Sits between the UDP reader and AudioSource.capture_frame():
+  • Reorders packets by (extended) RTP sequence number
+  • Estimates interarrival jitter (RFC 3550 §A.8) and sizes its depth from it
+  • Reports gaps as lost so the caller can conceal them
+  • Enforces a latency ceiling by discarding the oldest audio
+  • Keeps late / lost / discarded / duplicate counters for call-quality logs
+"""
+
+import math
+
+import numpy as np
+
+from .config import (
+    JITTER_MAX_DELAY_MS,
+    JITTER_MAX_LATENCY_MS,
+    JITTER_MIN_DELAY_MS,
+    RTP_PTIME_MS,
+    SAMPLE_RATE_SIP,
+)
+
+
+def _signed32(v: int) -> int:
+    v &= 0xFFFFFFFF
+    return v - 0x100000000 if v & 0x80000000 else v
+
+
+class JitterBuffer:
+    """Reordering playout buffer for a single RTP stream.
+
+    The producer calls push() for every received packet; the consumer calls
+    pop() once per ptime while ``primed`` is True. pop() returns the stored
+    item, or None when there is nothing to play for that slot (lost packet,
+    buffer ran dry, or the buffer is deepening after a jitter increase).
+    """
+
+    def __init__(
+        self,
+        clock_rate: int = SAMPLE_RATE_SIP,
+        ptime_ms: int = RTP_PTIME_MS,
+        min_delay_ms: int = JITTER_MIN_DELAY_MS,
+        max_delay_ms: int = JITTER_MAX_DELAY_MS,
+        max_latency_ms: int = JITTER_MAX_LATENCY_MS,
+    ):
+        self._clock_rate = clock_rate
+        self._ptime_ms = ptime_ms
+        self._min_packets = max(1, math.ceil(min_delay_ms / ptime_ms))
+        self._max_packets = max(self._min_packets, math.ceil(max_delay_ms / ptime_ms))
+        self._ceiling = max(self._max_packets, math.ceil(max_latency_ms / ptime_ms))
+
+        self._packets: dict[int, object] = {}
+        self._ssrc: int | None = None
+        self._next: int | None = None  # extended seq of the next slot to play
+        self._highest: int | None = None
+        self._playing = False
+        self.primed = False
+
+        # RFC 3550 interarrival jitter, in timestamp units
+        self._jitter = 0.0
+        self._last_arrival: float | None = None
+        self._last_ts = 0
+
+        self.received = 0
+        self.late = 0
+        self.lost = 0
+        self.discarded = 0
+        self.duplicate = 0
+
+    # ── Producer side ────────────────────────────────────────────────────
+
+    def push(self, seq: int, ts: int, ssrc: int, item, arrival: float):
+        """Insert one packet. ``arrival`` is a monotonic time in seconds."""
+        if ssrc != self._ssrc:
+            if self._ssrc is not None:
+                self._reset_stream()
+            self._ssrc = ssrc
+        self.received += 1
+
+        if self._last_arrival is not None:
+            d = (arrival - self._last_arrival) * self._clock_rate - _signed32(
+                ts - self._last_ts
+            )
+            self._jitter += (abs(d) - self._jitter) / 16.0
+        self._last_arrival, self._last_ts = arrival, ts
+
+        ext = self._extend(seq)
+        if self._next is None:
+            self._next = ext
+        elif ext < self._next:
+            if self._playing:
+                self.late += 1
+                return
+            self._next = ext  # reordered before playout started
+        if ext in self._packets:
+            self.duplicate += 1
+            return
+
+        self._packets[ext] = item
+        self._highest = ext if self._highest is None else max(self._highest, ext)
+
+        # Latency ceiling: discard the oldest audio rather than fall behind
+        while self.depth > self._ceiling:
+            self._drop_next()
+
+        # Prime on packets actually held, not the span — a reordered packet
+        # must not make a hole look like buffered audio.
+        if not self.primed and len(self._packets) >= self.target_depth:
+            self.primed = True
+
+    # ── Consumer side ────────────────────────────────────────────────────
+
+    def pop(self):
+        """Return the next item in sequence order, or None for a missing slot."""
+        if self._next is None or not self._packets:
+            # Ran dry — re-buffer before playing again
+            self.primed = False
+            return None
+
+        self._playing = True
+        target = self.target_depth
+        if len(self._packets) < target - 1:
+            # Jitter grew since priming — hold one slot (caller conceals it)
+            # to deepen the buffer instead of running into late packets.
+            return None
+        # Shrink towards the target when jitter has settled
+        while self.depth > target + 2:
+            self._drop_next()
+
+        item = self._packets.pop(self._next, None)
+        if item is None:
+            self.lost += 1
+        self._next += 1
+        return item
+
+    # ── Introspection ────────────────────────────────────────────────────
+
+    @property
+    def depth(self) -> int:
+        """Packets spanned from the next playout slot to the newest packet."""
+        if self._next is None or self._highest is None:
+            return 0
+        return max(0, self._highest - self._next + 1)
+
+    @property
+    def capacity(self) -> int:
+        """Upper bound on packets held at once (the latency ceiling)."""
+        return self._ceiling
+
+    @property
+    def jitter_ms(self) -> float:
+        return self._jitter * 1000.0 / self._clock_rate
+
+    @property
+    def target_depth(self) -> int:
+        want = math.ceil(3.0 * self.jitter_ms / self._ptime_ms) + 1
+        return min(self._max_packets, max(self._min_packets, want))
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "late": self.late,
+            "lost": self.lost,
+            "discarded": self.discarded,
+            "duplicate": self.duplicate,
+            "jitter_ms": round(self.jitter_ms, 2),
+            "depth": self.depth,
+            "target_depth": self.target_depth,
+        }
+
+    # ── Internals ────────────────────────────────────────────────────────
+
+    def _extend(self, seq: int) -> int:
+        if self._highest is None:
+            return seq
+        delta = (seq - self._highest) & 0xFFFF
+        if delta >= 0x8000:
+            delta -= 0x10000
+        return self._highest + delta
+
+    def _drop_next(self):
+        if self._packets.pop(self._next, None) is not None:
+            self.discarded += 1
+            self._next += 1
+        elif self._packets:
+            # Skip a whole gap in one step — those slots never arrived
+            oldest = min(self._packets)
+            self.lost += oldest - self._next
+            self._next = oldest
+        else:
+            self._next += 1
+
+    def _reset_stream(self):
+        self._packets.clear()
+        self._next = self._highest = None
+        self._playing = False
+        self.primed = False
+        self._last_arrival = None
+
+
+class PacketLossConcealer:
+    """Fills missing 20 ms slots by repeating the last good frame with decay,
+    then falls back to silence."""
+
+    def __init__(self, max_frames: int = 3, decay: float = 0.5):
+        self._max_frames = max_frames
+        self._decay = decay
+        self._last: np.ndarray | None = None
+        self._count = 0
+
+    def good(self, pcm: np.ndarray):
+        self._last = pcm
+        self._count = 0
+
+    def conceal(self) -> np.ndarray | None:
+        if self._last is None:
+            return None
+        self._count += 1
+        if self._count > self._max_frames:
+            return np.zeros_like(self._last)
+        return (self._last * self._decay**self._count).astype(np.int16)
@@ -0,0 +1,199 @@
+"""
+Shared UDP media sockets for every concurrent call (optional mux mode).
+
+By default each RTPMediaBridge binds its own RTP/RTCP port pair from
+PortPool. With SIP_BRIDGE_MUX_PORT set, all calls share one RTP socket on
+that port and one RTCP socket on port + 1 instead:
+  • Kernel buffers, file descriptors and reader registrations stay constant
+    however many calls are up, and only two UDP ports need opening
+  • One readiness callback drains the socket for all calls at once
+  • Datagrams are routed by remote address (from the SDP, as Exotel sends
+    symmetric RTP), then by SSRC, so a far end that changes source port
+    mid-call is re-latched instead of lost — only ever from the host the
+    call's SDP named, and the call is told so it sends to the new port too
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+
+from .config import RTP_MUX_PORT, RTP_RX_MAX_DRAIN, RTP_RX_SLOT_BYTES
+
+logger = logging.getLogger("sip_bridge_v3")
+
+
+class _Route:
+    __slots__ = ("key", "deliver", "flush", "moved", "addr", "ssrc")
+
+    def __init__(self, key, deliver, flush, moved):
+        self.key = key
+        self.deliver = deliver
+        self.flush = flush
+        self.moved = moved
+        self.addr: tuple[str, int] | None = None
+        self.ssrc: int | None = None
+
+
+class _Demux:
+    """One shared socket plus the address / SSRC routing table for it."""
+
+    def __init__(self, port: int, ssrc_offset: int, label: str):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # No SO_REUSEADDR: a second process binding this port would take
+        # every call's media from us; let it fail with EADDRINUSE instead
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind(("0.0.0.0", port))
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self._label = label
+        self._ssrc_offset = ssrc_offset  # RTP: 8, RTCP: 4 (sender SSRC)
+        self._scratch = memoryview(bytearray(RTP_RX_SLOT_BYTES))
+
+        self._routes: dict[object, _Route] = {}  # key → route
+        self._by_addr: dict[tuple[str, int], _Route] = {}
+        self._by_ssrc: dict[int, _Route] = {}
+        self._reading = False
+
+        self.wakeups = 0
+        self.unrouted = 0
+
+    def register(self, key, deliver, flush=None, moved=None):
+        """Add a call. ``deliver(data, addr)`` gets each routed datagram (a
+        view valid only during the call); ``flush()`` runs once per wakeup;
+        ``moved(addr)`` runs when the demux re-latches the call's remote
+        address, so the call can send there as well."""
+        self._routes[key] = _Route(key, deliver, flush, moved)
+        if not self._reading:
+            asyncio.get_running_loop().add_reader(self.sock.fileno(), self._on_readable)
+            self._reading = True
+
+    def set_remote(self, key, addr: tuple[str, int]):
+        route = self._routes.get(key)
+        if route is None:
+            return
+        if route.addr is not None:
+            self._by_addr.pop(route.addr, None)
+        route.addr = addr
+        self._by_addr[addr] = route
+
+    def unregister(self, key):
+        route = self._routes.pop(key, None)
+        if route is None:
+            return
+        if route.addr is not None and self._by_addr.get(route.addr) is route:
+            del self._by_addr[route.addr]
+        if route.ssrc is not None and self._by_ssrc.get(route.ssrc) is route:
+            del self._by_ssrc[route.ssrc]
+
+    def _route_for(self, data, nbytes: int, addr) -> _Route | None:
+        ssrc = None
+        if nbytes >= self._ssrc_offset + 4:
+            ssrc = struct.unpack_from("!I", data, self._ssrc_offset)[0]
+
+        route = self._by_addr.get(addr)
+        if route is None and ssrc is not None:
+            route = self._by_ssrc.get(ssrc)
+            if route is not None:
+                if route.addr is None or route.addr[0] != addr[0]:
+                    return None  # a known SSRC from a foreign host
+                # Same stream from a new source port (NAT rebinding) — re-latch
+                logger.info(f"[MUX] {self._label} SSRC {ssrc:08x} moved to {addr}")
+                self._relatch(route, addr)
+        if route is None:
+            # New stream from an unexpected port: latch only when exactly one
+            # call whose SDP named that host has not seen media yet.
+            waiting = [
+                r
+                for r in self._routes.values()
+                if r.ssrc is None and r.addr is not None and r.addr[0] == addr[0]
+            ]
+            if len(waiting) != 1:
+                return None
+            route = waiting[0]
+            self._relatch(route, addr)
+
+        if ssrc is not None and route.ssrc != ssrc:
+            if route.ssrc is not None and self._by_ssrc.get(route.ssrc) is route:
+                del self._by_ssrc[route.ssrc]
+            route.ssrc = ssrc
+            self._by_ssrc[ssrc] = route
+        return route
+
+    def _relatch(self, route: _Route, addr: tuple[str, int]):
+        self.set_remote(route.key, addr)
+        if route.moved:
+            route.moved(addr)
+
+    def _on_readable(self):
+        self.wakeups += 1
+        touched = set()
+        # Bounded per wakeup (scaled by call count) so the loop is not starved
+        for _ in range(RTP_RX_MAX_DRAIN * max(1, len(self._routes))):
+            try:
+                nbytes, addr = self.sock.recvfrom_into(self._scratch)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                logger.error(f"[MUX] {self._label} recvfrom error: {e}")
+                break
+            route = self._route_for(self._scratch, nbytes, addr)
+            if route is None:
+                self.unrouted += 1
+                continue
+            route.deliver(self._scratch[:nbytes], addr)
+            touched.add(route)
+        for route in touched:
+            if route.flush:
+                route.flush()
+
+    def stats(self) -> dict:
+        return {
+            "calls": len(self._routes),
+            "wakeups": self.wakeups,
+            "unrouted": self.unrouted,
+        }
+
+    def close(self):
+        if self._reading:
+            try:
+                asyncio.get_event_loop().remove_reader(self.sock.fileno())
+            except Exception:
+                pass
+        self.sock.close()
+
+
+class MediaMux:
+    """The shared RTP socket (``port``) and RTCP socket (``port + 1``)."""
+
+    def __init__(self, port: int):
+        self.rtp = _Demux(port, ssrc_offset=8, label="RTP")
+        # RTCP must sit on the next port; with an ephemeral RTP port take any
+        self.rtcp = _Demux(port + 1 if port else 0, ssrc_offset=4, label="RTCP")
+        self.port = self.rtp.port
+        logger.info(f"[MUX] Shared media sockets on 0.0.0.0:{self.port}/{self.rtcp.port}")
+
+    def stats(self) -> dict:
+        return {"rtp": self.rtp.stats(), "rtcp": self.rtcp.stats()}
+
+    def close(self):
+        self.rtp.close()
+        self.rtcp.close()
+
+
+_media_mux: MediaMux | None = None
+
+
+def get_media_mux() -> MediaMux | None:
+    """The process-wide mux, or None when SIP_BRIDGE_MUX_PORT is not set."""
+    global _media_mux
+    if _media_mux is None and RTP_MUX_PORT:
+        _media_mux = MediaMux(RTP_MUX_PORT)
+    return _media_mux
+
+
+def init_media_mux(port: int) -> MediaMux:
+    """Use ``port`` for this process's mux (each media worker gets its own)."""
+    global _media_mux
+    _media_mux = MediaMux(port)
+    return _media_mux
@@ -0,0 +1,377 @@
+"""
+Media worker pool — runs outbound bridged calls in separate processes.
+
+With SIP_BRIDGE_MEDIA_WORKERS=N the HTTP / signalling process starts N
+worker processes, each with its own event loop, its own slice of the RTP
+port range (and its own mux port in mux mode). New outbound calls go to the
+least-loaded worker over a Pipe, so G.711, resampling and LiveKit FFI work
+spread across cores instead of competing with HTTP handling on one. Each end
+writes to its Pipe from a sender thread, so a worker that is slow to read
+never blocks the other side's event loop.
+
+  • Parent → worker: {"op": "call", "id", "kwargs"}, {"op": "bye", "call_id"},
+    {"op": "stop"}
+  • Worker → parent: {"op": "ended", "id", "result"} (run_bridge's outcome)
+  • BYEs arriving on the parent's SIP listener for a Call-ID it does not own
+    are relayed to every worker; the owning one fires its hangup event
+  • A worker that dies is respawned; its calls are lost with it
+
+Inbound calls stay in the signalling process: their INVITE transaction lives
+on the TCP connection the listener accepted, which cannot be handed over.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+from multiprocessing.connection import Connection
+
+from .admission import OUTBOUND, AdmissionTicket, get_admission_controller
+from .bridge import run_bridge
+from .call_supervisor import CallRejected, get_call_supervisor
+from .config import (
+    CALL_DRAIN_TIMEOUT_SECONDS,
+    MEDIA_WORKERS,
+    RTP_MUX_PORT,
+    RTP_PORT_END,
+    RTP_PORT_START,
+)
+from .inbound_listener import (
+    disable_inbound_server,
+    set_bye_fallback,
+    signal_bye,
+)
+from .media_mux import init_media_mux
+from .port_pool import init_port_pool, split_port_range
+from .sip_trunk import close_sip_trunk, start_sip_trunk
+
+logger = logging.getLogger("sip_bridge_v3")
+
+# spawn, not fork: the parent already runs LiveKit FFI threads
+_mp = multiprocessing.get_context("spawn")
+
+
+def _failed_result(reason: str) -> dict:
+    return {
+        "sip_code": None,
+        "answered": False,
+        "reason": reason,
+        "duration_seconds": 0.0,
+    }
+
+
+def _task_result(task: asyncio.Task | None) -> dict:
+    """run_bridge's outcome from its finished task, whatever happened to it."""
+    if task is None:
+        return _failed_result("rejected")
+    if task.cancelled():
+        return _failed_result("cancelled")
+    if task.exception() is not None:
+        return _failed_result("error")
+    return task.result()
+
+
+class _PipeSender:
+    """Sends on a Connection from its own thread, in order. ``send()`` only
+    queues, so a full pipe never blocks the event loop; a broken one drops
+    what is left (the reader side sees EOF and cleans up)."""
+
+    def __init__(self, conn: Connection, name: str):
+        self._conn = conn
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def send(self, msg: dict):
+        self._queue.put(msg)
+
+    def close(self, timeout: float = 1.0):
+        """Stop after what is already queued, waiting up to ``timeout``."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while (msg := self._queue.get()) is not None:
+            try:
+                self._conn.send(msg)
+            except OSError:
+                return
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Worker process
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _worker_main(index: int, ports: tuple[int, int], mux_port: int, conn: Connection):
+    # Signals aimed at the whole process group (supervisord stopasgroup,
+    # Ctrl-C) must not kill live calls; the parent sends "stop" and drains.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"[media-{index}] %(levelname)s %(name)s: %(message)s",
+    )
+    asyncio.run(_worker_loop(index, ports, mux_port, conn))
+
+
+async def _worker_loop(
+    index: int, ports: tuple[int, int], mux_port: int, conn: Connection
+):
+    disable_inbound_server()
+    init_port_pool(*ports)
+    if mux_port:
+        init_media_mux(mux_port)
+    start_sip_trunk()
+    logger.info(f"[WORKER] {index} ready, ports {ports[0]}-{ports[1]}")
+
+    loop = asyncio.get_running_loop()
+    supervisor = get_call_supervisor()
+    sender = _PipeSender(conn, f"media-{index}-send")
+    stopping = asyncio.Event()
+    drain_timeout = CALL_DRAIN_TIMEOUT_SECONDS
+
+    def on_ended(call_id: int, task: asyncio.Task | None = None):
+        sender.send({"op": "ended", "id": call_id, "result": _task_result(task)})
+
+    def on_message():
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            # Parent went away — finish what we have and exit
+            loop.remove_reader(conn.fileno())
+            stopping.set()
+            return
+        nonlocal drain_timeout
+        op = msg.get("op")
+        if op == "call":
+            kwargs = msg["kwargs"]
+            try:
+                task = supervisor.track(
+                    run_bridge(**kwargs), f"outbound:{kwargs.get('phone_number')}"
+                )
+            except CallRejected:
+                on_ended(msg["id"])
+                return
+            task.add_done_callback(lambda t, cid=msg["id"]: on_ended(cid, t))
+        elif op == "bye":
+            signal_bye(msg["call_id"])
+        elif op == "stop":
+            drain_timeout = msg.get("timeout", drain_timeout)
+            stopping.set()
+
+    loop.add_reader(conn.fileno(), on_message)
+    await stopping.wait()
+    await supervisor.drain(drain_timeout)
+    await close_sip_trunk()
+    # Let the last "ended" messages reach the parent before the process exits
+    await loop.run_in_executor(None, sender.close)
+    logger.info(f"[WORKER] {index} exited")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Parent side
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _Worker:
+    def __init__(self, index: int, ports: tuple[int, int], mux_port: int):
+        self.index = index
+        self.ports = ports
+        self.mux_port = mux_port
+        self.tickets: dict[int, AdmissionTicket] = {}  # call id → slot
+        self.results: dict[int, asyncio.Future] = {}  # call id → outcome
+        self.process: multiprocessing.Process | None = None
+        self.conn: Connection | None = None
+        self.sender: _PipeSender | None = None
+
+    @property
+    def active(self) -> int:
+        return len(self.tickets)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def release_all(self):
+        for ticket in self.tickets.values():
+            ticket.release()
+        self.tickets.clear()
+        for future in self.results.values():
+            if not future.done():
+                future.set_result(_failed_result("worker_died"))
+        self.results.clear()
+
+
+class MediaWorkerPool:
+    def __init__(self, workers: int):
+        inbound, slices = split_port_range(RTP_PORT_START, RTP_PORT_END, workers)
+        # The inbound slice stays with this process (SIP_BRIDGE_INBOUND_PORT_PAIRS)
+        init_port_pool(*inbound)
+        self._workers = [
+            _Worker(i, slices[i], RTP_MUX_PORT + 2 * (i + 1) if RTP_MUX_PORT else 0)
+            for i in range(workers)
+        ]
+        self._ids = itertools.count(1)
+        self._stopping = False
+
+    def start(self):
+        for w in self._workers:
+            self._spawn(w)
+        set_bye_fallback(self._relay_bye)
+
+    def _spawn(self, w: _Worker):
+        parent_conn, child_conn = _mp.Pipe()
+        w.process = _mp.Process(
+            target=_worker_main,
+            args=(w.index, w.ports, w.mux_port, child_conn),
+            name=f"media-worker-{w.index}",
+            daemon=False,
+        )
+        w.process.start()
+        child_conn.close()
+        w.conn = parent_conn
+        w.sender = _PipeSender(parent_conn, f"media-{w.index}-feed")
+        asyncio.get_running_loop().add_reader(
+            parent_conn.fileno(), self._on_message, w
+        )
+        logger.info(f"[WORKERS] Started worker {w.index} pid={w.process.pid}")
+
+    def _on_message(self, w: _Worker):
+        try:
+            msg = w.conn.recv()
+        except (EOFError, OSError):
+            self._on_worker_exit(w)
+            return
+        if msg.get("op") == "ended":
+            ticket = w.tickets.pop(msg["id"], None)
+            if ticket is not None:
+                ticket.release()
+            future = w.results.pop(msg["id"], None)
+            if future is not None and not future.done():
+                future.set_result(msg.get("result"))
+
+    def _on_worker_exit(self, w: _Worker):
+        asyncio.get_running_loop().remove_reader(w.conn.fileno())
+        # The peer is gone, so pending sends fail at once and this is quick
+        w.sender.close()
+        w.conn.close()
+        if w.process is not None:
+            w.process.join(timeout=1)
+        lost = w.active
+        w.release_all()
+        if self._stopping:
+            return
+        logger.error(
+            f"[WORKERS] Worker {w.index} died with {lost} active call(s) — respawning"
+        )
+        self._spawn(w)
+
+    def submit(self, ticket: AdmissionTicket, **kwargs) -> tuple[int, asyncio.Future]:
+        """Send a run_bridge() call to the least-loaded worker, which holds
+        ``ticket`` until the call ends. Returns the worker's index and a
+        future for the call's outcome."""
+        live = [w for w in self._workers if w.alive]
+        if not live:
+            raise RuntimeError("No media workers running")
+        w = min(live, key=lambda x: x.active)
+        call_id = next(self._ids)
+        w.sender.send({"op": "call", "id": call_id, "kwargs": kwargs})
+        w.tickets[call_id] = ticket
+        future = asyncio.get_running_loop().create_future()
+        w.results[call_id] = future
+        return w.index, future
+
+    def _relay_bye(self, call_id: str):
+        for w in self._workers:
+            if w.alive:
+                w.sender.send({"op": "bye", "call_id": call_id})
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "worker": w.index,
+                "pid": w.process.pid if w.process else None,
+                "alive": w.alive,
+                "active_calls": w.active,
+                "ports": f"{w.ports[0]}-{w.ports[1]}",
+            }
+            for w in self._workers
+        ]
+
+    @property
+    def active(self) -> int:
+        return sum(w.active for w in self._workers)
+
+    async def stop(self, timeout: float = CALL_DRAIN_TIMEOUT_SECONDS):
+        """Ask workers to drain their calls (up to ``timeout``) and exit;
+        terminate any that are still running shortly after that."""
+        self._stopping = True
+        for w in self._workers:
+            if w.alive:
+                w.sender.send({"op": "stop", "timeout": timeout})
+        loop = asyncio.get_running_loop()
+        for w in self._workers:
+            if w.process is None:
+                continue
+            await loop.run_in_executor(None, w.process.join, timeout + 5)
+            if w.process.is_alive():
+                logger.warning(f"[WORKERS] Worker {w.index} did not exit — killing")
+                w.process.kill()
+        set_bye_fallback(None)
+
+
+_pool: MediaWorkerPool | None = None
+
+
+def start_media_workers() -> MediaWorkerPool | None:
+    """Start the pool once (idempotent). None when SIP_BRIDGE_MEDIA_WORKERS=0."""
+    global _pool
+    if _pool is None and MEDIA_WORKERS > 0:
+        _pool = MediaWorkerPool(MEDIA_WORKERS)
+        _pool.start()
+    return _pool
+
+
+def get_media_worker_pool() -> MediaWorkerPool | None:
+    return _pool
+
+
+def dispatch_bridge(ticket: AdmissionTicket | None = None, **kwargs) -> asyncio.Future:
+    """Start an outbound bridged call (run_bridge kwargs) on a media worker,
+    or as a supervised task in this process when no pool is running.
+    Returns a future for the call's outcome (run_bridge's result dict).
+
+    ``ticket`` is the call's admission slot (from AdmissionController.admit);
+    without one the call is admitted here or refused. The slot is released
+    when the call ends. Raises CallRejected while draining and
+    CallOverloaded when there is no capacity."""
+    label = f"outbound:{kwargs.get('phone_number')}"
+    supervisor = get_call_supervisor()
+    if not supervisor.accepting:
+        if ticket is not None:
+            ticket.release()
+        raise CallRejected("Bridge is draining, not accepting new calls")
+    if ticket is None:
+        ticket = get_admission_controller().try_admit(OUTBOUND, label)
+    if _pool is not None:
+        try:
+            index, outcome = _pool.submit(ticket, **kwargs)
+            logger.info(f"[WORKERS] Call to {kwargs.get('phone_number')} → worker {index}")
+            return outcome
+        except RuntimeError as e:
+            logger.error(f"[WORKERS] Dispatch failed ({e}) — running in-process")
+    try:
+        task = supervisor.track(run_bridge(**kwargs), label)
+    except CallRejected:
+        ticket.release()
+        raise
+    task.add_done_callback(lambda _t: ticket.release())
+    outcome = asyncio.get_running_loop().create_future()
+    task.add_done_callback(
+        lambda t: outcome.done() or outcome.set_result(_task_result(t))
+    )
+    return outcome
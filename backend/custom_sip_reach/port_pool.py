@@ -1,42 +1,168 @@
 """
-Thread-safe async port pool for allocating RTP UDP ports.
+Async port pool for allocating RTP UDP ports.
 
 Each concurrent SIP call needs a unique port pair (RTP + RTCP).
+
+  • Free ports sit in a min-heap, so acquire / release are O(log n) however
+    wide the range is
+  • A released port is quarantined for RTP_PORT_COOLDOWN_SECONDS before it can
+    be handed out again, so late RTP from the previous call's far end never
+    reaches the next caller
+  • Each candidate pair is bind-probed before it is handed out; a pair held by
+    another process is skipped and retried after RTP_PORT_RETRY_SECONDS
 """
 
-import asyncio
+import heapq
 import logging
+import socket
+import time
+from collections import deque
 
-from .config import RTP_PORT_START, RTP_PORT_END
+from .config import (
+    INBOUND_SIP_LISTEN,
+    MEDIA_INBOUND_PORT_PAIRS,
+    RTP_PORT_COOLDOWN_SECONDS,
+    RTP_PORT_END,
+    RTP_PORT_RETRY_SECONDS,
+    RTP_PORT_START,
+)
 
 logger = logging.getLogger("sip_bridge_v3")
 
 
+def _pair_bindable(port: int) -> bool:
+    """True if both ``port`` and ``port + 1`` can be bound right now. No
+    SO_REUSEADDR, so any other socket on either port makes this fail."""
+    socks = []
+    try:
+        for p in (port, port + 1):
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            socks.append(s)
+            s.bind(("0.0.0.0", p))
+        return True
+    except OSError:
+        return False
+    finally:
+        for s in socks:
+            s.close()
+
+
+def split_port_range(
+    start: int, end: int, workers: int, inbound_pairs: int = MEDIA_INBOUND_PORT_PAIRS
+) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+    """Slice [start, end) for media workers: the signalling process's slice
+    for inbound calls (``inbound_pairs`` pairs; < 0 picks an equal share, or
+    none when the inbound listener is off), then ``workers`` equal runs of
+    even-aligned port pairs from what is left."""
+    pairs = (end - start) // 2
+    if inbound_pairs < 0:
+        inbound_pairs = pairs // (workers + 1) if INBOUND_SIP_LISTEN else 0
+    per = (pairs - inbound_pairs) // workers
+    if per < 1:
+        raise ValueError(
+            f"RTP port range {start}-{end} is too small for {inbound_pairs} "
+            f"inbound pair(s) and {workers} worker slice(s)"
+        )
+    base = start + 2 * inbound_pairs
+    return (start, base), [
+        (base + 2 * per * i, base + 2 * per * (i + 1)) for i in range(workers)
+    ]
+
+
 class PortPool:
-    """Thread-safe pool of UDP ports for RTP sockets."""
+    """Pool of UDP port pairs for RTP sockets, used from one event loop."""
+
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        cooldown: float = RTP_PORT_COOLDOWN_SECONDS,
+        retry_after: float = RTP_PORT_RETRY_SECONDS,
+        probe: bool = True,
+    ):
+        # Step by 2 so port+1 is free for RTCP; a sorted list is a valid heap
+        self._free = list(range(start, end, 2))
+        self._start, self._end = start, end
+        self._cooldown = cooldown
+        self._retry_after = retry_after
+        self._probe = probe
+        # (ready_at, port), appended in time order for each delay, so both
+        # queues stay sorted and expiry is a popleft
+        self._quarantine: deque[tuple[float, int]] = deque()
+        self._unbindable: deque[tuple[float, int]] = deque()
+        self._in_use: set[int] = set()
 
-    def __init__(self, start: int, end: int):
-        # Step by 2 so port+1 is free for RTCP
-        self._free = set(range(start, end, 2))
-        self._lock = asyncio.Lock()
+        self.high_water = 0
+        self.acquired = 0
+        self.bind_failures = 0
+        self.early_reuse = 0
         logger.info(f"[PortPool] Ready with {len(self._free)} ports ({start}-{end})")
 
-    async def acquire(self) -> int:
-        async with self._lock:
-            if not self._free:
-                raise RuntimeError(
-                    f"No free RTP ports in {RTP_PORT_START}-{RTP_PORT_END}. "
-                    "Increase RTP_PORT_END or reduce concurrent calls."
-                )
-            port = min(self._free)
-            self._free.discard(port)
-            logger.debug(f"[PortPool] Acquired {port}. Remaining: {len(self._free)}")
+    def _thaw(self, now: float):
+        for queue in (self._quarantine, self._unbindable):
+            while queue and queue[0][0] <= now:
+                heapq.heappush(self._free, queue.popleft()[1])
+
+    def _next_candidate(self, now: float) -> int:
+        if self._free:
+            return heapq.heappop(self._free)
+        if self._quarantine:
+            # Every port is busy or cooling down — reusing the one closest to
+            # the end of its cooldown beats failing the call.
+            self.early_reuse += 1
+            ready_at, port = self._quarantine.popleft()
+            logger.warning(
+                f"[PortPool] Exhausted — reusing {port} "
+                f"{ready_at - now:.1f}s before its cooldown ends"
+            )
             return port
+        raise RuntimeError(
+            f"No free RTP ports in {self._start}-{self._end} "
+            f"({len(self._in_use)} in use, {len(self._unbindable)} unbindable). "
+            "Increase RTP_PORT_END or reduce concurrent calls."
+        )
+
+    async def acquire(self) -> int:
+        # No awaits below, so nothing can interleave with it on the loop
+        now = time.monotonic()
+        self._thaw(now)
+        while True:
+            port = self._next_candidate(now)
+            if not self._probe or _pair_bindable(port):
+                break
+            self.bind_failures += 1
+            self._unbindable.append((now + self._retry_after, port))
+            logger.warning(
+                f"[PortPool] {port}/{port + 1} already bound elsewhere — "
+                f"skipping for {self._retry_after:g}s"
+            )
+        self._in_use.add(port)
+        self.acquired += 1
+        self.high_water = max(self.high_water, len(self._in_use))
+        logger.debug(f"[PortPool] Acquired {port}. Free: {len(self._free)}")
+        return port
 
     async def release(self, port: int):
-        async with self._lock:
-            self._free.add(port)
-            logger.debug(f"[PortPool] Released {port}. Remaining: {len(self._free)}")
+        if port not in self._in_use:
+            logger.warning(f"[PortPool] Release of {port}, which is not in use")
+            return
+        self._in_use.discard(port)
+        self._quarantine.append((time.monotonic() + self._cooldown, port))
+        logger.debug(f"[PortPool] Released {port} into {self._cooldown:g}s cooldown")
+
+    def stats(self) -> dict:
+        self._thaw(time.monotonic())
+        return {
+            "range": f"{self._start}-{self._end}",
+            "free": len(self._free),
+            "in_use": len(self._in_use),
+            "quarantined": len(self._quarantine),
+            "unbindable": len(self._unbindable),
+            "high_water": self.high_water,
+            "acquired": self.acquired,
+            "bind_failures": self.bind_failures,
+            "early_reuse": self.early_reuse,
+        }
 
 
 _port_pool: PortPool | None = None
@@ -47,3 +173,11 @@ def get_port_pool() -> PortPool:
     if _port_pool is None:
         _port_pool = PortPool(RTP_PORT_START, RTP_PORT_END)
     return _port_pool
+
+
+def init_port_pool(start: int, end: int) -> PortPool:
+    """Replace the process-wide pool with one over [start, end) — used when
+    the range is sliced between media worker processes."""
+    global _port_pool
+    _port_pool = PortPool(start, end)
+    return _port_pool
@@ -0,0 +1,133 @@
+"""
+Streaming polyphase FIR resampler for the 8 kHz <-> 48 kHz bridge path.
+
+Replaces ``audioop.ratecv`` (linear interpolation, no anti-aliasing):
+  • Kaiser-windowed sinc low-pass, split into polyphase sub-filters
+  • Interpolation (8k → 48k) computes every output phase in one matmul
+  • Decimation (48k → 8k) only evaluates the filter at kept output samples
+  • Filter history is carried across frames, so 10/20 ms frames join seamlessly
+  • Work and output buffers are allocated once and reused; they only grow
+    if a larger frame than any seen before arrives
+"""
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _design_lowpass(num_taps: int, cutoff: float, gain: float, beta: float) -> np.ndarray:
+    """Kaiser-windowed sinc. ``cutoff`` is relative to the filter's sample rate
+    (0.5 = Nyquist)."""
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(num_taps, beta)
+    return (h * (gain / h.sum())).astype(np.float32)
+
+
+class PolyphaseResampler:
+    """Stateful int16 mono resampler for integer up/down ratios.
+
+    One instance per direction per call — the filter history is per stream.
+    ``process()`` returns a view into an internal buffer that is overwritten
+    by the next call; copy it (e.g. ``.tobytes()``) if it must outlive that.
+    """
+
+    def __init__(
+        self,
+        in_rate: int,
+        out_rate: int,
+        taps_per_phase: int = 32,
+        passband: float = 0.95,
+        beta: float = 7.0,
+    ):
+        """
+        in_rate / out_rate : Sample rates in Hz; one must divide the other.
+        taps_per_phase     : Sub-filter length; total taps = ratio * taps_per_phase.
+        passband           : Cut-off as a fraction of the lower rate's Nyquist.
+        beta               : Kaiser window shape (higher = more stop-band attenuation).
+
+        The defaults keep 300-3400 Hz within 0.2 dB, are 15 dB down at
+        4 kHz and at least 70 dB down from 4.4 kHz, so only 3.6-4 kHz can
+        alias, onto itself. Group delay is about 2 ms at 48 kHz.
+        """
+        g = math.gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // g, in_rate // g
+        if self.up != 1 and self.down != 1:
+            raise ValueError(
+                f"Only integer ratios are supported, got {in_rate} -> {out_rate} Hz"
+            )
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+
+        ratio = max(self.up, self.down)
+        h = _design_lowpass(
+            ratio * taps_per_phase, passband * 0.5 / ratio, float(self.up), beta
+        )
+        if self.up > 1:
+            # kernel[k, p] = h[p + (T-1-k)*up]: column p is phase p, reversed
+            # so it can be dotted directly against a forward-ordered window.
+            self._kernel = np.ascontiguousarray(
+                h.reshape(taps_per_phase, self.up)[::-1]
+            )
+            self._hist_len = taps_per_phase - 1
+        else:
+            self._kernel = np.ascontiguousarray(h[::-1])
+            self._hist_len = len(h) - 1
+        # Offset of the next kept sample (decimation only)
+        self._skip = 0
+
+        self._xbuf = np.zeros(self._hist_len, dtype=np.float32)
+        self._acc = np.empty(0, dtype=np.float32)
+        self._out = np.empty(0, dtype=np.int16)
+        # Strided window views over _xbuf keyed by frame length — building a
+        # view costs more than the filtering itself, so do it once per size.
+        self._windows: dict[int, np.ndarray] = {}
+
+    def reset(self):
+        self._xbuf[: self._hist_len] = 0.0
+        self._skip = 0
+
+    def _reserve(self, n_in: int, n_out: int):
+        if len(self._xbuf) < self._hist_len + n_in:
+            xbuf = np.zeros(self._hist_len + n_in, dtype=np.float32)
+            xbuf[: self._hist_len] = self._xbuf[: self._hist_len]
+            self._xbuf = xbuf
+            self._windows.clear()
+        if len(self._acc) < n_out:
+            self._acc = np.empty(n_out, dtype=np.float32)
+            self._out = np.empty(n_out, dtype=np.int16)
+
+    def process(self, pcm: np.ndarray) -> np.ndarray:
+        """Resample one frame of int16 samples; returns int16 samples."""
+        n = len(pcm)
+        if n == 0:
+            return self._out[:0]
+
+        if self.up > 1:
+            n_out = n * self.up
+        else:
+            n_out = max(0, -(-(n - self._skip) // self.down))
+        self._reserve(n, n_out)
+
+        h = self._hist_len
+        xbuf = self._xbuf[: h + n]
+        xbuf[h:] = pcm
+        windows = self._windows.get(n)
+        if windows is None:
+            windows = self._windows[n] = sliding_window_view(xbuf, h + 1)
+
+        acc = self._acc[:n_out]
+        if self.up > 1:
+            np.matmul(windows, self._kernel, out=acc.reshape(n, self.up))
+        else:
+            if n_out:
+                np.matmul(windows[self._skip :: self.down], self._kernel, out=acc)
+            self._skip += n_out * self.down - n
+
+        # Carry the tail forward as history for the next frame
+        xbuf[:h] = xbuf[n:]
+
+        out = self._out[:n_out]
+        np.clip(acc, -32768, 32767, out=acc)
+        np.rint(acc, out=out, casting="unsafe")
+        return out
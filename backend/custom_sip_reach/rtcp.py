@@ -0,0 +1,353 @@
+"""
+RTCP for the bridge's RTP session (RFC 3550 §6), on the RTP port + 1 that
+PortPool already reserves.
+
+Handles:
+  • Reception statistics for the inbound stream: extended highest sequence,
+    cumulative / interval loss and interarrival jitter (RFC 3550 §A.1, §A.3, §A.8)
+  • Sending a compound SR (or RR while we have sent nothing) + SDES CNAME
+    every RTCP_INTERVAL_SECONDS, randomised ±50% as §6.3.1 asks
+  • Parsing the far end's SR / RR: its view of our stream (loss, jitter) and
+    round-trip time from LSR / DLSR (§6.4.1)
+  • A derived E-model MOS estimate (ITU-T G.107, G.711 with PLC)
+  • RTCP BYE on stop
+"""
+
+import asyncio
+import logging
+import random
+import socket
+import struct
+import time
+
+from .config import RTCP_INTERVAL_SECONDS, RTP_PTIME_MS, SAMPLE_RATE_SIP
+
+logger = logging.getLogger("sip_bridge_v3")
+
+RTCP_SR = 200
+RTCP_RR = 201
+RTCP_SDES = 202
+RTCP_BYE = 203
+
+_NTP_EPOCH_OFFSET = 2208988800  # 1900-01-01 → 1970-01-01, seconds
+_HEADER = struct.Struct("!BBH")
+_SENDER_INFO = struct.Struct("!IIIII")  # NTP msw, NTP lsw, RTP ts, packets, octets
+_REPORT_BLOCK = struct.Struct("!IIIIII")  # ssrc, lost, ext seq, jitter, LSR, DLSR
+
+
+def _ntp_now() -> tuple[int, int]:
+    t = time.time() + _NTP_EPOCH_OFFSET
+    sec = int(t)
+    return sec & 0xFFFFFFFF, int((t - sec) * (1 << 32)) & 0xFFFFFFFF
+
+
+def _ntp_middle32(msw: int, lsw: int) -> int:
+    return ((msw & 0xFFFF) << 16) | (lsw >> 16)
+
+
+def _header(pt: int, count: int, body_len: int) -> bytes:
+    # Length field is the packet size in 32-bit words minus one
+    return _HEADER.pack(0x80 | count, pt, (4 + body_len) // 4 - 1)
+
+
+def mos_estimate(one_way_delay_ms: float, loss_fraction: float) -> float:
+    """E-model (ITU-T G.107) R-factor → MOS for G.711 with packet loss
+    concealment (Ie = 0, Bpl = 25.1), random loss (BurstR = 1)."""
+    d = max(0.0, one_way_delay_ms)
+    i_d = 0.024 * d + (0.11 * (d - 177.3) if d > 177.3 else 0.0)
+    ppl = max(0.0, min(1.0, loss_fraction)) * 100.0
+    ie_eff = 95.0 * ppl / (ppl + 25.1)
+    r = 93.2 - i_d - ie_eff
+    if r <= 0:
+        return 1.0
+    if r >= 100:
+        return 4.5
+    return round(1 + 0.035 * r + 7e-6 * r * (r - 60) * (100 - r), 2)
+
+
+class ReceptionStats:
+    """Per-source reception counters behind an RTCP report block."""
+
+    def __init__(self, clock_rate: int = SAMPLE_RATE_SIP):
+        self._clock_rate = clock_rate
+        self.ssrc: int | None = None
+        self._reset()
+
+    def _reset(self):
+        self.received = 0
+        self._base_seq = 0
+        self._max_seq = 0
+        self._cycles = 0
+        self._expected_prior = 0
+        self._received_prior = 0
+        self._jitter = 0.0
+        self._transit: float | None = None
+        # Last SR from this source: (LSR middle-32, monotonic arrival)
+        self.last_sr: tuple[int, float] | None = None
+
+    def update(self, seq: int, ts: int, ssrc: int, arrival: float):
+        """Account one received RTP packet. ``arrival`` is monotonic seconds."""
+        if ssrc != self.ssrc:
+            self.ssrc = ssrc
+            self._reset()
+            self._base_seq = self._max_seq = seq
+        else:
+            delta = (seq - self._max_seq) & 0xFFFF
+            if delta < 0x8000:
+                if seq < self._max_seq:
+                    self._cycles += 0x10000  # sequence number wrapped
+                self._max_seq = seq
+        self.received += 1
+
+        transit = arrival * self._clock_rate - ts
+        if self._transit is not None:
+            d = transit - self._transit
+            # RTP timestamps wrap at 2^32; keep the difference small and signed
+            d = (d + 0x80000000) % 0x100000000 - 0x80000000
+            self._jitter += (abs(d) - self._jitter) / 16.0
+        self._transit = transit
+
+    @property
+    def extended_max(self) -> int:
+        return self._cycles + self._max_seq
+
+    @property
+    def expected(self) -> int:
+        return self.extended_max - self._base_seq + 1 if self.received else 0
+
+    @property
+    def cumulative_lost(self) -> int:
+        return self.expected - self.received
+
+    @property
+    def jitter_ms(self) -> float:
+        return self._jitter * 1000.0 / self._clock_rate
+
+    def report_block(self) -> bytes:
+        """Build this source's 24-byte report block, closing the loss interval."""
+        expected = self.expected
+        expected_interval = expected - self._expected_prior
+        received_interval = self.received - self._received_prior
+        self._expected_prior, self._received_prior = expected, self.received
+        lost_interval = expected_interval - received_interval
+        fraction = (
+            (lost_interval << 8) // expected_interval
+            if expected_interval > 0 and lost_interval > 0
+            else 0
+        )
+        cum = max(-0x800000, min(0x7FFFFF, self.cumulative_lost)) & 0xFFFFFF
+
+        lsr = dlsr = 0
+        if self.last_sr is not None:
+            lsr = self.last_sr[0]
+            dlsr = int((time.monotonic() - self.last_sr[1]) * 65536) & 0xFFFFFFFF
+        return _REPORT_BLOCK.pack(
+            self.ssrc,
+            (min(fraction, 255) << 24) | cum,
+            self.extended_max & 0xFFFFFFFF,
+            int(self._jitter) & 0xFFFFFFFF,
+            lsr,
+            dlsr,
+        )
+
+
+class RTCPSession:
+    """RTCP companion of one RTPMediaBridge."""
+
+    def __init__(self, bind_port: int, ssrc: int, cname: str, sender_info, demux=None):
+        """
+        bind_port   : RTCP port (RTP port + 1; 0 picks any free port).
+        ssrc        : Our RTP SSRC — reports are sent and matched under it.
+        cname       : SDES CNAME for our source.
+        sender_info : Callable returning (rtp_timestamp, packets_sent, octets_sent).
+        demux       : Shared RTCP socket from MediaMux; bind_port is then ignored.
+        """
+        self._demux = demux
+        if demux is not None:
+            self._sock = demux.sock
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.bind(("0.0.0.0", bind_port))
+            self._sock.setblocking(False)
+        self.local_port = self._sock.getsockname()[1]
+
+        self._ssrc = ssrc
+        self._sender_info = sender_info
+        cname_b = cname.encode()[:255]
+        # SDES chunk: SSRC, CNAME item, END item, padded to a 32-bit boundary
+        chunk = struct.pack("!IBB", ssrc, 1, len(cname_b)) + cname_b + b"\0"
+        chunk += b"\0" * (-len(chunk) % 4)
+        self._sdes = _header(RTCP_SDES, 1, len(chunk)) + chunk
+
+        self.reception = ReceptionStats()
+        self._remote_addr: tuple[str, int] | None = None
+        self._send_task: asyncio.Task | None = None
+        self._reading = False
+        self._last_sent_packets = 0
+
+        self.sr_sent = 0
+        self.rr_sent = 0
+        self.reports_received = 0
+        self.rtt_ms: float | None = None
+        # The far end's view of our outbound stream, from its report blocks
+        self.remote_fraction_lost = 0.0
+        self.remote_cumulative_lost = 0
+        self.remote_jitter_ms = 0.0
+
+    def start(self, remote_addr: tuple[str, int]):
+        """Begin reporting to ``remote_addr`` and reading the far end's reports."""
+        self._remote_addr = remote_addr
+        if not self._reading:
+            if self._demux is not None:
+                self._demux.register(self, self._on_datagram)
+            else:
+                asyncio.get_running_loop().add_reader(
+                    self._sock.fileno(), self._on_readable
+                )
+            self._reading = True
+        if self._demux is not None:
+            self._demux.set_remote(self, remote_addr)
+        if self._send_task is None:
+            self._send_task = asyncio.create_task(self._report_loop())
+        logger.info(f"[RTCP] Port {self.local_port} → {remote_addr[0]}:{remote_addr[1]}")
+
+    # ── Sending ──────────────────────────────────────────────────────────
+
+    def _build_report(self) -> bytes:
+        blocks = self.reception.report_block() if self.reception.received else b""
+        count = 1 if blocks else 0
+        rtp_ts, packets, octets = self._sender_info()
+        if packets > self._last_sent_packets:
+            self._last_sent_packets = packets
+            msw, lsw = _ntp_now()
+            body = (
+                struct.pack("!I", self._ssrc)
+                + _SENDER_INFO.pack(msw, lsw, rtp_ts, packets, octets)
+                + blocks
+            )
+            self.sr_sent += 1
+            return _header(RTCP_SR, count, len(body)) + body + self._sdes
+        body = struct.pack("!I", self._ssrc) + blocks
+        self.rr_sent += 1
+        return _header(RTCP_RR, count, len(body)) + body + self._sdes
+
+    async def _report_loop(self):
+        while self._remote_addr:
+            await asyncio.sleep(RTCP_INTERVAL_SECONDS * random.uniform(0.5, 1.5))
+            try:
+                self._sock.sendto(self._build_report(), self._remote_addr)
+            except OSError as e:
+                logger.warning(f"[RTCP] Send error: {e}")
+
+    # ── Receiving ────────────────────────────────────────────────────────
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, addr = self._sock.recvfrom(1500)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.warning(f"[RTCP] recvfrom error: {e}")
+                return
+            self._on_datagram(data, addr)
+
+    def _on_datagram(self, data, addr):
+        remote = self._remote_addr
+        if remote and addr != remote:
+            if addr[0] != remote[0]:
+                # Only the RTP peer may send reports; anything else is stray
+                # or spoofed and must not steer where ours go.
+                logger.debug(f"[RTCP] Ignoring report from {addr}, peer is {remote[0]}")
+                return
+            # Symmetric RTCP behind NAT: same host, rebound port
+            self._remote_addr = (remote[0], addr[1])
+        try:
+            self._parse_compound(data)
+        except struct.error:
+            logger.debug(f"[RTCP] Malformed packet from {addr} ({len(data)} B)")
+
+    def _parse_compound(self, data: bytes):
+        arrival = time.monotonic()
+        off = 0
+        while off + 4 <= len(data):
+            b0, pt, length = _HEADER.unpack_from(data, off)
+            if b0 >> 6 != 2:
+                return
+            end = off + 4 * (length + 1)
+            count = b0 & 0x1F
+            if pt == RTCP_SR:
+                msw, lsw = struct.unpack_from("!II", data, off + 8)
+                if struct.unpack_from("!I", data, off + 4)[0] == self.reception.ssrc:
+                    self.reception.last_sr = (_ntp_middle32(msw, lsw), arrival)
+                self._parse_blocks(data, off + 8 + _SENDER_INFO.size, count)
+            elif pt == RTCP_RR:
+                self._parse_blocks(data, off + 8, count)
+            elif pt == RTCP_BYE:
+                logger.info("[RTCP] BYE received from far end")
+            off = end
+
+    def _parse_blocks(self, data: bytes, off: int, count: int):
+        for i in range(count):
+            ssrc, lost, _ext, jitter, lsr, dlsr = _REPORT_BLOCK.unpack_from(
+                data, off + i * _REPORT_BLOCK.size
+            )
+            if ssrc != self._ssrc:
+                continue
+            self.reports_received += 1
+            self.remote_fraction_lost = (lost >> 24) / 256.0
+            cum = lost & 0xFFFFFF
+            self.remote_cumulative_lost = cum - 0x1000000 if cum & 0x800000 else cum
+            self.remote_jitter_ms = jitter * 1000.0 / SAMPLE_RATE_SIP
+            if lsr:
+                rtt = (_ntp_middle32(*_ntp_now()) - lsr - dlsr) & 0xFFFFFFFF
+                if rtt < 0x80000000:  # ignore reports that would give a negative RTT
+                    self.rtt_ms = rtt * 1000.0 / 65536
+            logger.debug(f"[RTCP] Report: {self.stats()}")
+
+    # ── Introspection / teardown ─────────────────────────────────────────
+
+    def stats(self, playout_delay_ms: float = 0.0) -> dict:
+        """Live call-quality stats. ``playout_delay_ms`` (our jitter buffer
+        depth) is added to half the RTT as the one-way delay for the MOS."""
+        rx = self.reception
+        local_loss = rx.cumulative_lost / rx.expected if rx.expected else 0.0
+        loss = max(local_loss, self.remote_fraction_lost)
+        delay = (self.rtt_ms or 0.0) / 2 + playout_delay_ms + RTP_PTIME_MS
+        return {
+            "rx_expected": rx.expected,
+            "rx_lost": rx.cumulative_lost,
+            "rx_jitter_ms": round(rx.jitter_ms, 2),
+            "remote_fraction_lost": round(self.remote_fraction_lost, 3),
+            "remote_lost": self.remote_cumulative_lost,
+            "remote_jitter_ms": round(self.remote_jitter_ms, 2),
+            "rtt_ms": None if self.rtt_ms is None else round(self.rtt_ms, 1),
+            "mos": mos_estimate(delay, loss),
+            "sr_sent": self.sr_sent,
+            "rr_sent": self.rr_sent,
+            "reports_received": self.reports_received,
+        }
+
+    def stop(self):
+        if self._send_task:
+            self._send_task.cancel()
+        if self._remote_addr:
+            body = struct.pack("!I", self._ssrc)
+            bye = _header(RTCP_BYE, 1, len(body)) + body
+            try:
+                self._sock.sendto(self._build_report() + bye, self._remote_addr)
+            except OSError:
+                pass
+        self._remote_addr = None
+        if self._demux is not None:
+            self._demux.unregister(self)
+            return  # the shared socket stays open for other calls
+        if self._reading:
+            try:
+                asyncio.get_event_loop().remove_reader(self._sock.fileno())
+            except Exception:
+                pass
+        try:
+            self._sock.close()
+        except Exception:
+            pass
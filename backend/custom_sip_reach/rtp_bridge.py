@@ -2,44 +2,143 @@
 RTP Media Bridge — bidirectional audio between LiveKit and SIP/RTP.
 
 Handles:
-  • Binding a UDP socket for RTP
-  • Receiving inbound RTP, decoding G.711, resampling to 48 kHz, pushing to LiveKit
+  • Binding a UDP socket for RTP, or sharing MediaMux's socket (see media_mux.py)
+  • Receiving inbound RTP, de-jittering it (see jitter_buffer.py), decoding G.711
+    (see g711.py), resampling to SAMPLE_RATE_LK, pushing to LiveKit
   • Receiving LiveKit audio, resampling to 8 kHz, encoding G.711, sending as RTP
-  • Buffering agent audio while SIP INVITE is in progress
+  • Resampling in both directions uses PolyphaseResampler (see resampler.py),
+    and is skipped entirely when the LiveKit side already runs at 8 kHz
+    (SIP_BRIDGE_AUDIO_PROFILE=narrowband)
+  • RTCP reports and call-quality stats on port + 1 (see rtcp.py)
+  • Pacing outbound RTP on a monotonic clock, with silence fill, once the
+    call is answered (agent audio queues until then)
+  • Early media: with the far end's SDP from a 180/183, the path opens
+    before answer — silence keep-alives go out, the far end's source address
+    is latched (symmetric RTP), and its ring-back is counted but kept from
+    the agent
 """
 
 import asyncio
-import collections
 import logging
 import random
 import socket
 import struct
 import time
-import warnings
-
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore", DeprecationWarning)
-    import audioop
 
+import numpy as np
 from livekit import rtc
 
+from .call_trace import CallTrace
 from .config import (
+    INBOUND_AUDIO_GAIN,
+    JITTER_MIN_DELAY_MS,
+    MEDIA_READY_JITTER_MS,
+    MEDIA_READY_PACKETS,
     PCMA_PAYLOAD_TYPE,
     PCMU_PAYLOAD_TYPE,
+    RTCP_ENABLED,
+    RTP_CAPTURE_FRAME_MS,
+    RTP_EARLY_KEEPALIVE_MS,
     RTP_HEADER_SIZE,
+    RTP_PLAYOUT_MAX_MS,
+    RTP_PTIME_MS,
+    RTP_RX_MAX_DRAIN,
+    RTP_RX_SLOT_BYTES,
     SAMPLE_RATE_LK,
     SAMPLE_RATE_SIP,
-    MAX_FRAME_BUFFER,
 )
+from .g711 import G711Codec
+from .jitter_buffer import JitterBuffer, PacketLossConcealer
+from .media_mux import MediaMux
+from .resampler import PolyphaseResampler
+from .rtcp import RTCPSession
 
 logger = logging.getLogger("sip_bridge_v3")
 
+_RTP_HEADER = struct.Struct("!BBHII")
+
+
+def _parse_rtp(data) -> tuple[int, int, int, int, int, int] | None:
+    """Return (pt, seq, ts, ssrc, payload_start, payload_end), or None if the
+    datagram is not a usable RTP v2 packet. Honours CSRCs, header extensions
+    and padding. ``data`` may be bytes or a memoryview — nothing is copied."""
+    n = len(data)
+    if n <= RTP_HEADER_SIZE:
+        return None
+    b0, b1, seq, ts, ssrc = _RTP_HEADER.unpack_from(data)
+    if b0 >> 6 != 2:
+        return None
+    start = RTP_HEADER_SIZE + 4 * (b0 & 0x0F)
+    if b0 & 0x10:
+        if n < start + 4:
+            return None
+        start += 4 + 4 * struct.unpack_from("!H", data, start + 2)[0]
+    end = n - (data[n - 1] if b0 & 0x20 else 0)
+    if end <= start:
+        return None
+    return b1 & 0x7F, seq, ts, ssrc, start, end
+
+
+class _PcmRing:
+    """Fixed-capacity int16 FIFO. Writing past capacity overwrites the oldest
+    samples (counted in ``dropped``) instead of growing."""
+
+    def __init__(self, capacity: int):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._cap = capacity
+        self._start = 0
+        self._len = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def write(self, pcm: np.ndarray):
+        n = len(pcm)
+        if n > self._cap:
+            self.dropped += n - self._cap
+            pcm, n = pcm[-self._cap :], self._cap
+        overflow = self._len + n - self._cap
+        if overflow > 0:
+            self._start = (self._start + overflow) % self._cap
+            self._len -= overflow
+            self.dropped += overflow
+        w = (self._start + self._len) % self._cap
+        first = min(n, self._cap - w)
+        self._buf[w : w + first] = pcm[:first]
+        self._buf[: n - first] = pcm[first:]
+        self._len += n
+
+    def read(self, n: int) -> tuple[np.ndarray, ...]:
+        """Consume ``n`` samples; returns one or two views (split at the wrap).
+        The views stay valid until the next write()."""
+        n = min(n, self._len)
+        s = self._start
+        first = min(n, self._cap - s)
+        self._start = (s + n) % self._cap
+        self._len -= n
+        if first == n:
+            return (self._buf[s : s + n],)
+        return self._buf[s:], self._buf[: n - first]
+
 
 class RTPMediaBridge:
-    def __init__(self, public_ip: str, bind_port: int):
+    def __init__(
+        self,
+        public_ip: str,
+        bind_port: int,
+        capture_frame_ms: int = RTP_CAPTURE_FRAME_MS,
+        mux: MediaMux | None = None,
+        trace: CallTrace | None = None,
+    ):
         """
-        public_ip  : Server's public/Elastic IP — written into SDP c= line.
-        bind_port  : UDP port to listen on (from PortPool).
+        public_ip        : Server's public/Elastic IP — written into SDP c= line.
+        bind_port        : UDP port to listen on (from PortPool).
+        capture_frame_ms : Inbound audio handed to LiveKit per capture_frame()
+                           call; a multiple of ptime (20 = one packet per frame).
+        mux              : Shared media sockets; when given, bind_port is ignored
+                           and the call is demultiplexed from mux.port.
+        trace            : The call's stage trace (first_rtp_in / first_rtp_out).
         """
         if not public_ip or public_ip == "0.0.0.0":
             raise ValueError(
@@ -47,21 +146,39 @@ class RTPMediaBridge:
                 f"Got: '{public_ip}'. Check EXOTEL_MEDIA_IP."
             )
         self._public_ip = public_ip
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
-        self._sock.bind(("0.0.0.0", bind_port))
-        self._sock.setblocking(False)
-        self.local_port = self._sock.getsockname()[1]
+        self._mux = mux
+        self._trace = trace or CallTrace()
+        if mux is not None:
+            self._sock = mux.rtp.sock
+            self.local_port = mux.port
+        else:
+            # No SO_REUSEADDR: on Linux it lets two UDP sockets share a port,
+            # silently splitting one call's media with another's. UDP has no
+            # TIME_WAIT, so it buys nothing here; PortPool probes instead.
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+            self._sock.bind(("0.0.0.0", bind_port))
+            self._sock.setblocking(False)
+            self.local_port = self._sock.getsockname()[1]
         logger.info(
-            f"[RTP] Socket bound 0.0.0.0:{self.local_port} "
+            f"[RTP] Socket {'shared' if mux else 'bound'} 0.0.0.0:{self.local_port} "
             f"| SDP advertises {public_ip}:{self.local_port}"
         )
 
         self._remote_addr: tuple[str, int] | None = None
+        self._sdp_addr: tuple[str, int] | None = None  # as the far end's SDP gave it
+        self._latched = False  # _remote_addr takes the first packet's source port
+        self._answered = False  # before this, only keep-alives go out
         self._running = False
         self.negotiated_pt = PCMA_PAYLOAD_TYPE
 
+        # Inbound decoders carry the volume boost; outbound encoders are unity gain
+        self._decoders = {
+            pt: G711Codec(pt, gain=INBOUND_AUDIO_GAIN)
+            for pt in (PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE)
+        }
+        self._encoder = G711Codec(PCMA_PAYLOAD_TYPE)
+
         self._audio_source: rtc.AudioSource | None = None
         self._local_track: rtc.LocalAudioTrack | None = None
 
@@ -69,31 +186,118 @@ class RTPMediaBridge:
         self._rtp_ts = random.randint(0, 0xFFFFFFFF)
         self._rtp_ssrc = random.randint(0, 0xFFFFFFFF)
 
-        self._rs_in = None  # resample state inbound
-        self._rs_out = None  # resample state outbound
+        # Streaming resamplers — filter state carries across frames. None when
+        # both sides share a rate (narrowband profile): audio passes straight through.
+        self._rs_in = (
+            PolyphaseResampler(SAMPLE_RATE_SIP, SAMPLE_RATE_LK)
+            if SAMPLE_RATE_LK != SAMPLE_RATE_SIP
+            else None
+        )
+        self._rs_out: PolyphaseResampler | None = None  # created on first frame
+
+        # Inbound: reorder / de-jitter before LiveKit, conceal gaps.
+        # The buffer must hold at least one coalesced frame before playing.
+        self._capture_ms = max(RTP_PTIME_MS, capture_frame_ms)
+        self._jitter = JitterBuffer(
+            min_delay_ms=max(JITTER_MIN_DELAY_MS, self._capture_ms)
+        )
+        self._jitter_primed = asyncio.Event()
+        self._plc = PacketLossConcealer()
+
+        # Receive ring: recvfrom_into() writes each datagram into the next
+        # slot and the jitter buffer keeps memoryviews into it, so no bytes
+        # object is created per packet. The ring is several times larger
+        # than the jitter buffer's capacity, so a slot is never overwritten
+        # while the packet in it is still waiting for playout.
+        slots = max(64, 4 * self._jitter.capacity)
+        ring = memoryview(bytearray(slots * RTP_RX_SLOT_BYTES))
+        self._rx_ring = [
+            ring[i * RTP_RX_SLOT_BYTES : (i + 1) * RTP_RX_SLOT_BYTES]
+            for i in range(slots)
+        ]
+        self._rx_slot = 0
+        self._max_drain = RTP_RX_MAX_DRAIN
 
         self._rx = 0
+        self._early_rx = 0  # before answer (ring-back, announcements)
+        self._foreign_rx = 0  # dropped: not from the SDP's media host
         self._tx = 0
+        self._rx_wakeups = 0  # reader callbacks
+        self._captures = 0  # capture_frame() calls
         self._first_rx = False
         self._first_tx = False
         self._last_rx_ts: float | None = None
 
-        # Buffer agent frames until set_remote_endpoint() is called
-        self._frame_buffer: collections.deque = collections.deque(
-            maxlen=MAX_FRAME_BUFFER
+        # Media readiness (after answer): consecutive packets whose arrival
+        # spacing matches their RTP timestamps. See media_ready_info().
+        self.media_ready = asyncio.Event()
+        self._ready_prev: tuple[int, int, float] | None = None  # ssrc, ts, arrival
+        self._ready_run = 0
+        self._ready_worst_ms = 0.0
+        self._ready_first_at: float | None = None
+
+        # Outbound playout queue: a fixed ring of 8kHz PCM drained by
+        # _send_loop. Bounded so audio queued before answer (or during a
+        # stall) cannot add permanent latency — the oldest is overwritten.
+        # At 8kHz a 20ms ptime is 160 samples; G.711 encodes 1:1, so the
+        # payload is 160 bytes and the whole RTP packet 172 bytes.
+        self._ptime_samples = SAMPLE_RATE_SIP * RTP_PTIME_MS // 1000
+        self._playout = _PcmRing(
+            max(self._ptime_samples, SAMPLE_RATE_SIP * RTP_PLAYOUT_MAX_MS // 1000)
+        )
+        self._last_enqueue = 0.0
+        self._send_task: asyncio.Task | None = None
+
+        # One reusable outbound packet: header via pack_into, payload encoded
+        # straight into it, sent from a memoryview.
+        self._pkt = bytearray(RTP_HEADER_SIZE + self._ptime_samples)
+        self._pkt_view = memoryview(self._pkt)
+        self._pkt_payload = np.frombuffer(
+            self._pkt, dtype=np.uint8, offset=RTP_HEADER_SIZE
         )
 
-        # ptime accumulator: collect PCM until we have exactly 20ms to send.
-        # At 8kHz, 16-bit mono: 20ms = 160 samples = 320 bytes of PCM.
-        # G.711 encodes 1:1, so payload = 160 bytes. Total RTP = 172 bytes.
-        # LiveKit sends 10ms frames, so we pack 2 frames → 1 RTP packet.
-        self._PTIME_BYTES = 320  # 20ms at 8kHz 16-bit
-        self._pcm_accumulator = b""
-
-    def set_remote_endpoint(self, ip: str, port: int, pt: int = PCMA_PAYLOAD_TYPE):
-        self._remote_addr = (ip, port)
+        # RTCP on the port PortPool reserves alongside ours. A call still
+        # works without it, so a bind failure only costs the quality stats.
+        self._rtcp: RTCPSession | None = None
+        if RTCP_ENABLED:
+            try:
+                self._rtcp = RTCPSession(
+                    self.local_port + 1 if bind_port else 0,
+                    self._rtp_ssrc,
+                    f"{self._rtp_ssrc:08x}@{public_ip}",
+                    self._sender_info,
+                    demux=mux.rtcp if mux else None,
+                )
+            except OSError as e:
+                logger.warning(f"[RTCP] Could not bind port {self.local_port + 1}: {e}")
+
+    def set_remote_endpoint(
+        self, ip: str, port: int, pt: int = PCMA_PAYLOAD_TYPE, early: bool = False
+    ):
+        """Open the media path to the far end's SDP address. ``early`` (SDP
+        in a 180/183) only sends keep-alives until a later call without it
+        (the answer) releases the queued agent audio."""
+        if (ip, port) != self._sdp_addr:
+            # A new address (the 200's SDP can differ from the 183's) is
+            # latched afresh
+            self._sdp_addr = self._remote_addr = (ip, port)
+            self._latched = False
+            if self._mux:
+                self._mux.rtp.set_remote(self, (ip, port))
+            if self._rtcp:
+                self._rtcp.start((ip, port + 1))
         self.negotiated_pt = pt
-        logger.info(f"[RTP] Remote endpoint → {ip}:{port} PT={pt}")
+        self._encoder = G711Codec(
+            pt if pt in (PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE) else PCMA_PAYLOAD_TYPE
+        )
+        if not early:
+            self._answered = True
+        logger.info(
+            f"[RTP] Remote endpoint → {ip}:{port} PT={pt}"
+            + (" (early media)" if early else "")
+        )
+        if self._send_task is None:
+            self._send_task = asyncio.create_task(self._send_loop())
 
     async def start_inbound(self, room: rtc.Room):
         self._audio_source = rtc.AudioSource(SAMPLE_RATE_LK, 1)
@@ -105,162 +309,364 @@ class RTPMediaBridge:
             source=rtc.TrackSource.SOURCE_MICROPHONE
         )
         await room.local_participant.publish_track(self._local_track, publish_options)
+        self._start_receiving()
+
+    def _start_receiving(self):
+        """Register the UDP reader and start the playout loop into _audio_source."""
         self._running = True
-        self._recv_queue: asyncio.Queue = asyncio.Queue()
 
-        # add_reader works with uvloop — sock_recvfrom does NOT
-        loop = asyncio.get_running_loop()
-        loop.add_reader(self._sock.fileno(), self._on_rtp_readable)
+        if self._mux:
+            self._mux.rtp.register(
+                self, self._on_mux_datagram, self._after_rx, self._on_mux_moved
+            )
+            if self._remote_addr:
+                # Early media opened before the route existed
+                self._mux.rtp.set_remote(self, self._remote_addr)
+        else:
+            # add_reader works with uvloop — sock_recvfrom does NOT
+            loop = asyncio.get_running_loop()
+            loop.add_reader(self._sock.fileno(), self._on_rtp_readable)
 
-        task = asyncio.create_task(self._recv_loop())
+        task = asyncio.create_task(self._playout_loop())
 
-        def _on_recv_done(t: asyncio.Task):
+        def _on_playout_done(t: asyncio.Task):
             if t.cancelled():
-                logger.info("[RTP] recv_loop cancelled")
+                logger.info("[RTP] playout_loop cancelled")
             elif t.exception():
-                logger.error("[RTP] recv_loop DIED", exc_info=t.exception())
+                logger.error("[RTP] playout_loop DIED", exc_info=t.exception())
             else:
-                logger.info("[RTP] recv_loop exited cleanly")
+                logger.info("[RTP] playout_loop exited cleanly")
 
-        task.add_done_callback(_on_recv_done)
+        task.add_done_callback(_on_playout_done)
         logger.info(
             f"[RTP] Inbound loop started, listening on 0.0.0.0:{self.local_port}"
         )
 
     def _on_rtp_readable(self):
-        """Called by event loop when UDP socket has data. Works with uvloop."""
-        try:
-            data, addr = self._sock.recvfrom(4096)
-            self._recv_queue.put_nowait((data, addr))
-        except BlockingIOError:
-            pass  # no data yet, ignore
-        except Exception as e:
-            logger.error(f"[RTP] recvfrom error: {e}")
-
-    async def _recv_loop(self):
-        logger.info(f"[RTP] recv_loop STARTED port={self.local_port}")
-        while self._running:
-            try:
-                data, addr = await asyncio.wait_for(self._recv_queue.get(), timeout=5.0)
-            except asyncio.TimeoutError:
-                continue  # just check _running flag
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"[RTP] Queue error: {e}")
-                continue
-
-            if len(data) <= RTP_HEADER_SIZE:
-                continue
-
-            if not self._first_rx:
-                logger.info(f"[RTP] ✅ First inbound RTP from {addr} ({len(data)} B)")
-                self._first_rx = True
-
-            self._rx += 1
-            self._last_rx_ts = time.time()
-            pt = data[1] & 0x7F
-            payload = data[RTP_HEADER_SIZE:]
+        """Called by event loop when UDP socket has data. Works with uvloop.
 
+        Drains every queued datagram (up to _max_drain, so one busy call cannot
+        starve the loop) instead of one per wakeup.
+        """
+        for _ in range(self._max_drain):
+            slot = self._rx_ring[self._rx_slot]
             try:
-                pcm8 = (
-                    audioop.alaw2lin(payload, 2)
-                    if pt == PCMA_PAYLOAD_TYPE
-                    else audioop.ulaw2lin(payload, 2)
-                )
-
-                # Boost volume — phone audio is often very quiet after G.711 decode
-                pcm8 = audioop.mul(pcm8, 2, 3.0)  # 3x amplification, tune as needed
-
-                pcm48, self._rs_in = audioop.ratecv(
-                    pcm8, 2, 1, SAMPLE_RATE_SIP, SAMPLE_RATE_LK, self._rs_in
-                )
-                frame = rtc.AudioFrame(
-                    data=pcm48,
-                    sample_rate=SAMPLE_RATE_LK,
-                    num_channels=1,
-                    samples_per_channel=len(pcm48) // 2,
-                )
-                await self._audio_source.capture_frame(frame)
+                nbytes, addr = self._sock.recvfrom_into(slot)
+            except BlockingIOError:
+                break  # socket drained
             except Exception as e:
-                logger.error(f"[RTP] Decode error: {e}", exc_info=True)
+                logger.error(f"[RTP] recvfrom error: {e}")
+                break
+            self._handle_datagram(slot, nbytes, addr)
+        self._after_rx()
+
+    def _on_mux_datagram(self, data: memoryview, addr):
+        """Mux mode: copy a datagram routed to this call into the receive
+        ring, then handle it as if recvfrom_into had written it there."""
+        slot = self._rx_ring[self._rx_slot]
+        nbytes = len(data)
+        slot[:nbytes] = data
+        self._handle_datagram(slot, nbytes, addr)
+
+    def _on_mux_moved(self, addr):
+        """Mux mode: the demux re-latched this call's stream to ``addr``
+        (NAT rebinding), so send there too rather than to the stale port."""
+        if addr != self._remote_addr:
+            logger.info(f"[RTP] Remote moved {self._remote_addr} → {addr}")
+            self._remote_addr = addr
+
+    def _handle_datagram(self, slot: memoryview, nbytes: int, addr):
+        sdp = self._sdp_addr
+        if sdp and addr[0] != sdp[0]:
+            # Only the host the far end's SDP named may send media; anything
+            # else is stray or spoofed and must not steer where ours go
+            self._foreign_rx += 1
+            if self._foreign_rx == 1:
+                logger.warning(f"[RTP] Ignoring media from {addr}, SDP host is {sdp[0]}")
+            return  # slot is not advanced, so it is simply reused
+        data = slot[:nbytes]
+        hdr = _parse_rtp(data)
+        if hdr is None:
+            return
+        pt, seq, ts, ssrc, start, end = hdr
+        if not self._latched and sdp:
+            self._latch(addr[1])
+        if not self._answered:
+            # Ring-back / announcements: the path is open, but it is not the
+            # callee yet, so none of it reaches the agent
+            self._early_rx += 1
+            if self._early_rx == 1:
+                logger.info(f"[RTP] Early media from {addr} (PT={pt})")
+                self._trace.mark("early_media_in")
+            return
+        self._rx_slot = (self._rx_slot + 1) % len(self._rx_ring)
+
+        if not self._first_rx:
+            logger.info(f"[RTP] ✅ First inbound RTP from {addr} ({nbytes} B)")
+            self._first_rx = True
+            self._trace.mark("first_rtp_in")
+
+        self._rx += 1
+        self._last_rx_ts = time.time()
+        arrival = time.monotonic()
+        if not self.media_ready.is_set():
+            self._check_media_ready(ssrc, ts, arrival)
+        if self._rtcp:
+            self._rtcp.reception.update(seq, ts, ssrc, arrival)
+        # Non-G.711 payloads (telephone-event, CN) still occupy a sequence
+        # slot; they are stored without a decoder and played out as a gap.
+        self._jitter.push(
+            seq,
+            ts,
+            ssrc,
+            (self._decoders.get(pt), data[start:end]),
+            arrival,
+        )
 
-    async def send_to_rtp(self, frame: rtc.AudioFrame):
-        """Send agent audio to remote RTP. Buffers if SIP not yet answered."""
-        if not self._remote_addr:
-            self._frame_buffer.append(frame)
+    def _latch(self, port: int):
+        """Symmetric RTP: send to the port the far end's first packet came
+        from, which behind NAT is not what its SDP says. The host stays the
+        SDP's."""
+        self._latched = True
+        addr = (self._sdp_addr[0], port)
+        if addr != self._remote_addr:
+            logger.info(f"[RTP] Latched {self._remote_addr} → {addr}")
+            self._remote_addr = addr
+            if self._mux:
+                self._mux.rtp.set_remote(self, addr)
+
+    def _check_media_ready(self, ssrc: int, ts: int, arrival: float):
+        prev, self._ready_prev = self._ready_prev, (ssrc, ts, arrival)
+        if prev is None:
+            self._ready_first_at = time.time()
             return
-        # Flush buffer once (after set_remote_endpoint called)
-        while self._frame_buffer:
-            await self._send_frame(self._frame_buffer.popleft())
-        await self._send_frame(frame)
-
-    async def _send_frame(self, frame: rtc.AudioFrame):
-        """Accumulate PCM until we have 20ms, then send one RTP packet.
-
-        Why: SDP advertises a=ptime:20. Exotel expects 160-byte G.711 payloads
-        (20ms @ 8kHz). LiveKit produces 10ms frames (80 bytes). Sending 10ms
-        packets causes Exotel to drop them → caller hears silence.
-        We buffer until we have exactly 320 bytes of 8kHz 16-bit PCM (= 20ms),
-        then encode and send one correctly-sized packet.
-        """
-        if not self._remote_addr:
+        expected = ((ts - prev[1]) & 0xFFFFFFFF) / SAMPLE_RATE_SIP
+        deviation_ms = abs((arrival - prev[2]) - expected) * 1000
+        if ssrc != prev[0] or expected > 1.0 or deviation_ms > MEDIA_READY_JITTER_MS:
+            self._ready_run = 0  # new stream, reordered / lost, or burst
+            self._ready_worst_ms = 0.0
             return
-        try:
-            raw = bytes(frame.data.cast("b"))
-            pcm8, self._rs_out = audioop.ratecv(
-                raw, 2, 1, frame.sample_rate, SAMPLE_RATE_SIP, self._rs_out
+        self._ready_run += 1
+        self._ready_worst_ms = max(self._ready_worst_ms, deviation_ms)
+        if self._ready_run >= MEDIA_READY_PACKETS:
+            self._trace.mark("media_ready")
+            logger.info(
+                f"[RTP] Media ready — {self._ready_run} packets within "
+                f"{self._ready_worst_ms:.1f}ms of their timing"
             )
-            self._pcm_accumulator += pcm8
-
-            # Send one packet per full 20ms chunk; discard any remainder
-            # (remainder is < 10ms and will be completed by the next frame)
-            while len(self._pcm_accumulator) >= self._PTIME_BYTES:
-                chunk = self._pcm_accumulator[: self._PTIME_BYTES]
-                self._pcm_accumulator = self._pcm_accumulator[self._PTIME_BYTES :]
-
-                payload = (
-                    audioop.lin2alaw(chunk, 2)
-                    if self.negotiated_pt == PCMA_PAYLOAD_TYPE
-                    else audioop.lin2ulaw(chunk, 2)
-                )
+            self.media_ready.set()
+
+    def media_ready_info(self) -> dict:
+        """Payload of the "media_ready" event sent to the agent."""
+        return {
+            "first_rtp_at": self._ready_first_at,
+            "stable_packets": self._ready_run,
+            "max_deviation_ms": round(self._ready_worst_ms, 1),
+        }
+
+    def _after_rx(self):
+        """End of one reader wakeup (own socket or mux)."""
+        self._rx_wakeups += 1
+        if self._jitter.primed:
+            self._jitter_primed.set()
+
+    async def _playout_loop(self):
+        """Pull packets from the jitter buffer into LiveKit, one capture per
+        ``_capture_ms`` (one or more ptimes coalesced into a single frame)."""
+        logger.info(
+            f"[RTP] playout_loop STARTED port={self.local_port} "
+            f"frame={self._capture_ms}ms"
+        )
+        per_frame = max(1, self._capture_ms // RTP_PTIME_MS)
+        tick = per_frame * RTP_PTIME_MS / 1000.0
+        next_tick = time.monotonic()
+        while self._running:
+            if not self._jitter.primed:
+                # Buffer ran dry (or never started) — sleep until it refills
+                self._jitter_primed.clear()
+                await self._jitter_primed.wait()
+                if not self._running:
+                    break
+                next_tick = time.monotonic()
+
+            parts = []
+            for _ in range(per_frame):
+                item = self._jitter.pop()
+                if item is not None and item[0] is not None:
+                    decoder, payload = item
+                    pcm8 = decoder.decode(payload)
+                    self._plc.good(pcm8)
+                else:
+                    pcm8 = self._plc.conceal()
+                if pcm8 is not None:
+                    parts.append(pcm8)
+
+            if parts:
+                try:
+                    pcm8 = parts[0] if len(parts) == 1 else np.concatenate(parts)
+                    pcm = self._rs_in.process(pcm8) if self._rs_in else pcm8
+                    frame = rtc.AudioFrame(
+                        data=pcm.tobytes(),
+                        sample_rate=SAMPLE_RATE_LK,
+                        num_channels=1,
+                        samples_per_channel=len(pcm),
+                    )
+                    await self._audio_source.capture_frame(frame)
+                    self._captures += 1
+                except Exception as e:
+                    logger.error(f"[RTP] Decode error: {e}", exc_info=True)
+
+            next_tick += tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.2:
+                # Loop stalled; the jitter buffer has already capped latency,
+                # so resume pacing from now instead of bursting to catch up.
+                next_tick = time.monotonic()
 
-                # Timestamp advances by exactly 160 samples (20ms @ 8kHz)
-                self._rtp_seq = (self._rtp_seq + 1) & 0xFFFF
-                self._rtp_ts = (self._rtp_ts + 160) & 0xFFFFFFFF
-                hdr = struct.pack(
-                    "!BBHII",
-                    0x80,
-                    self.negotiated_pt,
-                    self._rtp_seq,
-                    self._rtp_ts,
-                    self._rtp_ssrc,
-                )
-                self._sock.sendto(hdr + payload, self._remote_addr)
-                self._tx += 1
+    async def send_to_rtp(self, frame: rtc.AudioFrame):
+        """Queue agent audio for the paced sender (see _send_loop).
 
-                if not self._first_tx:
-                    logger.info(
-                        f"[RTP] ✅ First outbound RTP sent to {self._remote_addr} "
-                        f"(payload={len(payload)}B = 20ms ✓)"
-                    )
-                    self._first_tx = True
+        Why 20ms packets: SDP advertises a=ptime:20. Exotel expects 160-byte
+        G.711 payloads (20ms @ 8kHz). LiveKit produces 10ms frames. Sending
+        10ms packets causes Exotel to drop them → caller hears silence. The
+        ring lets the sender take exactly one ptime per packet.
+        """
+        try:
+            pcm = np.frombuffer(frame.data, dtype=np.int16)
+            if frame.sample_rate != SAMPLE_RATE_SIP:
+                if self._rs_out is None or self._rs_out.in_rate != frame.sample_rate:
+                    self._rs_out = PolyphaseResampler(frame.sample_rate, SAMPLE_RATE_SIP)
+                pcm = self._rs_out.process(pcm)
+            self._playout.write(pcm)
+            self._last_enqueue = time.monotonic()
         except Exception as e:
             logger.error(f"[RTP] Send error: {e}")
 
+    def _fill_payload(self, primed: bool) -> bool:
+        """Encode the next ptime into the packet buffer. Returns whether the
+        sender should stay primed (False after an underrun or tail flush)."""
+        samples = self._ptime_samples
+        take = min(len(self._playout), samples) if primed else 0
+        pos = 0
+        for part in self._playout.read(take):
+            self._encoder.encode(part, out=self._pkt_payload[pos : pos + len(part)])
+            pos += len(part)
+        if pos < samples:
+            self._pkt_payload[pos:] = self._encoder.silence_byte
+        return take == samples
+
+    async def _send_loop(self):
+        """Emit exactly one RTP packet per ptime on a monotonic clock.
+
+        Drains the playout ring and fills gaps with encoded silence, so the
+        far end sees a steady 50 pps stream with continuous seq/timestamps
+        whether or not the agent is speaking. After an underrun it waits for
+        two ptimes of audio before resuming, so 10ms LiveKit frames landing
+        just after a tick don't cause a gap on every packet.
+
+        Before answer (early media) a packet of silence goes out only every
+        RTP_EARLY_KEEPALIVE_MS, and the agent's audio stays queued; the
+        timestamp keeps advancing with the clock in between.
+        """
+        ptime = RTP_PTIME_MS / 1000.0
+        samples = self._ptime_samples
+        keepalive_every = max(1, RTP_EARLY_KEEPALIVE_MS // RTP_PTIME_MS)
+        keepalive_in = 1  # ticks until the next early keep-alive
+        next_tick = time.monotonic()
+        marker = 0x80  # M bit on the first packet of the stream
+        primed = False
+        answered = False
+        while self._remote_addr:
+            self._rtp_ts = (self._rtp_ts + samples) & 0xFFFFFFFF
+            if self._answered:
+                if not answered:
+                    answered = True
+                    marker = 0x80  # and on the first once the callee is there
+                if not primed:
+                    avail = len(self._playout)
+                    stale = time.monotonic() - self._last_enqueue > 2 * ptime
+                    primed = avail >= 2 * samples or (avail > 0 and stale)
+                primed = self._fill_payload(primed)
+            else:
+                keepalive_in -= 1
+                if keepalive_in > 0:
+                    next_tick = await self._wait_tick(next_tick, ptime)
+                    continue
+                keepalive_in = keepalive_every
+                self._fill_payload(False)
+
+            self._rtp_seq = (self._rtp_seq + 1) & 0xFFFF
+            _RTP_HEADER.pack_into(
+                self._pkt,
+                0,
+                0x80,
+                marker | self.negotiated_pt,
+                self._rtp_seq,
+                self._rtp_ts,
+                self._rtp_ssrc,
+            )
+            marker = 0
+            try:
+                self._sock.sendto(self._pkt_view, self._remote_addr)
+                self._tx += 1
+            except OSError as e:
+                logger.error(f"[RTP] Send error: {e}")
+
+            if not self._first_tx and answered:
+                logger.info(
+                    f"[RTP] ✅ First outbound RTP sent to {self._remote_addr} "
+                    f"(payload={samples}B = 20ms ✓)"
+                )
+                self._first_tx = True
+                self._trace.mark("first_rtp_out")
+
+            next_tick = await self._wait_tick(next_tick, ptime)
+
+    async def _wait_tick(self, next_tick: float, ptime: float) -> float:
+        """Sleep until the next ptime; returns the tick after it."""
+        samples = self._ptime_samples
+        next_tick += ptime
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -0.2:
+            # Loop stalled — don't burst the missed packets. Skip them,
+            # advancing the timestamp so the far end sees the real gap.
+            missed = int(-delay / ptime)
+            self._rtp_ts = (self._rtp_ts + missed * samples) & 0xFFFFFFFF
+            next_tick += missed * ptime
+        return next_tick
+
+    def _sender_info(self) -> tuple[int, int, int]:
+        """(RTP timestamp, packets, payload octets) for RTCP sender reports."""
+        return self._rtp_ts, self._tx, self._tx * self._ptime_samples
+
     def stop(self):
         self._running = False
-        try:
-            loop = asyncio.get_event_loop()
-            loop.remove_reader(self._sock.fileno())
-        except Exception:
-            # might not be registered or loop might be closed
-            pass
-        try:
-            self._sock.close()
-        except Exception:
-            pass
-        logger.info(f"[RTP] Stopped | RX={self._rx} TX={self._tx}")
+        self._jitter_primed.set()  # wake the playout loop so it can exit
+        if self._send_task:
+            self._send_task.cancel()
+        if self._rtcp:
+            self._rtcp.stop()
+        if self._mux:
+            self._mux.rtp.unregister(self)  # the shared socket stays open
+        else:
+            try:
+                loop = asyncio.get_event_loop()
+                loop.remove_reader(self._sock.fileno())
+            except Exception:
+                # might not be registered or loop might be closed
+                pass
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+        logger.info(
+            f"[RTP] Stopped | RX={self._rx} TX={self._tx} "
+            f"jitter_buffer={self._jitter.stats()} rtcp={self.stats().get('rtcp')}"
+        )
         if self._rx == 0:
             logger.warning(
                 "[RTP] ⚠️  ZERO inbound packets! Likely causes:\n"
@@ -272,6 +678,23 @@ class RTPMediaBridge:
                 self.local_port,
             )
 
+    def stats(self) -> dict:
+        return {
+            "rx": self._rx,
+            "early_rx": self._early_rx,
+            "foreign_rx": self._foreign_rx,
+            "tx": self._tx,
+            "rx_wakeups": self._rx_wakeups,
+            "captures": self._captures,
+            "playout_dropped_ms": self._playout.dropped * 1000 // SAMPLE_RATE_SIP,
+            "jitter_buffer": self._jitter.stats(),
+            "rtcp": (
+                self._rtcp.stats(playout_delay_ms=self._jitter.depth * RTP_PTIME_MS)
+                if self._rtcp
+                else None
+            ),
+        }
+
     def seconds_since_rx(self) -> float | None:
         if self._last_rx_ts is None:
             return None
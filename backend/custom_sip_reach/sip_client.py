@@ -3,10 +3,14 @@ Exotel SIP Client — handles SIP signalling over TCP.
 
 Responsibilities:
   • Build SDP, INVITE, ACK, BYE messages
-  • Connect to Exotel SIP proxy
+  • Signal on a shared trunk connection to the Exotel proxy, or on a
+    connection of its own (sip_trunk.py)
   • Handle 401/407 digest-auth challenges
   • Parse 200 OK to extract remote RTP endpoint
+  • Early media: the SDP of a 180/183 is handed over as soon as it arrives,
+    and reliable provisionals (100rel) are acknowledged with PRACK
   • Monitor for remote BYE (hang-up detection)
+  • CANCEL a ringing INVITE when the rest of the call setup fails
 """
 
 import asyncio
@@ -14,6 +18,7 @@ import logging
 import random
 import time
 import uuid
+from typing import Callable
 
 from .config import (
     EXOTEL_AUTH_PASSWORD,
@@ -27,24 +32,83 @@ from .config import (
     EXOTEL_SIP_PORT,
     PCMA_PAYLOAD_TYPE,
 )
-from .digest_auth import calculate_digest_auth
+from .call_trace import CallTrace
+from .digest_auth import get_digest_cache, is_stale
+from .sip_message import SipMessage, render_request, render_response
+from .sip_trunk import open_sip_channel
 
 logger = logging.getLogger("sip_bridge_v3")
 
+# Headers after the dialog-specific ones, identical on every INVITE
+_INVITE_TAIL = (
+    "Supported: 100rel, timer",
+    "Allow: INVITE, ACK, CANCEL, BYE, OPTIONS, UPDATE, PRACK",
+    "Content-Type: application/sdp",
+)
+# 401/407s answered per INVITE (a stale nonce can follow a wrong one)
+_MAX_AUTH_CHALLENGES = 3
+# _on_invite_response(): the transaction is still going
+_PENDING = object()
+
+
+def _parse_sdp(body: str) -> dict | None:
+    """Remote RTP endpoint from an SDP answer, or None without one."""
+    rip, rport, rpt = None, 0, PCMA_PAYLOAD_TYPE
+    for line in body.splitlines():
+        if line.startswith("c=IN IP4"):
+            rip = line.split()[-1]
+        if line.startswith("m=audio"):
+            parts = line.split()
+            rport = int(parts[1])
+            if len(parts) > 3:
+                rpt = int(parts[3])
+    if not rip or not rport:
+        return None
+    return {"remote_ip": rip, "remote_port": rport, "pt": rpt}
+
 
 class ExotelSipClient:
-    def __init__(self, callee: str, rtp_port: int):
+    def __init__(
+        self,
+        callee: str,
+        rtp_port: int,
+        trace: CallTrace | None = None,
+        on_early_media: Callable[[dict], None] | None = None,
+    ):
+        """``on_early_media`` gets the remote RTP endpoint (as send_invite()
+        returns it) from a 180/183 with SDP, before the call is answered."""
         self.callee = callee
         self.rtp_port = rtp_port
+        self.trace = trace or CallTrace()
+        self._on_early_media = on_early_media
         self._branch = f"z9hG4bK-{uuid.uuid4().hex}"
         self._tag = f"trunk{random.randint(10000, 99999)}"
         self._call_id = str(uuid.uuid4())
         self._cseq = 1
+        self._invite_cseq = 1  # ACK and CANCEL reuse it; PRACK / BYE move on
         self._to_tag = None
         self._remote_contact_uri = None
         self._route_set: list[str] = []
-        self._reader: asyncio.StreamReader | None = None
-        self._writer: asyncio.StreamWriter | None = None
+        # Trunk dialog or own TCP connection (sip_trunk.py)
+        self._conn = None
+        # Header lines that stay the same for the whole dialog
+        self._uri = f"sip:{callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}"
+        self._via_prefix = f"Via: SIP/2.0/TCP {EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};branch="
+        self._from_hdr = f'From: "{EXOTEL_CALLER_ID}" <sip:{EXOTEL_CALLER_ID}@{EXOTEL_FROM_DOMAIN}>;tag={self._tag}'
+        self._to_hdr = f"To: <{self._uri}>"
+        self._call_id_hdr = f"Call-ID: {self._call_id}"
+        self._contact_hdr = f"Contact: <sip:{EXOTEL_CALLER_ID}@{EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};transport=tcp>"
+        # Final INVITE response code (408 on our own timeout), None if the
+        # transaction never completed
+        self.final_status: int | None = None
+        self._challenges = 0
+        # CANCEL waits for a provisional response to the INVITE (RFC 3261 §9.1)
+        self._provisional = False
+        self._cancel_wanted = False
+        # Early media: the endpoint from the last 18x SDP, and the RSeq of
+        # the last reliable provisional (RFC 3262)
+        self.early_media: dict | None = None
+        self._rseq: int | None = None
 
     # ── SDP / Message Builders ───────────────────────────────────────────
 
@@ -64,107 +128,97 @@ class ExotelSipClient:
     def _sdp(self) -> str:
         return self._generate_sdp(self.rtp_port)
 
+    def _via(self, branch: str | None = None) -> str:
+        return f"{self._via_prefix}{branch or self._branch};rport"
+
+    def _to(self) -> str:
+        return f"{self._to_hdr};tag={self._to_tag}" if self._to_tag else self._to_hdr
+
+    def _in_dialog(
+        self, method: str, via: str, cseq: int | None = None, extra: tuple = ()
+    ) -> bytes:
+        # Requests inside the dialog follow the Contact and route set of the
+        # 200 (or, while it is early, of the 18x)
+        h = [via, "Max-Forwards: 70"]
+        h.extend(f"Route: {route}" for route in self._route_set)
+        h.extend([self._from_hdr, self._to(), self._call_id_hdr])
+        h.append(f"CSeq: {cseq or self._cseq} {method}")
+        h.extend(extra)
+        return render_request(method, self._remote_contact_uri or self._uri, h)
+
     def _invite(self, auth: str | None = None, proxy: bool = False) -> bytes:
-        sdp = self._sdp()
-        req = f"sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}"
+        self._invite_cseq = self._cseq
         h = [
-            f"INVITE {req} SIP/2.0",
-            f"Via: SIP/2.0/TCP {EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};branch={self._branch};rport",
-            f"Max-Forwards: 70",
-            f'From: "{EXOTEL_CALLER_ID}" <sip:{EXOTEL_CALLER_ID}@{EXOTEL_FROM_DOMAIN}>;tag={self._tag}',
-            f"To: <sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}>",
-            f"Call-ID: {self._call_id}",
+            self._via(),
+            "Max-Forwards: 70",
+            self._from_hdr,
+            self._to_hdr,
+            self._call_id_hdr,
             f"CSeq: {self._cseq} INVITE",
-            f"Contact: <sip:{EXOTEL_CALLER_ID}@{EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};transport=tcp>",
-            f"Supported: 100rel, timer",
-            f"Allow: INVITE, ACK, CANCEL, BYE, OPTIONS, UPDATE",
-            f"Content-Type: application/sdp",
-            f"Content-Length: {len(sdp.encode())}",
+            self._contact_hdr,
         ]
         if auth:
-            h.insert(
-                7, f"{'Proxy-Authorization' if proxy else 'Authorization'}: {auth}"
-            )
-        return ("\r\n".join(h) + "\r\n\r\n" + sdp).encode()
+            h.append(f"{'Proxy-Authorization' if proxy else 'Authorization'}: {auth}")
+        h.extend(_INVITE_TAIL)
+        return render_request("INVITE", self._uri, h, self._sdp())
 
     def _ack(self) -> bytes:
-        to = f"<sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}>" + (
-            f";tag={self._to_tag}" if self._to_tag else ""
-        )
-        req_uri = self._remote_contact_uri or f"sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}"
-        
+        return self._in_dialog("ACK", self._via(), self._invite_cseq)
+
+    def _ack_failure(self, msg: SipMessage) -> bytes:
+        # The ACK of a non-2xx final belongs to the INVITE transaction: its
+        # Request-URI and Via branch, the To (and tag) of the response
+        # (RFC 3261 §17.1.1.3)
+        to = msg.get("to")
         h = [
-            f"ACK {req_uri} SIP/2.0",
-            f"Via: SIP/2.0/TCP {EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};branch={self._branch};rport",
-            f"Max-Forwards: 70",
+            self._via(),
+            "Max-Forwards: 70",
+            self._from_hdr,
+            f"To: {to}" if to else self._to_hdr,
+            self._call_id_hdr,
+            f"CSeq: {self._invite_cseq} ACK",
         ]
-        
-        for route in self._route_set:
-            h.append(f"Route: {route}")
-            
-        h.extend([
-            f'From: "{EXOTEL_CALLER_ID}" <sip:{EXOTEL_CALLER_ID}@{EXOTEL_FROM_DOMAIN}>;tag={self._tag}',
-            f"To: {to}",
-            f"Call-ID: {self._call_id}",
-            f"CSeq: {self._cseq} ACK",
-            "Content-Length: 0",
-        ])
-        
-        return ("\r\n".join(h) + "\r\n\r\n").encode()
+        return render_request("ACK", self._uri, h)
 
-    def _bye(self) -> bytes:
-        to = f"<sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}>" + (
-            f";tag={self._to_tag}" if self._to_tag else ""
-        )
+    def _prack(self, rseq: int) -> bytes:
         self._cseq += 1
-        req_uri = self._remote_contact_uri or f"sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}"
+        return self._in_dialog(
+            "PRACK",
+            self._via(f"z9hG4bK-{uuid.uuid4().hex}"),
+            extra=(f"RAck: {rseq} {self._invite_cseq} INVITE",),
+        )
 
+    def _cancel(self) -> bytes:
+        # Same Request-URI, Via branch and CSeq number as the INVITE it
+        # cancels (RFC 3261 §9.1)
         h = [
-            f"BYE {req_uri} SIP/2.0",
-            f"Via: SIP/2.0/TCP {EXOTEL_CUSTOMER_IP}:{EXOTEL_CUSTOMER_SIP_PORT};branch=z9hG4bK-{uuid.uuid4().hex};rport",
-            f"Max-Forwards: 70",
+            self._via(),
+            "Max-Forwards: 70",
+            self._from_hdr,
+            self._to_hdr,
+            self._call_id_hdr,
+            f"CSeq: {self._invite_cseq} CANCEL",
         ]
+        return render_request("CANCEL", self._uri, h)
 
-        for route in self._route_set:
-            h.append(f"Route: {route}")
+    def _bye(self) -> bytes:
+        self._cseq += 1
+        return self._in_dialog("BYE", self._via(f"z9hG4bK-{uuid.uuid4().hex}"))
 
-        h.extend([
-            f'From: "{EXOTEL_CALLER_ID}" <sip:{EXOTEL_CALLER_ID}@{EXOTEL_FROM_DOMAIN}>;tag={self._tag}',
-            f"To: {to}",
-            f"Call-ID: {self._call_id}",
-            f"CSeq: {self._cseq} BYE",
-            "Content-Length: 0",
-        ])
-        
-        return ("\r\n".join(h) + "\r\n\r\n").encode()
+    @staticmethod
+    def _response_200_ok(hdrs, via_headers: list[str] | None = None) -> bytes:
+        return ExotelSipClient._response(hdrs, "200 OK", via_headers)
 
     @staticmethod
-    def _response_200_ok(hdrs: dict, via_headers: list[str] | None = None) -> bytes:
-        def _get(name: str) -> str | None:
-            return hdrs.get(name)
-
-        h = ["SIP/2.0 200 OK"]
-        if via_headers:
-            for via in via_headers:
-                h.append(f"Via: {via}")
-        else:
-            via = _get("via")
-            if via:
-                h.append(f"Via: {via}")
-        frm = _get("from")
-        if frm:
-            h.append(f"From: {frm}")
-        to = _get("to")
-        if to:
-            h.append(f"To: {to}")
-        call_id = _get("call-id")
-        if call_id:
-            h.append(f"Call-ID: {call_id}")
-        cseq = _get("cseq")
-        if cseq:
-            h.append(f"CSeq: {cseq}")
-        h.append("Content-Length: 0")
-        return ("\r\n".join(h) + "\r\n\r\n").encode()
+    def _response(
+        hdrs,
+        status: str,
+        via_headers: list[str] | None = None,
+        extra: list[str] | None = None,
+    ) -> bytes:
+        """Body-less response echoing the request's Via/From/To/Call-ID/CSeq.
+        ``hdrs`` is the request's SipMessage (or a header dict)."""
+        return render_response(hdrs, status, via_headers, extra)
 
     # ── Properties ───────────────────────────────────────────────────────
 
@@ -175,172 +229,210 @@ class ExotelSipClient:
     # ── Connection / Signalling ──────────────────────────────────────────
 
     async def connect(self):
-        self._reader, self._writer = await asyncio.wait_for(
-            asyncio.open_connection(EXOTEL_SIP_HOST, EXOTEL_SIP_PORT), timeout=10.0
-        )
+        self._conn = await open_sip_channel(self._call_id, self._tag)
+        self.trace.mark("sip_connected")
         logger.info("[SIP] TCP connected")
 
     async def send_invite(self) -> dict | None:
-        self._writer.write(self._invite())
-        await self._writer.drain()
-        logger.info("[SIP] INVITE →")
+        # Signed with the last nonce, if there is one, instead of waiting
+        # to be challenged
+        auth = None
+        if EXOTEL_AUTH_USERNAME:
+            auth = get_digest_cache().authorize(
+                "INVITE", self._uri, EXOTEL_AUTH_USERNAME, EXOTEL_AUTH_PASSWORD
+            )
+        if auth:
+            await self._conn.send(self._invite(auth=auth[0], proxy=auth[1]))
+        else:
+            await self._conn.send(self._invite())
+        self.trace.mark("invite_sent")
+        logger.info("[SIP] INVITE →" + (" (pre-authorized)" if auth else ""))
         return await self._recv_loop()
 
+    async def send_cancel(self):
+        """Give up on the INVITE while it is still ringing. send_invite()
+        then returns None with the 487 that ends the transaction. Before
+        any provisional response the CANCEL waits for the first one; a
+        final response that comes first ends the INVITE without it."""
+        if self._conn and self.final_status is None and not self._cancel_wanted:
+            self._cancel_wanted = True
+            if self._provisional:
+                await self._send_cancel()
+
+    async def _send_cancel(self):
+        try:
+            await self._conn.send(self._cancel())
+            logger.info("[SIP] CANCEL →")
+        except Exception:
+            pass
+
     async def _recv_loop(self) -> dict | None:
-        buf = b""
         while True:
             try:
-                chunk = await asyncio.wait_for(self._reader.read(8192), timeout=60.0)
-                if not chunk:
+                msg = await self._conn.recv(60.0)
+                if msg is None:
                     return None
-                buf += chunk
-
-                while b"\r\n\r\n" in buf:
-                    he = buf.index(b"\r\n\r\n")
-                    hb = buf[:he].decode(errors="replace")
-                    rest = buf[he + 4 :]
-                    lines = hb.split("\r\n")
-                    status = lines[0]
-                    hdrs = {}
-                    record_routes = []
-                    for l in lines[1:]:
-                        if ":" in l:
-                            k, v = l.split(":", 1)
-                            k = k.strip().lower()
-                            v = v.strip()
-                            if k == "record-route":
-                                record_routes.append(v)
-                            else:
-                                hdrs[k] = v
-
-                    cl = int(hdrs.get("content-length", "0"))
-                    if len(rest) < cl:
-                        break
-                    body = rest[:cl].decode(errors="replace")
-                    buf = rest[cl:]
-
-                    logger.info(f"[SIP] ← {status}")
-                    code = int(status.split()[1])
-                    if code in (100,):
-                        continue
-                    if 180 <= code <= 183:
-                        continue
-
-                    if code in (401, 407):
-                        ah = "www-authenticate" if code == 401 else "proxy-authenticate"
-                        if ah not in hdrs or not EXOTEL_AUTH_USERNAME:
-                            logger.error("[SIP] Auth required but no credentials")
-                            return None
-                        self._writer.write(self._ack())
-                        await self._writer.drain()
-                        self._cseq += 1
-                        self._branch = f"z9hG4bK-{uuid.uuid4().hex}"
-                        uri = f"sip:{self.callee}@{EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT}"
-                        auth = calculate_digest_auth(
-                            "INVITE",
-                            uri,
-                            EXOTEL_AUTH_USERNAME,
-                            EXOTEL_AUTH_PASSWORD,
-                            hdrs[ah],
-                        )
-                        self._writer.write(self._invite(auth=auth, proxy=(code == 407)))
-                        await self._writer.drain()
-                        logger.info("[SIP] Re-INVITE with auth →")
-                        continue
-
-                    if code == 200:
-                        if "tag=" in hdrs.get("to", ""):
-                            self._to_tag = hdrs["to"].split("tag=")[-1].split(";")[0]
-                        if "contact" in hdrs:
-                            # Usually formatted like: <sip:...>
-                            c_raw = hdrs["contact"]
-                            if "<" in c_raw and ">" in c_raw:
-                                self._remote_contact_uri = c_raw[c_raw.find("<")+1 : c_raw.find(">")]
-                            else:
-                                self._remote_contact_uri = c_raw
-                        if record_routes:
-                            # Reverse order for ACK/BYE Requests
-                            self._route_set = list(reversed(record_routes))
-
-                        self._writer.write(self._ack())
-                        await self._writer.drain()
-                        logger.info("[SIP] ✅ 200 OK — ACK sent")
-
-                        rip, rport, rpt = None, 0, PCMA_PAYLOAD_TYPE
-                        for line in body.splitlines():
-                            if line.startswith("c=IN IP4"):
-                                rip = line.split()[-1]
-                            if line.startswith("m=audio"):
-                                parts = line.split()
-                                rport = int(parts[1])
-                                if len(parts) > 3:
-                                    rpt = int(parts[3])
-                        logger.info(f"[SIP] Remote RTP: {rip}:{rport} PT={rpt}")
-                        return {"remote_ip": rip, "remote_port": rport, "pt": rpt}
-
-                    if code >= 400:
-                        logger.error(f"[SIP] ❌ {status}")
-                        return None
-
+                result = await self._on_invite_response(msg)
+                if result is not _PENDING:
+                    return result
             except asyncio.TimeoutError:
                 logger.error("[SIP] Timeout")
+                self.final_status = 408
                 return None
             except Exception as e:
                 logger.error(f"[SIP] Error: {e}")
                 return None
 
+    async def _on_invite_response(self, msg: SipMessage):
+        """Handle one message of the INVITE transaction: the media endpoint
+        on 200, None on failure, _PENDING while it goes on."""
+        logger.info(f"[SIP] ← {msg.start_line}")
+        code = msg.status
+        if code is None or msg.cseq_method != "INVITE":
+            return _PENDING  # e.g. the 200 to our CANCEL
+        if code < 200 and not self._provisional:
+            self._provisional = True
+            if self._cancel_wanted:
+                await self._send_cancel()
+        if code == 100:
+            return _PENDING
+        if 180 <= code <= 183:
+            self.trace.mark("ringing")
+            await self._on_provisional(msg)
+            return _PENDING
+
+        if code in (401, 407):
+            ah = "www-authenticate" if code == 401 else "proxy-authenticate"
+            challenge = msg.get(ah)
+            if not challenge or not EXOTEL_AUTH_USERNAME:
+                logger.error("[SIP] Auth required but no credentials")
+                self.final_status = code
+                await self._conn.send(self._ack_failure(msg))
+                return None
+            if self._cancel_wanted:
+                self.final_status = code  # given up: no new INVITE
+                await self._conn.send(self._ack_failure(msg))
+                return None
+            # A stale nonce is answered whenever it comes; any other
+            # challenge once — a second means the credentials are wrong
+            self._challenges += 1
+            if self._challenges > _MAX_AUTH_CHALLENGES or (
+                self._challenges > 1 and not is_stale(challenge)
+            ):
+                logger.error(f"[SIP] ❌ Credentials refused ({code})")
+                get_digest_cache().forget()
+                self.final_status = code
+                await self._conn.send(self._ack_failure(msg))
+                return None
+            await self._conn.send(self._ack_failure(msg))
+            self._cseq += 1
+            self._branch = f"z9hG4bK-{uuid.uuid4().hex}"
+            self._provisional = False  # a new transaction
+            auth = get_digest_cache().challenge(
+                "INVITE",
+                self._uri,
+                EXOTEL_AUTH_USERNAME,
+                EXOTEL_AUTH_PASSWORD,
+                challenge,
+                proxy=(code == 407),
+            )
+            await self._conn.send(self._invite(auth=auth, proxy=(code == 407)))
+            self.trace.mark("auth_challenged")
+            logger.info("[SIP] Re-INVITE with auth →")
+            return _PENDING
+
+        if code == 200:
+            self.final_status = code
+            self.trace.mark("answered")
+            self._update_dialog(msg)
+
+            await self._conn.send(self._ack())
+            logger.info("[SIP] ✅ 200 OK — ACK sent")
+
+            # The answer may have come with a reliable 183 already (RFC 3262)
+            media = _parse_sdp(msg.body_text) or self.early_media
+            if media is None:
+                media = {"remote_ip": None, "remote_port": 0, "pt": PCMA_PAYLOAD_TYPE}
+            logger.info(
+                f"[SIP] Remote RTP: {media['remote_ip']}:{media['remote_port']} PT={media['pt']}"
+            )
+            return media
+
+        if code >= 300:
+            self.final_status = code
+            await self._conn.send(self._ack_failure(msg))
+            logger.error(f"[SIP] ❌ {msg.start_line}")
+            return None
+        return _PENDING
+
+    def _update_dialog(self, msg: SipMessage):
+        """Take the To tag, remote target and route set from a 18x / 200."""
+        self._to_tag = msg.tag("to") or self._to_tag
+        contact = msg.get("contact")
+        if contact:
+            # Usually formatted like: <sip:...>
+            if "<" in contact and ">" in contact:
+                self._remote_contact_uri = contact[contact.find("<") + 1 : contact.find(">")]
+            else:
+                self._remote_contact_uri = contact
+        record_routes = msg.get_all("record-route")
+        if record_routes:
+            # Reverse order for ACK/BYE Requests
+            self._route_set = list(reversed(record_routes))
+
+    async def _on_provisional(self, msg: SipMessage):
+        """PRACK a reliable 18x, and open early media on one with SDP."""
+        rseq = msg.get("rseq", "")
+        reliable = rseq.isdigit() and any(
+            "100rel" in value.lower() for value in msg.get_all("require")
+        )
+        if reliable or msg.body:
+            self._update_dialog(msg)
+        if reliable:
+            rseq = int(rseq)
+            if self._rseq is not None and rseq <= self._rseq:
+                return  # a retransmission, already PRACKed
+            self._rseq = rseq
+            await self._conn.send(self._prack(rseq))
+            logger.info(f"[SIP] PRACK → (RSeq {rseq})")
+
+        media = _parse_sdp(msg.body_text) if msg.body else None
+        if media and media != self.early_media:
+            self.early_media = media
+            self.trace.mark("early_media")
+            logger.info(
+                f"[SIP] Early media: {media['remote_ip']}:{media['remote_port']} PT={media['pt']}"
+            )
+            if self._on_early_media:
+                self._on_early_media(media)
+
     async def wait_for_disconnection(self):
         try:
-            buf = b""
             while True:
-                data = await asyncio.wait_for(self._reader.read(4096), timeout=3600.0)
-                if not data:
+                # Messages that came in with the 200 OK are still queued
+                msg = await self._conn.recv(3600.0)
+                if msg is None:
                     logger.info("[SIP] Disconnected (TCP close)")
                     break
-
-                buf += data
-                while b"\r\n\r\n" in buf:
-                    he = buf.index(b"\r\n\r\n")
-                    hb = buf[:he].decode(errors="replace")
-                    rest = buf[he + 4 :]
-                    lines = hb.split("\r\n")
-                    start = lines[0]
-                    hdrs = {
-                        l.split(":", 1)[0].strip().lower(): l.split(":", 1)[1].strip()
-                        for l in lines[1:]
-                        if ":" in l
-                    }
-                    cl = int(hdrs.get("content-length", "0"))
-                    if len(rest) < cl:
-                        break
-                    buf = rest[cl:]
-
-                    if start.startswith("BYE "):
-                        logger.info("[SIP] ← BYE")
-                        if self._writer:
-                            self._writer.write(self._response_200_ok(hdrs))
-                            await self._writer.drain()
-                        logger.info("[SIP] → 200 OK (BYE)")
-                        return
-                    else:
-                        method = start.split()[0] if start else "Unknown"
-                        logger.info(f"[SIP] ← {method} (Ignored by outbound connection loop)")
+                if msg.method == "BYE":
+                    logger.info("[SIP] ← BYE")
+                    await self._conn.send(self._response_200_ok(msg))
+                    logger.info("[SIP] → 200 OK (BYE)")
+                    return
+                logger.info(
+                    f"[SIP] ← {msg.method or msg.status} (Ignored by outbound connection loop)"
+                )
         except Exception as e:
             logger.info(f"[SIP] Monitor ended: {e}")
 
     async def send_bye(self):
-        if self._writer:
+        if self._conn:
             try:
-                self._writer.write(self._bye())
-                await self._writer.drain()
+                await self._conn.send(self._bye())
                 logger.info("[SIP] BYE →")
             except Exception:
                 pass
 
     async def close(self):
-        if self._writer:
-            try:
-                self._writer.close()
-                await self._writer.wait_closed()
-            except Exception:
-                pass
+        if self._conn:
+            await self._conn.close()
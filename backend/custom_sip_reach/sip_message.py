@@ -0,0 +1,357 @@
+"""
+SIP message framing, parsing and rendering over TCP — shared by the outbound
+client (sip_client.py) and the inbound listener (inbound_listener.py).
+
+  • SipFramer: a streaming framer on one bytearray. Each feed() resumes the
+    search for the end of the header block where the previous one stopped,
+    and complete messages are cut from the front of the buffer, so pipelined
+    or bursty signalling costs time in proportion to the bytes received, not
+    to the size of the buffer.
+  • SipMessage: the start line is split up front. get() finds one header
+    in the raw bytes with a per-name pattern that matches any letter case,
+    so nothing is lower-cased, decoded or copied but the value itself. The
+    full header index (one linear pass) is only built for get_all() and for
+    blocks with folded lines. The framer reads Content-Length straight out
+    of its buffer the same way.
+    Every value of a repeated header is kept (Via, Record-Route, ...),
+    comma-separated lists are split, and compact forms (v, i, f, t, l, m,
+    ...) are read under their full names.
+  • render_request / render_response: message templates that fill in
+    Content-Length, and echo a request's Via / From / To / Call-ID / CSeq
+    for responses.
+
+See fuzz_sip_framer.py (corpus in sip_corpus/) and bench_sip_framer.py.
+"""
+
+import re
+
+# RFC 3261 §7.3.3 compact header forms
+_COMPACT = {
+    "v": "via",
+    "i": "call-id",
+    "f": "from",
+    "t": "to",
+    "l": "content-length",
+    "m": "contact",
+    "c": "content-type",
+    "e": "content-encoding",
+    "k": "supported",
+    "s": "subject",
+    "o": "event",
+    "r": "refer-to",
+    "u": "allow-events",
+}
+# Headers whose comma-separated values are separate entries
+_LIST_HEADERS = {"via", "route", "record-route"}
+
+# Greedy groups keep the match linear; blanks before the colon and after the
+# value are stripped by the caller
+_HEADER_LINE = re.compile(r"^([^:\r\n]+):[ \t]*([^\r\n]*)\r?$", re.M)
+_FOLD = re.compile(r"\r\n[ \t]+")
+_CRLF_RUN = re.compile(rb"[\r\n]*")
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def _ends_line(data: bytes | bytearray, end: int, stop: int) -> bool:
+    """Whether the header value ending at ``end`` runs to CRLF (or ``stop``)
+    rather than to a stray CR or LF, which only the full parse handles."""
+    return end == stop or data[end : end + 2] == b"\r\n"
+
+# Header name as passed to get() → (full lower-case name, regex for its first
+# line in any case and in full or compact form, whether it is a list header).
+# Lines start after a LF, bare or not, as they do for _HEADER_LINE.
+_LOOKUPS: dict[str, tuple[str, re.Pattern, bool]] = {}
+
+
+def _caseless(name: str) -> bytes:
+    """Regex for ``name`` in any letter case. Character classes beat both
+    re.IGNORECASE and lower-casing every header block first."""
+    return "".join(
+        f"[{ch.upper()}{ch.lower()}]" if ch.isalpha() else re.escape(ch) for ch in name
+    ).encode()
+
+
+def _lookup(name: str) -> tuple[str, re.Pattern, bool]:
+    entry = _LOOKUPS.get(name)
+    if entry is None:
+        full = name.lower()
+        full = _COMPACT.get(full, full)
+        forms = [full] + [short for short, f in _COMPACT.items() if f == full]
+        pattern = re.compile(
+            rb"\n(?:"
+            + b"|".join(_caseless(f) for f in forms)
+            + rb")[ \t]*:[ \t]*([^\r\n]*)"
+        )
+        entry = _LOOKUPS[name] = (full, pattern, full in _LIST_HEADERS)
+    return entry
+
+
+_CONTENT_LENGTH = _lookup("content-length")[1]
+
+
+class SipFramingError(ValueError):
+    """The stream is not SIP (or is hostile); drop the connection."""
+
+
+def _split_list(value: str) -> list[str]:
+    """Split a header value on commas outside quotes and <...>."""
+    if "," not in value:
+        return [value]
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(value):
+        if ch == '"' and (i == 0 or value[i - 1] != "\\"):
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "<":
+            depth += 1
+        elif ch == ">":
+            depth = max(0, depth - 1)
+        elif ch == "," and depth == 0:
+            parts.append(value[start:i].strip())
+            start = i + 1
+    parts.append(value[start:].strip())
+    return [p for p in parts if p]
+
+
+class SipMessage:
+    """One framed message. ``get(name)`` makes it usable wherever a plain
+    header dict used to be passed."""
+
+    __slots__ = ("start_line", "method", "status", "body", "_raw", "_index", "_lines")
+
+    def __init__(self, header_block: bytes, body: bytes = b""):
+        self._raw = header_block
+        self._index: dict[str, list[str]] | None = None
+        self.body = body
+        line_end = header_block.find(b"\r\n")
+        self._lines = line_end + 1  # header lines: from the LF after the start line
+        first = header_block if line_end < 0 else header_block[:line_end]
+        self.start_line = first.decode("utf-8", errors="replace")
+        parts = self.start_line.split(" ", 2)
+        self.method: str | None = None
+        self.status: int | None = None
+        if parts[0].startswith("SIP/"):
+            try:
+                self.status = int(parts[1])
+            except (IndexError, ValueError):
+                raise SipFramingError(f"bad status line: {self.start_line!r}") from None
+        elif len(parts) == 3 and parts[2].startswith("SIP/"):
+            self.method = parts[0].upper()
+        else:
+            raise SipFramingError(f"bad start line: {self.start_line!r}")
+        if b"\r\n " in header_block or b"\r\n\t" in header_block:
+            # Obsolete line folding: only the full parse joins the lines
+            self._headers()
+
+    # ── Headers ──────────────────────────────────────────────────────────
+
+    def _headers(self) -> dict[str, list[str]]:
+        """name → raw values, in order. Built on first use."""
+        if self._index is None:
+            text = self._raw.decode("utf-8", errors="replace")
+            if "\r\n " in text or "\r\n\t" in text:
+                # Obsolete line folding: a continuation joins the line above
+                text = _FOLD.sub(" ", text)
+            index: dict[str, list[str]] = {}
+            for name, value in _HEADER_LINE.findall(text, text.find("\r\n") + 2):
+                name = name.rstrip(" \t").lower()
+                name = _COMPACT.get(name, name)
+                value = value.rstrip(" \t")
+                values = index.get(name)
+                if values is None:
+                    index[name] = [value]
+                else:
+                    values.append(value)
+            self._index = index
+        return self._index
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        """First value of header ``name`` (case-insensitive)."""
+        full, pattern, is_list = _LOOKUPS.get(name) or _lookup(name)
+        if self._index is None:
+            # A single lookup doesn't need the whole index
+            raw = self._raw
+            m = pattern.search(raw, self._lines)
+            if m is None:
+                return default
+            if not _ends_line(raw, m.end(1), len(raw)):
+                # Broken line: the index decides what it holds
+                values = self._headers().get(full)
+                if not values:
+                    return default
+                value = values[0]
+            else:
+                value = m.group(1).rstrip(b" \t").decode("utf-8", errors="replace")
+        else:
+            values = self._index.get(full)
+            if not values:
+                return default
+            value = values[0]
+        return _split_list(value)[0] if is_list else value
+
+    def get_all(self, name: str) -> list[str]:
+        """Every value of header ``name``, in message order; Via, Route and
+        Record-Route lines holding several comma-separated entries count
+        once per entry."""
+        full, _, is_list = _LOOKUPS.get(name) or _lookup(name)
+        values = self._headers().get(full, ())
+        if is_list:
+            return [v for value in values for v in _split_list(value)]
+        return list(values)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __getitem__(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    # ── Convenience ──────────────────────────────────────────────────────
+
+    @property
+    def is_request(self) -> bool:
+        return self.method is not None
+
+    @property
+    def call_id(self) -> str | None:
+        return self.get("call-id")
+
+    @property
+    def cseq_method(self) -> str | None:
+        cseq = self.get("cseq")
+        return cseq.split()[-1].upper() if cseq else None
+
+    @property
+    def body_text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    @property
+    def header_block(self) -> bytes:
+        return self._raw
+
+    def tag(self, header: str) -> str | None:
+        """The tag= parameter of From / To."""
+        value = self.get(header) or ""
+        m = re.search(r";\s*tag=([^;>\s]+)", value)
+        return m.group(1) if m else None
+
+    def __repr__(self) -> str:
+        return f"<SipMessage {self.start_line!r}>"
+
+
+class SipFramer:
+    """Cuts SIP messages out of a TCP byte stream."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._scan = 0  # where the header-end search resumes
+        self._head: SipMessage | None = None  # headers in, body still due
+        self._body_len = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def feed(self, data: bytes) -> list[SipMessage]:
+        """Add received bytes; return every message now complete."""
+        buf = self._buf
+        buf += data
+        messages = []
+        # Messages are cut at ``pos`` and the consumed front is dropped once
+        # per feed, not twice per message
+        pos = 0
+        try:
+            while True:
+                head = self._head
+                if head is None:
+                    if buf[pos : pos + 1] in (b"\r", b"\n"):
+                        # Keep-alive CRLFs (RFC 5626) between messages carry nothing
+                        pos = self._scan = _CRLF_RUN.match(buf, pos).end()
+                    end = buf.find(b"\r\n\r\n", max(pos, self._scan - 3))
+                    if end < 0:
+                        self._scan = len(buf)
+                        if len(buf) - pos > MAX_HEADER_BYTES:
+                            raise SipFramingError("header block too large")
+                        return messages
+                    head = SipMessage(bytes(buf[pos:end]))
+                    self._body_len = self._content_length(head, pos, end)
+                    pos = end + 4
+                    self._head = head
+                body_end = pos + self._body_len
+                if len(buf) < body_end:
+                    self._scan = pos
+                    return messages
+                head.body = bytes(buf[pos:body_end])
+                self._head = None
+                pos = self._scan = body_end
+                messages.append(head)
+        finally:
+            del buf[:pos]  # cheap: bytearray drops its front in place
+            self._scan -= pos
+
+    def _content_length(self, head: SipMessage, start: int, end: int) -> int:
+        """Content-Length of the header block at buf[start:end], read from
+        the buffer directly unless the header block had to be parsed."""
+        buf = self._buf
+        m = None
+        if head._index is None:
+            m = _CONTENT_LENGTH.search(buf, start + head._lines, end)
+        if m is not None and _ends_line(buf, m.end(1), end):
+            length = m.group(1).rstrip(b" \t") or b"0"
+        else:
+            length = (head.get("content-length") or "0").encode()  # TCP: absent means 0
+        if not length.isdigit():
+            raise SipFramingError(f"bad Content-Length: {length.decode(errors='replace')!r}")
+        if int(length) > MAX_BODY_BYTES:
+            raise SipFramingError(f"body too large ({int(length)} B)")
+        return int(length)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Rendering
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def render_request(
+    method: str, uri: str, headers: list[str], body: str | bytes = b""
+) -> bytes:
+    """``headers`` are "Name: value" lines, without Content-Length."""
+    return _render(f"{method} {uri} SIP/2.0", headers, body)
+
+
+def render_response(
+    request,
+    status: str,
+    via_headers: list[str] | None = None,
+    extra: list[str] | None = None,
+    body: str | bytes = b"",
+    to: str | None = None,
+) -> bytes:
+    """Response to ``request`` (a SipMessage, or anything with .get()),
+    echoing its Via (every one, unless ``via_headers`` is given), From, To
+    (``to`` overrides, e.g. to add a tag), Call-ID and CSeq."""
+    h = []
+    if via_headers is None:
+        if isinstance(request, SipMessage):
+            via_headers = request.get_all("via")
+        else:
+            via = request.get("via")
+            via_headers = [via] if via else []
+    h.extend(f"Via: {via}" for via in via_headers)
+    for name, header in (("From", "from"), ("To", "to"), ("Call-ID", "call-id"), ("CSeq", "cseq")):
+        value = to if header == "to" and to else request.get(header)
+        if value:
+            h.append(f"{name}: {value}")
+    h.extend(extra or [])
+    return _render(f"SIP/2.0 {status}", h, body)
+
+
+def _render(start_line: str, headers: list[str], body: str | bytes) -> bytes:
+    if isinstance(body, str):
+        body = body.encode()
+    head = "\r\n".join((start_line, *headers, f"Content-Length: {len(body)}"))
+    return head.encode() + b"\r\n\r\n" + body
@@ -0,0 +1,457 @@
+"""
+SIP trunk connections to the Exotel proxy.
+
+Outbound calls used to open a TCP connection each. With SIP_TRUNK_CONNECTIONS
+> 0 they share a few persistent ones instead:
+
+  • SipTrunk keeps up to SIP_TRUNK_CONNECTIONS connections open (opened when
+    the bridge runtime starts, re-opened when they drop), with RFC 5626
+    double-CRLF keep-alives every SIP_TRUNK_KEEPALIVE_SECONDS.
+  • Each call gets a TrunkDialog on the least-loaded connection. Responses
+    are routed to it by the branch of their top Via (the transaction), and
+    anything else by Call-ID, with the To tag checked against ours for
+    requests (the dialog).
+  • BYEs and OPTIONS for dialogs nobody here owns are answered as the
+    inbound listener would; other stray requests get 481.
+
+A dropped connection fails dialogs whose INVITE has no final response yet
+(the responses would have come back on it); established dialogs move to
+another connection for their BYE.
+
+DirectConnection is the per-call connection, used when the trunk is off.
+Both have the same send / recv / close interface, so ExotelSipClient does
+not care which it has.
+"""
+
+import asyncio
+import logging
+import re
+import socket
+import time
+
+from .config import (
+    EXOTEL_SIP_HOST,
+    EXOTEL_SIP_PORT,
+    SIP_TRUNK_CONNECTIONS,
+    SIP_TRUNK_KEEPALIVE_SECONDS,
+)
+from .sip_message import SipFramer, SipFramingError, SipMessage, render_response
+
+logger = logging.getLogger("sip_bridge_v3")
+
+_CONNECT_TIMEOUT_SECONDS = 10.0
+# Pause before re-opening a trunk connection that could not be opened
+_RECONNECT_BACKOFF_SECONDS = 2.0
+
+# The proxy's address is looked up once per _DNS_TTL_SECONDS, not per call
+_DNS_TTL_SECONDS = 300.0
+_dns_cache: dict[tuple[str, int], tuple[str, float]] = {}
+
+_BRANCH = re.compile(r";\s*branch=([^;,\s]+)", re.I)
+_OUR_BRANCH = re.compile(rb"\r\nVia:[^\r]*?;branch=([^;,\s]+)", re.I)
+
+
+async def _resolve(host: str, port: int) -> str:
+    cached = _dns_cache.get((host, port))
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    addr = infos[0][4][0]
+    _dns_cache[(host, port)] = (addr, now + _DNS_TTL_SECONDS)
+    return addr
+
+
+async def _open_proxy_connection():
+    async def _open():
+        addr = await _resolve(EXOTEL_SIP_HOST, EXOTEL_SIP_PORT)
+        return await asyncio.open_connection(addr, EXOTEL_SIP_PORT)
+
+    return await asyncio.wait_for(_open(), timeout=_CONNECT_TIMEOUT_SECONDS)
+
+
+def _branch_of(via: str | None) -> str | None:
+    m = _BRANCH.search(via or "")
+    return m.group(1) if m else None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# One connection per call
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class DirectConnection:
+    """A call's own TCP connection to the proxy."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._framer = SipFramer()
+        self._inbox: list[SipMessage] = []  # framed, not yet handed out
+
+    @classmethod
+    async def open(cls) -> "DirectConnection":
+        return cls(*await _open_proxy_connection())
+
+    async def send(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def recv(self, timeout: float) -> SipMessage | None:
+        """Next message; None once the connection is closed."""
+        while not self._inbox:
+            data = await asyncio.wait_for(self._reader.read(8192), timeout=timeout)
+            if not data:
+                return None
+            self._inbox.extend(self._framer.feed(data))
+        return self._inbox.pop(0)
+
+    async def close(self):
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared trunk
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class TrunkDialog:
+    """One call's share of the trunk: what it sends goes out on its
+    connection, what is routed to it waits in its inbox."""
+
+    def __init__(self, trunk: "SipTrunk", call_id: str, local_tag: str):
+        self.call_id = call_id
+        self.local_tag = local_tag
+        self.conn: "_TrunkConnection | None" = None
+        self.confirmed = False  # final response to the INVITE seen
+        self.branches: set[str] = set()
+        self._trunk = trunk
+        self._inbox: asyncio.Queue[SipMessage | None] = asyncio.Queue()
+        self._lost = False
+
+    async def send(self, data: bytes):
+        if not data.startswith(b"SIP/"):
+            # A request: its responses come back under the top Via branch
+            m = _OUR_BRANCH.search(data)
+            if m:
+                branch = m.group(1).decode()
+                self.branches.add(branch)
+                self._trunk._transactions[branch] = self
+        if self.conn is None or self.conn.closed:
+            self._trunk._rebind(self, await self._trunk._pick())
+        await self.conn.send(data)
+
+    async def recv(self, timeout: float) -> SipMessage | None:
+        """Next message for this dialog; None if its connection was lost
+        before the INVITE completed."""
+        if self._lost:
+            return None
+        msg = await asyncio.wait_for(self._inbox.get(), timeout=timeout)
+        if msg is None:
+            self._lost = True
+        return msg
+
+    def _deliver(self, msg: SipMessage | None):
+        if msg is not None and msg.status and msg.status >= 200 and msg.cseq_method == "INVITE":
+            self.confirmed = True
+        self._inbox.put_nowait(msg)
+
+    async def close(self):
+        self._trunk._release(self)
+
+
+class _TrunkConnection:
+    def __init__(self, trunk: "SipTrunk", index: int, reader, writer):
+        self.index = index
+        self.dialogs: set[TrunkDialog] = set()
+        self.closed = False
+        self._trunk = trunk
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = asyncio.Lock()
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._keepalive_loop()),
+        ]
+
+    async def send(self, data: bytes):
+        if self.closed:
+            raise ConnectionError("SIP trunk connection closed")
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def _read_loop(self):
+        framer = SipFramer()
+        why = "closed by peer"
+        try:
+            while True:
+                data = await self._reader.read(8192)
+                if not data:
+                    break
+                for msg in framer.feed(data):
+                    await self._trunk._dispatch(self, msg)
+        except SipFramingError as e:
+            why = f"bad SIP: {e}"
+        except Exception as e:
+            why = str(e) or type(e).__name__
+        if not self.closed:
+            logger.warning(f"[TRUNK] Connection {self.index} lost ({why})")
+            self._trunk._on_lost(self)
+
+    async def _keepalive_loop(self):
+        try:
+            while not self.closed:
+                await asyncio.sleep(SIP_TRUNK_KEEPALIVE_SECONDS)
+                await self.send(b"\r\n\r\n")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"[TRUNK] Keep-alive on connection {self.index} failed: {e}")
+            self._writer.close()  # the read loop notices and reports the loss
+
+    async def close(self):
+        self.closed = True
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+
+
+class SipTrunk:
+    """Persistent connections to the proxy, shared by every outbound call
+    in this process."""
+
+    def __init__(self, size: int = SIP_TRUNK_CONNECTIONS):
+        self.size = max(1, size)
+        self._conns: list[_TrunkConnection] = []
+        self._dialogs: dict[str, TrunkDialog] = {}
+        self._transactions: dict[str, TrunkDialog] = {}
+        self._lock = asyncio.Lock()
+        self._failed_at = 0.0
+        self._next_index = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.connects = 0
+        self.lost = 0
+        self.routed = 0
+        self.unmatched = 0
+
+    def start(self):
+        """Open the connections in the background, ahead of the first call."""
+        task = asyncio.create_task(self._warm())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _warm(self):
+        self._bind_loop()
+        try:
+            async with self._lock:
+                while len(self._live()) < self.size:
+                    await self._connect()
+            logger.info(f"[TRUNK] {self.size} connection(s) to {EXOTEL_SIP_HOST}:{EXOTEL_SIP_PORT} up")
+        except Exception as e:
+            logger.warning(f"[TRUNK] Could not open connections ahead of calls: {e}")
+
+    async def open_dialog(self, call_id: str, local_tag: str) -> TrunkDialog:
+        """Register a dialog and bind it to a connection (opening one if
+        need be)."""
+        dialog = TrunkDialog(self, call_id, local_tag)
+        self._dialogs[call_id] = dialog
+        try:
+            self._rebind(dialog, await self._pick())
+        except BaseException:
+            self._dialogs.pop(call_id, None)
+            raise
+        return dialog
+
+    # ── Connections ─────────────────────────────────────────────────────
+
+    def _live(self) -> list[_TrunkConnection]:
+        return [c for c in self._conns if not c.closed]
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections belong to the loop they were opened on
+            self._conns, self._loop = [], loop
+
+    async def _pick(self) -> _TrunkConnection:
+        self._bind_loop()
+        live = self._live()
+        # Open another connection while every open one already carries calls
+        if len(live) < self.size and all(c.dialogs for c in live):
+            async with self._lock:
+                live = self._live()
+                if len(live) < self.size and all(c.dialogs for c in live):
+                    try:
+                        return await self._connect()
+                    except Exception as e:
+                        if not live:
+                            raise
+                        logger.warning(f"[TRUNK] Extra connection failed: {e}")
+        if not live:
+            raise ConnectionError("no SIP trunk connection")
+        return min(live, key=lambda c: len(c.dialogs))
+
+    async def _connect(self) -> _TrunkConnection:
+        wait = self._failed_at + _RECONNECT_BACKOFF_SECONDS - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            reader, writer = await _open_proxy_connection()
+        except Exception:
+            self._failed_at = time.monotonic()
+            raise
+        self._next_index += 1
+        conn = _TrunkConnection(self, self._next_index, reader, writer)
+        self._conns = self._live() + [conn]
+        self.connects += 1
+        logger.info(f"[TRUNK] Connection {conn.index} open ({len(self._conns)}/{self.size})")
+        return conn
+
+    def _rebind(self, dialog: TrunkDialog, conn: _TrunkConnection):
+        if dialog.conn is not None:
+            dialog.conn.dialogs.discard(dialog)
+        dialog.conn = conn
+        conn.dialogs.add(dialog)
+
+    def _on_lost(self, conn: _TrunkConnection):
+        self.lost += 1
+        conn.closed = True
+        self._conns = self._live()
+        for dialog in list(conn.dialogs):
+            if dialog.confirmed:
+                dialog.conn = None  # picks a live connection on its next send
+            else:
+                dialog._deliver(None)
+        conn.dialogs.clear()
+        self._spawn(conn.close())
+        self._spawn(self._warm())
+
+    def _release(self, dialog: TrunkDialog):
+        self._dialogs.pop(dialog.call_id, None)
+        for branch in dialog.branches:
+            self._transactions.pop(branch, None)
+        if dialog.conn is not None:
+            dialog.conn.dialogs.discard(dialog)
+            dialog.conn = None
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ── Routing ─────────────────────────────────────────────────────────
+
+    async def _dispatch(self, conn: _TrunkConnection, msg: SipMessage):
+        if msg.status is not None:
+            # Transaction first, then dialog (e.g. a retransmitted 200 OK)
+            dialog = self._transactions.get(_branch_of(msg.get("via")))
+            if dialog is None:
+                dialog = self._dialogs.get(msg.call_id)
+            if dialog is not None:
+                self.routed += 1
+                dialog._deliver(msg)
+            else:
+                self.unmatched += 1
+                logger.info(f"[TRUNK] ← {msg.start_line} for no call here (call-id={msg.call_id})")
+            return
+
+        dialog = self._dialogs.get(msg.call_id)
+        to_tag = msg.tag("to")
+        if dialog is not None and to_tag in (None, dialog.local_tag):
+            self.routed += 1
+            dialog._deliver(msg)
+            return
+        self.unmatched += 1
+        if msg.method == "ACK":
+            return
+        if msg.method == "BYE":
+            # The call may live in another process — as on the listener
+            from .inbound_listener import deliver_bye
+
+            logger.info(f"[TRUNK] ← BYE for call-id={msg.call_id}")
+            deliver_bye(msg.call_id)
+            status = "200 OK"
+        elif msg.method == "OPTIONS":
+            status = "200 OK"
+        else:
+            logger.info(f"[TRUNK] ← {msg.method} for no dialog here (call-id={msg.call_id})")
+            status = "481 Call/Transaction Does Not Exist"
+        try:
+            await conn.send(render_response(msg, status))
+        except Exception:
+            pass
+
+    # ── Lifecycle ───────────────────────────────────────────────────────
+
+    async def aclose(self):
+        for task in list(self._tasks):
+            task.cancel()
+        conns, self._conns = self._conns, []
+        for conn in conns:
+            await conn.close()
+        for dialog in list(self._dialogs.values()):
+            dialog._deliver(None)
+        self._dialogs.clear()
+        self._transactions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "connections": [
+                {"index": c.index, "dialogs": len(c.dialogs)} for c in self._live()
+            ],
+            "dialogs": len(self._dialogs),
+            "connects": self.connects,
+            "lost": self.lost,
+            "routed": self.routed,
+            "unmatched": self.unmatched,
+        }
+
+
+_trunk: SipTrunk | None = None
+
+
+def trunk_enabled() -> bool:
+    return SIP_TRUNK_CONNECTIONS > 0
+
+
+def get_sip_trunk() -> SipTrunk:
+    global _trunk
+    if _trunk is None:
+        _trunk = SipTrunk()
+    return _trunk
+
+
+def start_sip_trunk():
+    """Open the trunk connections now, if the trunk is on."""
+    if trunk_enabled():
+        get_sip_trunk().start()
+
+
+async def close_sip_trunk():
+    global _trunk
+    if _trunk is not None:
+        await _trunk.aclose()
+        _trunk = None
+
+
+async def open_sip_channel(call_id: str, local_tag: str):
+    """The connection a new outbound call signals on: its dialog on the
+    trunk, or a connection of its own when the trunk is off."""
+    if trunk_enabled():
+        return await get_sip_trunk().open_dialog(call_id, local_tag)
+    return await DirectConnection.open()
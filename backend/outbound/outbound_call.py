@@ -1,5 +1,6 @@
 import os
 import logging
+import time
 import uuid
 from typing import Literal
 from google.protobuf.json_format import MessageToDict
@@ -15,11 +16,11 @@ from services.lvk_services import (
     format_success_response,
     format_error_response
 )
+from services.room_pool import PHONE, get_room_pool
 import sys
 # Allow importing sip_bridge from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from custom_sip_reach import run_bridge
-import asyncio
+from custom_sip_reach import CallRejected, launch_bridge, reserve_call_slot
 
 
 class OutboundCall:
@@ -32,12 +33,21 @@ class OutboundCall:
     
 
     # Create dispatch and add a SIP participant to call the phone number   
+    # With wait=True (Exotel bridge only) returns once the call has ended,
+    # with its outcome (SIP code, answered, reason, stage trace) under data["result"]
     async def make_call(self, phone_number: str, 
                         agent_type: str = "invoice", 
-                        call_from: Literal["exotel", "twilio"] = "exotel"):
+                        call_from: Literal["exotel", "twilio"] = "exotel",
+                        wait: bool = False):
+        ticket = None
+        warm = False
+        handed_over = False  # the bridge / SIP participant has the room
+        requested_at = time.time()  # start of the bridge's stage trace
         try:
-            # Ensure unique room name
-            unique_room_name = f"{agent_type}-outbound-{phone_number[-4:]}-{uuid.uuid4().hex[:6]}"
+            # Reserve bridge capacity (queueing briefly if full) before any
+            # room / dispatch is created; raises CallOverloaded / CallRejected
+            if call_from == "exotel":
+                ticket = await reserve_call_slot(f"outbound:{phone_number}")
 
             # Room metadata
             room_metadata = {
@@ -46,33 +56,41 @@ class OutboundCall:
                 "phone": phone_number,
                 "trunk": call_from
             }
-            
-            # Create room using centralized service
-            room = await create_room(
-                room_name=unique_room_name,
-                agent=agent_type,
-                empty_timeout=60,           # Close 1 min after last participant
-                max_participants=3,         # Agent + SIP participant only
-                metadata=room_metadata
-            )
-            
+
             # Metadata for dispatch and participant
             metadata = {
                 "agent": agent_type,
                 "phone": phone_number,
                 "call_type": "outbound"
             }
-            
-            self.logger.info(f"Creating dispatch for agent {agent_type} in room {unique_room_name}")
-            
-            # Create agent dispatch using centralized service
-            dispatch = await create_agent_dispatch(
-                room=unique_room_name,
-                agent_name="vyom_demos",
-                metadata=metadata
-            )
 
-            self.logger.info(f"Created dispatch: {dispatch}")
+            # A warm room already has its agent connected; otherwise create one
+            unique_room_name = get_room_pool().take(agent_type, PHONE, room_metadata)
+            warm = unique_room_name is not None
+            dispatch = None
+            if not warm:
+                # Ensure unique room name
+                unique_room_name = f"{agent_type}-outbound-{phone_number[-4:]}-{uuid.uuid4().hex[:6]}"
+
+                # Create room using centralized service
+                room = await create_room(
+                    room_name=unique_room_name,
+                    agent=agent_type,
+                    empty_timeout=60,           # Close 1 min after last participant
+                    max_participants=3,         # Agent + SIP participant only
+                    metadata=room_metadata
+                )
+
+                self.logger.info(f"Creating dispatch for agent {agent_type} in room {unique_room_name}")
+
+                # Create agent dispatch using centralized service
+                dispatch = await create_agent_dispatch(
+                    room=unique_room_name,
+                    agent_name="vyom_demos",
+                    metadata=metadata
+                )
+
+                self.logger.info(f"Created dispatch: {dispatch}")
             self.logger.info(f"Dialing {phone_number} to room {unique_room_name}")
 
             
@@ -84,13 +102,26 @@ class OutboundCall:
                     f"with agent {agent_type} in room {unique_room_name}"
                 )
                 
-                asyncio.create_task(
-                    run_bridge(
+                queued_seconds = round(ticket.waited, 2)
+                # The bridge owns the slot from here until the call ends
+                slot, ticket = ticket, None
+                try:
+                    result = await launch_bridge(
+                        ticket=slot,
+                        wait=wait,
                         phone_number=phone_number,
                         agent_type=agent_type,
                         room_name=unique_room_name,
+                        requested_at=requested_at,
                     )
-                )
+                except CallRejected:
+                    raise  # refused: the call never started
+                except Exception:
+                    # With wait the reply only comes when the call ends, so
+                    # the call may have used the room before the error
+                    handed_over = wait
+                    raise
+                handed_over = True
                 
                 return format_success_response(
                     message="SIP Bridge Initiated",
@@ -98,7 +129,9 @@ class OutboundCall:
                         "room": unique_room_name,
                         "call_to_phone_number": phone_number,
                         "agent": agent_type,
-                        "method": "custom_bridge"
+                        "method": "custom_bridge",
+                        "queued_seconds": queued_seconds,
+                        "result": result
                     }
                 )
 
@@ -115,6 +148,7 @@ class OutboundCall:
                 metadata=metadata,
                 krisp_enabled=True
             )
+            handed_over = True
 
             self.logger.info(f"SIP participant created: {sip_participant}")
             
@@ -124,19 +158,28 @@ class OutboundCall:
                 data={
                     "room": unique_room_name,
                     "participant": MessageToDict(sip_participant),
-                    "dispatch": MessageToDict(dispatch),
+                    "dispatch": MessageToDict(dispatch) if dispatch else None,
                     "trunk_id": trunk_id,
                     "call_from": call_from,
                     "call_to_phone_number": phone_number
                 }
             )
 
+        except CallRejected:
+            raise  # surfaced as HTTP 429 / 503 by the API layer
         except Exception as e:
             self.logger.error(f"Error creating SIP participant: {e}")
             return format_error_response(
                 message="Error creating SIP participant",
                 error=e
             )
+        finally:
+            # Reserved but never handed to the bridge (room / dispatch failed)
+            if ticket is not None:
+                ticket.release()
+            if warm and not handed_over:
+                # Its agent is waiting in a room nobody will join
+                get_room_pool().give_back(agent_type, PHONE, unique_room_name)
 
     # Create Outbound trunk
     async def create_outbound_trunk(self, 
@@ -10,21 +10,34 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse, JSONResponse
 from livekit.api import AccessToken, VideoGrants
 from pydantic import BaseModel
-from api_data_structure.structure import OutboundCallRequest, OutboundTrunkCreate, SIPTestRequest
+from api_data_structure.structure import OutboundCallRequest, OutboundTrunkCreate, SIPTestRequest, CampaignCreateRequest
 import asyncio
 from contextlib import asynccontextmanager
-from custom_sip_reach.inbound_listener import ensure_inbound_server
+from custom_sip_reach import (
+    CallOverloaded,
+    CallRejected,
+    service_mode,
+    start_bridge_runtime,
+    stop_bridge_runtime,
+)
 
 # Import the outbound call function
 from outbound.outbound_call import OutboundCall
+from campaign.campaign_dialer import get_campaign_dialer
+from campaign.campaign_store import PAUSED, RUNNING
+from custom_sip_reach.config import CALL_DRAIN_TIMEOUT_SECONDS
 from inbound.config_manager import set_agent_for_number, get_agent_for_number
 
 # Import centralized LiveKit services
 from services.lvk_services import (
     list_rooms,
     create_room,
-    create_agent_dispatch
+    create_agent_dispatch,
+    close_livekit_api,
+    livekit_api_stats,
+    format_success_response
 )
+from services.room_pool import WEB, get_room_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,9 +48,31 @@ load_dotenv(override=True)
 @asynccontextmanager
 async def lifespan(app):
     # Startup: your original startup logic here
+    if service_mode():
+        # SIP signalling, media and the campaign dialer live in the bridge
+        # service; this worker can be recycled without touching calls.
+        logger.info("SIP bridge runs as a separate service — not starting listener")
+        get_room_pool().start()
+        yield
+        await get_room_pool().stop()
+        await close_livekit_api()
+        return
     logger.info("Starting up Inbound SIP Listener...")
-    asyncio.create_task(ensure_inbound_server())
+    asyncio.create_task(start_bridge_runtime())
+    dialer = get_campaign_dialer(outbound_call)
+    dialer.start()
+    get_room_pool().start()
     yield
+    # Worker shutdown (deploys / restarts; server_run.py does not recycle
+    # in-process workers): 503 new calls and drain the active ones before
+    # the process exits. The dialer stops dialling; its calls end with the
+    # drain and their outcomes are recorded.
+    await asyncio.gather(
+        dialer.stop(CALL_DRAIN_TIMEOUT_SECONDS + 5),
+        stop_bridge_runtime(),
+        get_room_pool().stop(),
+    )
+    await close_livekit_api()
 
 app = FastAPI(title="LiveKit Token Server", lifespan=lifespan)
 
@@ -72,7 +107,12 @@ async def generate_room_name(agent: str) -> str:
     """
     Generate a unique room per user, namespaced by agent.
     Example: web-a1b2c3d4
+    A warm room from the pool (agent already connected) is used when ready.
     """
+    room_name = get_room_pool().take(agent, WEB)
+    if room_name:
+        return room_name
+
     room_name = f"{agent}-{uuid.uuid4().hex[:8]}"
     
     # Use centralized services
@@ -144,6 +184,19 @@ async def trigger_outbound_call(data: OutboundCallRequest):
     try:
         res = await outbound_call.make_call(data.phone_number, data.agent_type, data.call_from)
         return res
+    except CallOverloaded as e:
+        # At capacity: the client should back off and retry
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except CallRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"Failed to initiate outbound call: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -179,6 +232,73 @@ async def list_outbound_trunks():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Campaigns — bulk outbound dialling under the trunk's CPS limit
+@app.post("/api/campaigns")
+async def create_campaign(data: CampaignCreateRequest):
+    logger.info(f"Received campaign request: {data.name} ({len(data.phone_numbers)} numbers)")
+
+    if data.agent_type not in ALLOWED_AGENTS:
+        raise HTTPException(status_code=400, detail=f"Invalid agent type: {data.agent_type}. Allowed: {ALLOWED_AGENTS}")
+
+    campaign_id = get_campaign_dialer(outbound_call).create(
+        name=data.name,
+        agent_type=data.agent_type,
+        phone_numbers=data.phone_numbers,
+        cps=data.cps,
+        max_concurrent=data.max_concurrent,
+        max_attempts=data.max_attempts,
+    )
+    return format_success_response(
+        message="Campaign queued",
+        data={"campaign_id": campaign_id, "queued": len(data.phone_numbers)}
+    )
+
+
+@app.get("/api/campaigns")
+async def list_campaigns():
+    dialer = get_campaign_dialer(outbound_call)
+    campaigns = [dialer.status(c["id"]) for c in dialer.store.list_campaigns()]
+    return format_success_response(message="Campaigns", data={"campaigns": campaigns})
+
+
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    campaign = get_campaign_dialer(outbound_call).status(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail=f"Unknown campaign: {campaign_id}")
+    return format_success_response(message="Campaign progress", data=campaign)
+
+
+@app.get("/api/campaigns/{campaign_id}/results")
+async def get_campaign_results(campaign_id: str,
+                               status: Optional[str] = Query(None),
+                               limit: int = Query(100, ge=1, le=1000),
+                               offset: int = Query(0, ge=0)):
+    dialer = get_campaign_dialer(outbound_call)
+    if dialer.store.get_campaign(campaign_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown campaign: {campaign_id}")
+    results = dialer.store.results(campaign_id, status=status, limit=limit, offset=offset)
+    return format_success_response(message="Campaign results", data={"results": results})
+
+
+@app.post("/api/campaigns/{campaign_id}/{action}")
+async def control_campaign(campaign_id: str, action: str):
+    dialer = get_campaign_dialer(outbound_call)
+    if action == "pause":
+        ok = dialer.store.set_campaign_status(campaign_id, PAUSED)
+    elif action == "resume":
+        ok = dialer.store.set_campaign_status(campaign_id, RUNNING)
+        dialer.notify()
+    elif action == "cancel":
+        ok = dialer.store.cancel_campaign(campaign_id)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {action}. Allowed: pause, resume, cancel")
+    if not ok:
+        raise HTTPException(status_code=404, detail=f"Unknown or finished campaign: {campaign_id}")
+    done = {"pause": "paused", "resume": "resumed", "cancel": "cancelled"}[action]
+    return format_success_response(message=f"Campaign {done}", data=dialer.status(campaign_id))
+
+
 
 
 
@@ -205,6 +325,14 @@ async def get_inbound_agent(phone_number: str = Query(...)):
 async def health():
     return "ok"
 
+@app.get("/api/livekitStats")
+async def livekit_stats():
+    # Per-RPC latency / retries of the shared LiveKit client, and the warm room pool
+    return format_success_response(
+        message="LiveKit API stats",
+        data={"rpc": livekit_api_stats(), "room_pool": get_room_pool().stats()},
+    )
+
 # Test SIP
 from sip_test import make_exotel_call
 
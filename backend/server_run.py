@@ -1,9 +1,15 @@
 # server_run.py
 import os
 
+from dotenv import load_dotenv
+
 def main():
 
+    load_dotenv(override=True)  # same settings the worker will see
     port = os.getenv("PORT", "8000")
+    # A worker running the SIP bridge in-process drains its calls before
+    # exiting; give it the drain deadline plus a margin before gunicorn kills it.
+    graceful = int(float(os.getenv("CALL_DRAIN_TIMEOUT_SECONDS", "120"))) + 15
 
     cmd = [
         "gunicorn",
@@ -14,10 +20,19 @@ def main():
         "--bind", f"0.0.0.0:{port}",
         "--keep-alive", "20",
         "--timeout", "120",  # TTS can be slow
-        "--max-requests", "1000",  # Restart workers to prevent memory leaks
-        "--max-requests-jitter", "100",
+        "--graceful-timeout", str(graceful),
     ]
 
+    # Recycle only when calls live in the bridge service. With the bridge
+    # in-process the single worker owns every call, and its replacement only
+    # starts once the drain is over, so each recycle would take the API down
+    # for up to CALL_DRAIN_TIMEOUT_SECONDS.
+    if os.getenv("SIP_BRIDGE_SERVICE_ADDR"):
+        cmd += [
+            "--max-requests", "1000",  # Restart workers to prevent memory leaks
+            "--max-requests-jitter", "100",
+        ]
+
     # Replace current process with Gunicorn
     os.execvp(cmd[0], cmd)
 
@@ -1,14 +1,24 @@
 import os
 import json
+import time
+import random
+import asyncio
 import logging
+from collections import deque
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import aiohttp
 from livekit.api import (
     LiveKitAPI,
+    TwirpError,
     CreateRoomRequest,
     CreateAgentDispatchRequest,
     CreateSIPParticipantRequest,
-    ListRoomsRequest
+    DeleteRoomRequest,
+    ListParticipantsRequest,
+    ListRoomsRequest,
+    UpdateRoomMetadataRequest
 )
 from livekit.protocol.sip import (
     CreateSIPOutboundTrunkRequest,
@@ -19,26 +29,178 @@ from google.protobuf.json_format import MessageToDict
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Requests in flight to the LiveKit API at once, per process
+LIVEKIT_API_MAX_INFLIGHT = int(os.getenv("LIVEKIT_API_MAX_INFLIGHT", "16"))
+# Retries after a transient failure (connection error, timeout, 5xx)
+LIVEKIT_API_RETRIES = int(os.getenv("LIVEKIT_API_RETRIES", "2"))
+LIVEKIT_API_TIMEOUT_SECONDS = float(os.getenv("LIVEKIT_API_TIMEOUT_SECONDS", "10"))
+_RETRY_BASE_SECONDS = 0.2
+# Server errors worth retrying (for idempotent requests) besides any 5xx
+_RETRYABLE_CODES = {"unavailable", "deadline_exceeded"}
+
+
+class _RpcStats:
+    __slots__ = ("calls", "errors", "retries", "total_ms", "max_ms", "recent")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent: deque[float] = deque(maxlen=256)
+
+    def record(self, ms: float, ok: bool):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def summary(self) -> dict:
+        recent = sorted(self.recent)
+        pct = lambda q: round(recent[min(len(recent) - 1, int(q * len(recent)))], 1)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else None,
+            "p50_ms": pct(0.5) if recent else None,
+            "p95_ms": pct(0.95) if recent else None,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class LiveKitClientManager:
+    """
+    One LiveKitAPI client per process, shared by every helper below.
+    
+    The client's HTTP session keeps its connections alive, so a call setup
+    pays for TCP + TLS once rather than on every request. Requests in flight
+    are capped at LIVEKIT_API_MAX_INFLIGHT, transient failures are retried
+    with jittered exponential backoff, and each RPC's latency is recorded.
+    """
+
+    def __init__(self, max_inflight: int = LIVEKIT_API_MAX_INFLIGHT,
+                 retries: int = LIVEKIT_API_RETRIES):
+        self._max_inflight = max_inflight
+        self._retries = retries
+        self._api: Optional[LiveKitAPI] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats: dict[str, _RpcStats] = {}
+
+    def client(self) -> LiveKitAPI:
+        loop = asyncio.get_running_loop()
+        if self._api is None or self._loop is not loop or self._session.closed:
+            # aiohttp sessions belong to the loop they were made on (scripts
+            # using asyncio.run() more than once get a fresh one each time)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._max_inflight, keepalive_timeout=60, ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=LIVEKIT_API_TIMEOUT_SECONDS),
+            )
+            self._api = LiveKitAPI(
+                os.getenv("LIVEKIT_URL"),
+                os.getenv("LIVEKIT_API_KEY"),
+                os.getenv("LIVEKIT_API_SECRET"),
+                session=self._session,
+            )
+            self._semaphore = asyncio.Semaphore(self._max_inflight)
+            self._loop = loop
+        return self._api
+
+    @staticmethod
+    def _transient(error: Exception, idempotent: bool) -> bool:
+        if isinstance(error, TwirpError):
+            if error.code == "resource_exhausted":
+                return True  # rate limited: refused before doing anything
+            return idempotent and (error.code in _RETRYABLE_CODES or error.status >= 500)
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return True  # never reached the server
+        return idempotent and isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    async def call(self, name: str, request: Callable[[LiveKitAPI], Awaitable[T]],
+                   idempotent: bool = True) -> T:
+        """
+        Run ``request(client)`` under the in-flight cap, with retries.
+        
+        Args:
+            name: RPC name for the latency stats, e.g. "room.create_room"
+            request: Issues the request on the shared client
+            idempotent: False for requests that must not run twice (a
+                dispatch or a dial); those are only retried when the server
+                cannot have acted on them
+                
+        Returns:
+            The RPC's response
+        """
+        stats = self._stats.setdefault(name, _RpcStats())
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            api = self.client()
+            try:
+                async with self._semaphore:
+                    result = await request(api)
+                stats.record((time.perf_counter() - started) * 1000, ok=True)
+                return result
+            except Exception as e:
+                if attempt >= self._retries or not self._transient(e, idempotent):
+                    stats.record((time.perf_counter() - started) * 1000, ok=False)
+                    raise
+                delay = _RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+                attempt += 1
+                stats.retries += 1
+                logger.warning(f"LiveKit {name} failed ({e!r}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {name: s.summary() for name, s in self._stats.items()}
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._api = None
+
+
+_manager = LiveKitClientManager()
+
+
+async def livekit_rpc(name: str, request: Callable[[LiveKitAPI], Awaitable[T]],
+                      idempotent: bool = True) -> T:
+    """Run one LiveKit API request on the shared client (see LiveKitClientManager.call)."""
+    return await _manager.call(name, request, idempotent)
+
+
+def livekit_api_stats() -> dict:
+    """Per-RPC call counts, retries and latency for this process."""
+    return _manager.stats()
+
+
+async def close_livekit_api():
+    """Close the shared client's connections — call on shutdown."""
+    await _manager.aclose()
+
 
 @asynccontextmanager
 async def get_livekit_api():
     """
-    Context manager for LiveKitAPI that handles initialization and cleanup.
+    Context manager giving the process-wide LiveKitAPI client.
+    
+    The client is shared and stays open when the block exits; prefer
+    livekit_rpc(), which adds the in-flight cap, retries and stats.
     
     Usage:
         async with get_livekit_api() as lkapi:
             # Use lkapi here
             rooms = await lkapi.room.list_rooms(...)
     """
-    lkapi = LiveKitAPI(
-        os.getenv("LIVEKIT_URL"),
-        os.getenv("LIVEKIT_API_KEY"),
-        os.getenv("LIVEKIT_API_SECRET"),
-    )
-    try:
-        yield lkapi
-    finally:
-        await lkapi.aclose()
+    yield _manager.client()
 
 
 async def create_room(
@@ -71,17 +233,16 @@ async def create_room(
     elif "agent" not in metadata:
         metadata["agent"] = agent
     
-    async with get_livekit_api() as lkapi:
-        room = await lkapi.room.create_room(
-            CreateRoomRequest(
-                name=room_name,
-                empty_timeout=empty_timeout,
-                max_participants=max_participants,
-                metadata=json.dumps(metadata)
-            )
-        )
-        logger.info(f"Created room: {room.name} (sid: {room.sid})")
-        return room
+    request = CreateRoomRequest(
+        name=room_name,
+        empty_timeout=empty_timeout,
+        max_participants=max_participants,
+        metadata=json.dumps(metadata)
+    )
+    # Creating a room that already exists returns it, so retrying is safe
+    room = await livekit_rpc("room.create_room", lambda lkapi: lkapi.room.create_room(request))
+    logger.info(f"Created room: {room.name} (sid: {room.sid})")
+    return room
 
 
 async def list_rooms() -> list[str]:
@@ -93,11 +254,67 @@ async def list_rooms() -> list[str]:
     """
     logger.info("Fetching list of rooms")
     
-    async with get_livekit_api() as lkapi:
-        rooms = await lkapi.room.list_rooms(ListRoomsRequest())
-        room_names = [room.name for room in rooms.rooms]
-        logger.info(f"Retrieved {len(room_names)} rooms")
-        return room_names
+    rooms = await livekit_rpc(
+        "room.list_rooms", lambda lkapi: lkapi.room.list_rooms(ListRoomsRequest())
+    )
+    room_names = [room.name for room in rooms.rooms]
+    logger.info(f"Retrieved {len(room_names)} rooms")
+    return room_names
+
+
+async def delete_room(room_name: str):
+    """
+    Delete a room, disconnecting everyone in it (including its agent).
+    
+    Args:
+        room_name: Name of the room to delete
+        
+    Raises:
+        Exception: If room deletion fails
+    """
+    logger.info(f"Deleting room: {room_name}")
+    
+    await livekit_rpc(
+        "room.delete_room",
+        lambda lkapi: lkapi.room.delete_room(DeleteRoomRequest(room=room_name)),
+    )
+
+
+async def update_room_metadata(room_name: str, metadata: dict):
+    """
+    Replace the metadata of an existing room.
+    
+    Args:
+        room_name: Name of the room to update
+        metadata: Metadata dictionary to attach to the room
+        
+    Returns:
+        Updated room object from LiveKit API
+        
+    Raises:
+        Exception: If the update fails
+    """
+    request = UpdateRoomMetadataRequest(room=room_name, metadata=json.dumps(metadata))
+    return await livekit_rpc(
+        "room.update_room_metadata", lambda lkapi: lkapi.room.update_room_metadata(request)
+    )
+
+
+async def list_participants(room_name: str) -> list:
+    """
+    Get the participants currently in a room.
+    
+    Args:
+        room_name: Name of the room
+        
+    Returns:
+        List of ParticipantInfo objects
+    """
+    res = await livekit_rpc(
+        "room.list_participants",
+        lambda lkapi: lkapi.room.list_participants(ListParticipantsRequest(room=room_name)),
+    )
+    return list(res.participants)
 
 
 async def create_agent_dispatch(
@@ -124,16 +341,19 @@ async def create_agent_dispatch(
     if metadata is None:
         metadata = {}
     
-    async with get_livekit_api() as lkapi:
-        dispatch = await lkapi.agent_dispatch.create_dispatch(
-            CreateAgentDispatchRequest(
-                room=room,
-                agent_name=agent_name,
-                metadata=json.dumps(metadata)
-            )
-        )
-        logger.info(f"Agent dispatched | agent={agent_name} room={room}")
-        return dispatch
+    request = CreateAgentDispatchRequest(
+        room=room,
+        agent_name=agent_name,
+        metadata=json.dumps(metadata)
+    )
+    # Not idempotent: a blind retry could start a second agent in the room
+    dispatch = await livekit_rpc(
+        "agent_dispatch.create_dispatch",
+        lambda lkapi: lkapi.agent_dispatch.create_dispatch(request),
+        idempotent=False,
+    )
+    logger.info(f"Agent dispatched | agent={agent_name} room={room}")
+    return dispatch
 
 
 async def create_sip_participant(
@@ -166,19 +386,22 @@ async def create_sip_participant(
     if metadata is None:
         metadata = {}
     
-    async with get_livekit_api() as lkapi:
-        sip_participant = await lkapi.sip.create_sip_participant(
-            CreateSIPParticipantRequest(
-                room_name=room_name,
-                sip_trunk_id=trunk_id,
-                sip_call_to=call_to,
-                participant_identity=identity,
-                participant_metadata=json.dumps(metadata),
-                krisp_enabled=krisp_enabled,
-            )
-        )
-        logger.info(f"SIP participant created for {call_to}")
-        return sip_participant
+    request = CreateSIPParticipantRequest(
+        room_name=room_name,
+        sip_trunk_id=trunk_id,
+        sip_call_to=call_to,
+        participant_identity=identity,
+        participant_metadata=json.dumps(metadata),
+        krisp_enabled=krisp_enabled,
+    )
+    # Not idempotent: a blind retry could dial the number twice
+    sip_participant = await livekit_rpc(
+        "sip.create_sip_participant",
+        lambda lkapi: lkapi.sip.create_sip_participant(request),
+        idempotent=False,
+    )
+    logger.info(f"SIP participant created for {call_to}")
+    return sip_participant
 
 
 async def create_sip_outbound_trunk(
@@ -206,20 +429,23 @@ async def create_sip_outbound_trunk(
     """
     logger.info(f"Creating SIP outbound trunk: {trunk_name}")
     
-    async with get_livekit_api() as lkapi:
-        trunk_info = SIPOutboundTrunkInfo(
-            name=trunk_name,
-            address=trunk_address,
-            numbers=trunk_numbers,
-            auth_username=trunk_auth_username,
-            auth_password=trunk_auth_password
-        )
-        
-        request = CreateSIPOutboundTrunkRequest(trunk=trunk_info)
-        trunk = await lkapi.sip.create_sip_outbound_trunk(request)
-        
-        logger.info(f"Successfully created trunk: {trunk_name}")
-        return trunk
+    trunk_info = SIPOutboundTrunkInfo(
+        name=trunk_name,
+        address=trunk_address,
+        numbers=trunk_numbers,
+        auth_username=trunk_auth_username,
+        auth_password=trunk_auth_password
+    )
+    
+    request = CreateSIPOutboundTrunkRequest(trunk=trunk_info)
+    trunk = await livekit_rpc(
+        "sip.create_sip_outbound_trunk",
+        lambda lkapi: lkapi.sip.create_sip_outbound_trunk(request),
+        idempotent=False,
+    )
+    
+    logger.info(f"Successfully created trunk: {trunk_name}")
+    return trunk
 
 
 async def list_sip_outbound_trunks():
@@ -234,13 +460,13 @@ async def list_sip_outbound_trunks():
     """
     logger.info("Listing SIP outbound trunks")
     
-    async with get_livekit_api() as lkapi:
-        trunks = await lkapi.sip.list_sip_outbound_trunk(
-            ListSIPOutboundTrunkRequest()
-        )
-        trunks_dict = MessageToDict(trunks)
-        logger.info(f"Successfully listed outbound trunks")
-        return trunks_dict
+    trunks = await livekit_rpc(
+        "sip.list_sip_outbound_trunk",
+        lambda lkapi: lkapi.sip.list_sip_outbound_trunk(ListSIPOutboundTrunkRequest()),
+    )
+    trunks_dict = MessageToDict(trunks)
+    logger.info(f"Successfully listed outbound trunks")
+    return trunks_dict
 
 
 def format_success_response(message: str, data: dict) -> dict:
@@ -0,0 +1,329 @@
+"""
+Warm room pool — rooms created ahead of time, each with its agent already
+dispatched and connected, so a call or a web session skips the create_room /
+create_agent_dispatch round trips and the agent job start-up.
+
+Pools are kept per (agent type, profile):
+  • "web"   — token-server sessions (generate_room_name)
+  • "phone" — Exotel calls, outbound and inbound; the agent is dispatched with
+              call_type "phone" so it starts with the telephony TTS profile
+
+Sizes come from ROOM_POOL_WEB / ROOM_POOL_PHONE, e.g. "web:2,invoice:1"
+(empty = no pool, every room is created on demand as before). Each process
+that takes rooms keeps its own pool. A warm agent holds an open LLM session,
+so keep the pools small; entries older than ROOM_POOL_TTL_SECONDS are deleted
+and replaced, and rooms that disappear (agent crashed) are dropped.
+
+take() never waits: with no ready room it returns None and the caller falls
+back to creating one. A caller that fails before using the room it took
+hands it back with give_back().
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+
+from livekit.api import ListRoomsRequest, ParticipantInfo
+
+from services.lvk_services import (
+    create_room,
+    create_agent_dispatch,
+    delete_room,
+    list_participants,
+    livekit_rpc,
+    update_room_metadata,
+)
+
+WEB = "web"
+PHONE = "phone"
+
+# How long a warm room may wait for a caller before it is recycled
+ROOM_POOL_TTL_SECONDS = float(os.getenv("ROOM_POOL_TTL_SECONDS", "600"))
+# Rooms whose agent has not joined within this long are abandoned
+ROOM_POOL_AGENT_JOIN_TIMEOUT = 30.0
+# Ready rooms are checked against LiveKit (and expired ones recycled) this often
+_CHECK_SECONDS = 15.0
+# Pause before refilling a pool whose last fill failed
+_FAILURE_BACKOFF_SECONDS = 10.0
+
+_PROFILE_LIMITS = {
+    # (empty_timeout, max_participants) — as for rooms created on demand
+    WEB: (60, 2),
+    PHONE: (60, 3),
+}
+
+
+def _parse_sizes(value: str) -> dict[str, int]:
+    """'web:2,invoice:1' → {'web': 2, 'invoice': 1}"""
+    sizes = {}
+    for item in value.split(","):
+        agent, _, count = item.strip().partition(":")
+        if agent:
+            sizes[agent] = int(count or 1)
+    return sizes
+
+
+class _Entry:
+    __slots__ = ("room", "ready_at")
+
+    def __init__(self, room: str):
+        self.room = room
+        self.ready_at = time.monotonic()
+
+
+class RoomPool:
+    """Keeps ``sizes[(agent, profile)]`` rooms ready, refilling in the
+    background after each take()."""
+
+    def __init__(self, sizes: dict[tuple[str, str], int],
+                 ttl: float = ROOM_POOL_TTL_SECONDS):
+        self._sizes = {k: n for k, n in sizes.items() if n > 0}
+        self._ttl = ttl
+        self._ready: dict[tuple[str, str], deque[_Entry]] = {
+            k: deque() for k in self._sizes
+        }
+        self._filling: dict[tuple[str, str], int] = dict.fromkeys(self._sizes, 0)
+        self._failed_at: dict[tuple[str, str], float] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._fills: set[asyncio.Task] = set()
+        self._warming: set[str] = set()  # rooms created, agent not yet confirmed
+        self._lent: dict[str, _Entry] = {}  # taken, until they would have expired
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.logger = logging.getLogger("room-pool")
+
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self.failures = 0
+        self.returned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._sizes)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self.logger.info(
+                "Warming rooms: "
+                + ", ".join(f"{a}/{p}={n}" for (a, p), n in self._sizes.items())
+            )
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop refilling and delete every room nobody has taken."""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+        # Half-warmed rooms are abandoned (and deleted below); deletes and
+        # metadata updates already under way are left to finish
+        for task in self._fills:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        rooms = [e.room for q in self._ready.values() for e in q] + list(self._warming)
+        self._warming.clear()
+        for q in self._ready.values():
+            q.clear()
+        if rooms:
+            self.logger.info(f"Deleting {len(rooms)} unused warm room(s)")
+            await asyncio.gather(
+                *(self._delete(room) for room in rooms), return_exceptions=True
+            )
+
+    def take(self, agent: str, profile: str, metadata: dict | None = None) -> str | None:
+        """Name of a ready room for ``agent`` with its agent connected, or
+        None if there is none. ``metadata`` (the call's room metadata) is
+        written to the room in the background."""
+        key = (agent, profile)
+        queue = self._ready.get(key)
+        if queue is None:
+            return None
+        now = time.monotonic()
+        while queue:
+            entry = queue.popleft()  # oldest first, so fewer expire unused
+            if now - entry.ready_at < self._ttl:
+                break
+            self._recycle(entry.room)
+        else:
+            self.misses += 1
+            self.logger.info(f"No warm room for {agent}/{profile} — creating one")
+            self._wake.set()
+            return None
+        self.hits += 1
+        self._lent[entry.room] = entry
+        self._wake.set()
+        if metadata:
+            self._spawn(self._set_metadata(entry.room, metadata))
+        self.logger.info(
+            f"Took warm room {entry.room} ({now - entry.ready_at:.0f}s old, "
+            f"{len(queue)} left for {agent}/{profile})"
+        )
+        return entry.room
+
+    def give_back(self, agent: str, profile: str, room: str):
+        """Return a room from take() that the caller never joined (its call
+        failed first). It goes back to the front of its queue with its
+        original age, or is deleted if it has expired or the pool is
+        stopping."""
+        entry = self._lent.pop(room, None)
+        queue = self._ready.get((agent, profile))
+        if entry is None or queue is None or self._stopping:
+            self.logger.info(f"Deleting warm room {room}, handed back unused")
+            self._spawn(self._delete(room))
+            return
+        self.returned += 1
+        queue.appendleft(entry)
+        self.logger.info(f"Warm room {room} handed back ({len(queue)} ready for {agent}/{profile})")
+
+    # ── Refill ─────────────────────────────────────────────────────────
+
+    async def _run(self):
+        last_check = 0.0
+        while not self._stopping:
+            now = time.monotonic()
+            if now - last_check >= _CHECK_SECONDS:
+                last_check = now
+                try:
+                    await self._check()
+                except Exception as e:
+                    self.logger.warning(f"Room check failed: {e}")
+            self._refill()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), _CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _refill(self):
+        now = time.monotonic()
+        for key, size in self._sizes.items():
+            if now - self._failed_at.get(key, -_FAILURE_BACKOFF_SECONDS) < _FAILURE_BACKOFF_SECONDS:
+                continue
+            for _ in range(size - len(self._ready[key]) - self._filling[key]):
+                self._filling[key] += 1
+                task = self._spawn(self._fill(key))
+                self._fills.add(task)
+                task.add_done_callback(self._fills.discard)
+
+    async def _check(self):
+        """Recycle expired rooms and drop ones LiveKit no longer has."""
+        now = time.monotonic()
+        for queue in self._ready.values():
+            while queue and now - queue[0].ready_at >= self._ttl:
+                self._recycle(queue.popleft().room)
+        for room, entry in list(self._lent.items()):
+            if now - entry.ready_at >= self._ttl:
+                del self._lent[room]  # too old to hand back now
+        entries = [(key, e) for key, q in self._ready.items() for e in q]
+        if not entries:
+            return
+        request = ListRoomsRequest(names=[e.room for _, e in entries])
+        res = await livekit_rpc("room.list_rooms", lambda lkapi: lkapi.room.list_rooms(request))
+        alive = {room.name for room in res.rooms}
+        for key, entry in entries:
+            # Still queued (not taken while we asked) but gone from LiveKit
+            if entry.room not in alive and entry in self._ready[key]:
+                self._ready[key].remove(entry)
+                self.logger.warning(f"Warm room {entry.room} closed ({key[0]}/{key[1]})")
+
+    async def _fill(self, key: tuple[str, str]):
+        agent, profile = key
+        room_name = f"{agent}-pool-{uuid.uuid4().hex[:8]}"
+        empty_timeout, max_participants = _PROFILE_LIMITS[profile]
+        self._warming.add(room_name)
+        try:
+            await create_room(
+                room_name=room_name,
+                agent=agent,
+                empty_timeout=empty_timeout,
+                max_participants=max_participants,
+                metadata={"agent": agent, "pooled": profile},
+            )
+            # call_type "phone" selects the telephony profile in agent_session
+            await create_agent_dispatch(
+                room=room_name,
+                agent_name="vyom_demos",
+                metadata={"agent": agent, "call_type": profile, "source": "room_pool"},
+            )
+            await self._wait_for_agent(room_name)
+        except Exception as e:
+            self.failures += 1
+            self._failed_at[key] = time.monotonic()
+            self.logger.error(f"Could not warm a room for {agent}/{profile}: {e}")
+            self._warming.discard(room_name)
+            self._spawn(self._delete(room_name))
+            return
+        finally:
+            self._filling[key] -= 1
+        self._warming.discard(room_name)
+        self._ready[key].append(_Entry(room_name))
+        self.logger.info(f"Warm room ready: {room_name} ({len(self._ready[key])}/{self._sizes[key]})")
+
+    async def _wait_for_agent(self, room_name: str):
+        deadline = time.monotonic() + ROOM_POOL_AGENT_JOIN_TIMEOUT
+        while time.monotonic() < deadline:
+            participants = await list_participants(room_name)
+            if any(p.kind == ParticipantInfo.Kind.AGENT for p in participants):
+                return
+            await asyncio.sleep(0.5)
+        raise TimeoutError(f"agent did not join within {ROOM_POOL_AGENT_JOIN_TIMEOUT:g}s")
+
+    # ── Helpers ────────────────────────────────────────────────────────
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _recycle(self, room: str):
+        self.recycled += 1
+        self.logger.info(f"Recycling expired warm room {room}")
+        self._spawn(self._delete(room))
+
+    async def _delete(self, room: str):
+        try:
+            await delete_room(room)
+        except Exception as e:
+            self.logger.warning(f"Could not delete warm room {room}: {e}")
+
+    async def _set_metadata(self, room: str, metadata: dict):
+        try:
+            await update_room_metadata(room, metadata)
+        except Exception as e:
+            self.logger.warning(f"Could not set metadata on {room}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pools": {
+                f"{a}/{p}": {
+                    "size": n,
+                    "ready": len(self._ready[(a, p)]),
+                    "filling": self._filling[(a, p)],
+                }
+                for (a, p), n in self._sizes.items()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+            "failures": self.failures,
+            "returned": self.returned,
+        }
+
+
+_pool: RoomPool | None = None
+
+
+def get_room_pool() -> RoomPool:
+    global _pool
+    if _pool is None:
+        sizes = {}
+        for profile, env in ((WEB, "ROOM_POOL_WEB"), (PHONE, "ROOM_POOL_PHONE")):
+            for agent, n in _parse_sizes(os.getenv(env, "")).items():
+                sizes[(agent, profile)] = n
+        _pool = RoomPool(sizes)
+    return _pool
@@ -0,0 +1,79 @@
+import hashlib
+
+from custom_sip_reach.digest_auth import DigestCredentialCache, parse_challenge
+
+USER, PASSWORD = "09999999999", "s3cret"
+URI = "sip:08000000000@exotel.example"
+
+
+def _challenge(nonce: str, realm: str = "exotel.example", stale: bool = False,
+               qop: str | None = "auth") -> str:
+    header = f'Digest realm="{realm}", nonce="{nonce}", opaque="op1", algorithm=MD5'
+    if qop:
+        header += f', qop="{qop}"'
+    return header + (", stale=TRUE" if stale else "")
+
+
+def _check(authorization: str, method: str = "INVITE") -> dict:
+    """Parameters of an Authorization value whose response is verified."""
+    p = parse_challenge(authorization)
+    ha1 = hashlib.md5(f"{USER}:{p['realm']}:{PASSWORD}".encode()).hexdigest()
+    ha2 = hashlib.md5(f"{method}:{p['uri']}".encode()).hexdigest()
+    if "qop" in p:
+        data = f"{ha1}:{p['nonce']}:{p['nc']}:{p['cnonce']}:{p['qop']}:{ha2}"
+    else:
+        data = f"{ha1}:{p['nonce']}:{ha2}"
+    assert p["response"] == hashlib.md5(data.encode()).hexdigest()
+    return p
+
+
+def test_nothing_to_send_before_a_challenge():
+    assert DigestCredentialCache().authorize("INVITE", URI, USER, PASSWORD) is None
+
+
+def test_nonce_count_goes_up_with_each_preemptive_request():
+    cache = DigestCredentialCache()
+    retry = _check(cache.challenge("INVITE", URI, USER, PASSWORD, _challenge("n1"), proxy=False))
+    assert (retry["nonce"], retry["nc"], retry["opaque"]) == ("n1", "00000001", "op1")
+
+    counts = []
+    for _ in range(3):
+        header, proxy = cache.authorize("INVITE", URI, USER, PASSWORD)
+        p = _check(header)
+        assert p["nonce"] == "n1" and not proxy
+        counts.append(p["nc"])
+    assert counts == ["00000002", "00000003", "00000004"]
+    assert cache.stats() == {
+        "realms": ["exotel.example"], "preemptive": 3, "challenges": 1, "stale": 0,
+    }
+
+
+def test_stale_challenge_moves_to_the_new_nonce():
+    cache = DigestCredentialCache()
+    cache.challenge("INVITE", URI, USER, PASSWORD, _challenge("n1"), proxy=True)
+    cache.authorize("INVITE", URI, USER, PASSWORD)
+
+    retry = _check(cache.challenge(
+        "INVITE", URI, USER, PASSWORD, _challenge("n2", stale=True), proxy=True
+    ))
+    assert (retry["nonce"], retry["nc"]) == ("n2", "00000001")
+    header, proxy = cache.authorize("INVITE", URI, USER, PASSWORD)
+    p = _check(header)
+    assert (p["nonce"], p["nc"], proxy) == ("n2", "00000002", True)
+    assert cache.stats()["challenges"] == 1
+    assert cache.stats()["stale"] == 1
+
+
+def test_latest_realm_signs_and_forget_drops_every_nonce():
+    cache = DigestCredentialCache()
+    cache.challenge("INVITE", URI, USER, PASSWORD, _challenge("n1"), proxy=False)
+    cache.challenge("INVITE", URI, USER, PASSWORD,
+                    _challenge("p1", realm="proxy.example", qop=None), proxy=True)
+    header, proxy = cache.authorize("INVITE", URI, USER, PASSWORD)
+    p = _check(header)
+    assert (p["realm"], p["nonce"], proxy) == ("proxy.example", "p1", True)
+    assert "nc" not in p  # no qop: no nonce count
+
+    cache.forget()
+    assert cache.authorize("INVITE", URI, USER, PASSWORD) is None
+    assert cache.stats()["realms"] == []
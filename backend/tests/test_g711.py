@@ -0,0 +1,61 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from custom_sip_reach.config import PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE
+from custom_sip_reach.g711 import G711Codec
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    audioop = pytest.importorskip("audioop")  # removed in Python 3.13
+
+ALL_SAMPLES = np.arange(-32768, 32768, dtype=np.int16)
+ALL_BYTES = bytes(range(256))
+
+LAWS = [
+    (PCMA_PAYLOAD_TYPE, audioop.lin2alaw, audioop.alaw2lin),
+    (PCMU_PAYLOAD_TYPE, audioop.lin2ulaw, audioop.ulaw2lin),
+]
+
+
+@pytest.mark.parametrize("pt, lin2law, _", LAWS)
+def test_encode_matches_audioop_for_every_sample(pt, lin2law, _):
+    codec = G711Codec(pt)
+    assert codec.encode(ALL_SAMPLES).tobytes() == lin2law(ALL_SAMPLES.tobytes(), 2)
+
+
+@pytest.mark.parametrize("pt, _, law2lin", LAWS)
+def test_decode_matches_audioop_for_every_byte(pt, _, law2lin):
+    codec = G711Codec(pt)
+    assert codec.decode(ALL_BYTES).tobytes() == law2lin(ALL_BYTES, 2)
+
+
+@pytest.mark.parametrize("pt, _, law2lin", LAWS)
+def test_decode_gain_is_clipped(pt, _, law2lin):
+    expected = np.frombuffer(law2lin(ALL_BYTES, 2), dtype=np.int16).astype(np.float64)
+    expected = np.clip(np.rint(expected * 3.0), -32768, 32767).astype(np.int16)
+    assert np.array_equal(G711Codec(pt, gain=3.0).decode(ALL_BYTES), expected)
+
+
+@pytest.mark.parametrize("pt", [PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE])
+def test_encode_and_decode_into_out_buffers(pt):
+    codec = G711Codec(pt)
+    pcm = ALL_SAMPLES[::256]
+    encoded = np.empty(len(pcm), dtype=np.uint8)
+    codec.encode(pcm, out=encoded)
+    assert np.array_equal(encoded, codec.encode(pcm.tobytes()))
+    decoded = np.empty(len(pcm), dtype=np.int16)
+    codec.decode(encoded, out=decoded)
+    assert np.array_equal(decoded, codec.decode(encoded.tobytes()))
+
+
+@pytest.mark.parametrize("pt", [PCMA_PAYLOAD_TYPE, PCMU_PAYLOAD_TYPE])
+def test_silence_byte_decodes_to_near_zero(pt):
+    codec = G711Codec(pt)
+    assert abs(int(codec.decode(bytes([codec.silence_byte]))[0])) <= 8
+
+
+def test_unknown_payload_type_is_rejected():
+    with pytest.raises(ValueError):
+        G711Codec(101)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+rtc = pytest.importorskip("livekit.rtc")
+
+from custom_sip_reach.hangup import wait_for_hangup  # noqa: E402
+
+
+class _Room:
+    connection_state = rtc.ConnectionState.CONN_CONNECTED
+
+    def on(self, *_args):
+        pass
+
+    def off(self, *_args):
+        pass
+
+
+class _Bridge:
+    """Stands in for RTPMediaBridge: only the last-packet clock matters."""
+
+    def __init__(self):
+        self.last_rx: float | None = None
+
+    def seconds_since_rx(self) -> float | None:
+        return None if self.last_rx is None else time.time() - self.last_rx
+
+
+def _hangup(flow: tuple[float, float] | None, **timeouts) -> tuple[str, float]:
+    """Run wait_for_hangup with RTP flowing from flow[0] to flow[1] seconds
+    after answer (every 20 ms), or never; returns (reason, elapsed)."""
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        bridge = _Bridge()
+
+        def packet():
+            bridge.last_rx = time.time()
+
+        if flow is not None:
+            t = flow[0]
+            while t <= flow[1]:
+                loop.call_later(t, packet)
+                t += 0.02
+        start = loop.time()
+        reason = await wait_for_hangup(_Room(), bridge, **timeouts)
+        return reason, loop.time() - start
+
+    return asyncio.run(run())
+
+
+def test_no_rtp_after_answer():
+    reason, elapsed = _hangup(None, no_rtp_timeout=0.6, silence_timeout=0.3)
+    assert reason == "no_rtp_after_answer"
+    assert 0.55 <= elapsed < 0.9
+
+
+def test_silence_after_flow_fires_from_last_packet():
+    # Media flows briefly and stops well before the no-RTP deadline:
+    # silence must be called silence_timeout after the last packet, not
+    # after the no-RTP deadline.
+    reason, elapsed = _hangup((0.05, 0.1), no_rtp_timeout=2.0, silence_timeout=0.4)
+    assert reason == "rtp_silence_after_flow"
+    assert 0.45 <= elapsed < 0.8
+
+
+def test_silence_after_flow_starting_late():
+    # Media starts after the first silence check found none yet
+    reason, elapsed = _hangup((0.5, 0.6), no_rtp_timeout=2.0, silence_timeout=0.3)
+    assert reason == "rtp_silence_after_flow"
+    assert 0.85 <= elapsed < 1.2
+
+
+def test_steady_media_keeps_the_call_up():
+    async def run():
+        bridge = _Bridge()
+        bridge.last_rx = time.time()
+
+        async def feed():
+            while True:
+                bridge.last_rx = time.time()
+                await asyncio.sleep(0.02)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    wait_for_hangup(
+                        _Room(), bridge, no_rtp_timeout=0.2, silence_timeout=0.1
+                    ),
+                    0.6,
+                )
+        finally:
+            feeder.cancel()
+
+    asyncio.run(run())
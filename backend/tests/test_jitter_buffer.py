@@ -0,0 +1,128 @@
+import numpy as np
+
+from custom_sip_reach.jitter_buffer import JitterBuffer, PacketLossConcealer
+
+PTIME = 0.02
+SAMPLES = 160
+SSRC = 0x1234
+
+
+def _buffer(**kw) -> JitterBuffer:
+    kw.setdefault("min_delay_ms", 40)
+    kw.setdefault("max_delay_ms", 200)
+    kw.setdefault("max_latency_ms", 300)
+    return JitterBuffer(**kw)
+
+
+def _push(jb: JitterBuffer, seq: int, arrival: float | None = None, ssrc: int = SSRC):
+    t = seq * PTIME if arrival is None else arrival
+    jb.push(seq & 0xFFFF, (seq * SAMPLES) & 0xFFFFFFFF, ssrc, seq & 0xFFFF, t)
+
+
+def _drain(jb: JitterBuffer, n: int) -> list:
+    return [jb.pop() for _ in range(n)]
+
+
+def _play(jb: JitterBuffer, ticks: list[tuple[int, ...]]) -> list:
+    """Push each tick's packets (in arrival order), then pop one slot per
+    tick once the buffer is primed, as the playout loop does."""
+    out = []
+    for i, seqs in enumerate(ticks):
+        for seq in seqs:
+            _push(jb, seq, arrival=i * PTIME)
+        if jb.primed or out:
+            out.append(jb.pop())
+    return out
+
+
+def test_reorders_before_playout():
+    jb = _buffer()
+    out = _play(jb, [(1,), (0, 2), (3,), (4,), (5,), (6,), ()])
+    assert out == [0, 1, 2, 3, 4, 5]
+    assert jb.lost == 0
+
+
+def test_gap_is_reported_lost_and_played_as_none():
+    jb = _buffer()
+    out = _play(jb, [(0,), (1,), (3,), (4,), (5,), (6,), ()])
+    assert out == [0, 1, None, 3, 4, 5]
+    assert jb.lost == 1
+
+
+def test_packet_after_its_slot_is_late():
+    jb = _buffer()
+    out = _play(jb, [(0,), (1,), (3,), (4,), (2, 5)])
+    assert out == [0, 1, None, 3]
+    assert jb.late == 1
+
+
+def test_duplicate_is_counted_once():
+    jb = _buffer()
+    for seq in (0, 1, 1, 2):
+        _push(jb, seq)
+    assert jb.duplicate == 1
+    assert _drain(jb, 3) == [0, 1, 2]
+
+
+def test_sequence_wraps_around():
+    jb = _buffer()
+    seqs = [0xFFFE, 0xFFFF, 0x10000, 0x10001]
+    for i, seq in enumerate(seqs):
+        _push(jb, seq, arrival=i * PTIME)
+    assert _drain(jb, 4) == [s & 0xFFFF for s in seqs]
+    assert jb.lost == 0
+
+
+def test_latency_ceiling_discards_oldest():
+    jb = _buffer(max_delay_ms=100, max_latency_ms=100)  # 5 packets
+    for seq in range(12):
+        _push(jb, seq)
+    assert jb.depth <= jb.capacity == 5
+    assert jb.discarded == 7  # 7..11 are left
+    # pop() then trims to target depth + 2 before playing
+    assert jb.pop() == 8
+
+
+def test_new_ssrc_restarts_the_stream():
+    jb = _buffer()
+    for seq in range(3):
+        _push(jb, seq)
+    for seq in (500, 501):
+        _push(jb, seq, ssrc=0x9999)
+    assert _drain(jb, 2) == [500, 501]
+
+
+def test_depth_follows_jitter():
+    jb = _buffer()
+    for seq in range(50):
+        _push(jb, seq)  # perfectly paced
+    assert jb.target_depth == 2
+    rng = np.random.default_rng(3)
+    jittery = _buffer()
+    for seq in range(200):
+        _push(jittery, seq, arrival=seq * PTIME + rng.uniform(0, 0.06))
+    assert jittery.jitter_ms > 5
+    assert jittery.target_depth > jb.target_depth
+
+
+def test_runs_dry_then_reprimes():
+    jb = _buffer()
+    for seq in range(2):
+        _push(jb, seq)
+    assert _drain(jb, 3) == [0, 1, None]
+    assert not jb.primed
+    for seq in (2, 3):
+        _push(jb, seq)
+    assert jb.primed and jb.pop() == 2
+
+
+def test_concealer_repeats_with_decay_then_silence():
+    plc = PacketLossConcealer(max_frames=2, decay=0.5)
+    assert plc.conceal() is None  # nothing heard yet
+    frame = np.full(SAMPLES, 1000, dtype=np.int16)
+    plc.good(frame)
+    assert (plc.conceal() == 500).all()
+    assert (plc.conceal() == 250).all()
+    assert (plc.conceal() == 0).all()
+    plc.good(frame)
+    assert (plc.conceal() == 500).all()
@@ -0,0 +1,103 @@
+import asyncio
+import socket
+
+import pytest
+
+from custom_sip_reach import port_pool
+from custom_sip_reach.port_pool import PortPool, split_port_range
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(port_pool.time, "monotonic", c)
+    return c
+
+
+def _free_range(pairs: int) -> int:
+    """Start of ``pairs`` consecutive port pairs that can all be bound now."""
+    for base in range(47000, 49000, 2 * pairs):
+        if all(port_pool._pair_bindable(p) for p in range(base, base + 2 * pairs, 2)):
+            return base
+    pytest.skip("no free UDP port range")
+
+
+def _acquire(pool: PortPool) -> int:
+    return asyncio.run(pool.acquire())
+
+
+def _release(pool: PortPool, port: int):
+    asyncio.run(pool.release(port))
+
+
+def test_released_port_cools_down_before_reuse(clock):
+    pool = PortPool(30000, 30006, cooldown=15, probe=False)  # 3 pairs
+    a = _acquire(pool)
+    _release(pool, a)
+    # Other free pairs go first; the released one waits out its cooldown
+    assert {_acquire(pool), _acquire(pool)} == {30002, 30004}
+    clock.now += 14.9
+    _release(pool, 30002)
+    assert pool.stats()["quarantined"] == 2
+    clock.now += 0.2
+    assert _acquire(pool) == a
+    assert pool.early_reuse == 0
+
+
+def test_exhausted_pool_reuses_the_oldest_quarantined_port(clock):
+    pool = PortPool(30000, 30004, cooldown=15, probe=False)  # 2 pairs
+    a, b = _acquire(pool), _acquire(pool)
+    _release(pool, b)
+    clock.now += 1
+    _release(pool, a)
+    assert _acquire(pool) == b  # nearest to the end of its cooldown
+    assert pool.early_reuse == 1
+    assert _acquire(pool) == a
+    with pytest.raises(RuntimeError):
+        _acquire(pool)
+
+
+def test_release_of_unknown_port_is_ignored(clock):
+    pool = PortPool(30000, 30004, probe=False)
+    _release(pool, 30000)
+    assert pool.stats()["quarantined"] == 0
+
+
+def test_unbindable_pair_is_skipped_and_retried_later(clock):
+    base = _free_range(3)
+    blocker = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    blocker.bind(("0.0.0.0", base + 1))  # RTCP port of the first pair
+    try:
+        pool = PortPool(base, base + 6, cooldown=0, retry_after=60)
+        assert _acquire(pool) == base + 2
+        assert pool.bind_failures == 1
+        assert pool.stats()["unbindable"] == 1
+        # Still held elsewhere when its retry comes round: skipped again
+        clock.now += 61
+        assert _acquire(pool) == base + 4
+        assert pool.bind_failures == 2
+    finally:
+        blocker.close()
+    clock.now += 61
+    assert _acquire(pool) == base
+    assert pool.stats()["in_use"] == 3
+
+
+def test_split_port_range():
+    inbound, workers = split_port_range(31000, 31100, 2, inbound_pairs=5)
+    assert inbound == (31000, 31010)
+    assert workers == [(31010, 31054), (31054, 31098)]
+    # No inbound slice at all
+    inbound, workers = split_port_range(31000, 31100, 2, inbound_pairs=0)
+    assert inbound == (31000, 31000)
+    assert workers == [(31000, 31050), (31050, 31100)]
+    with pytest.raises(ValueError):
+        split_port_range(31000, 31004, 2, inbound_pairs=1)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from custom_sip_reach.resampler import PolyphaseResampler
+
+
+def _tone(freq: float, rate: int, seconds: float = 1.0, amplitude: float = 10000):
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * freq * t) * amplitude).astype(np.int16)
+
+
+def _stream(resampler: PolyphaseResampler, pcm: np.ndarray, frame: int) -> np.ndarray:
+    # process() returns a view into a reused buffer
+    return np.concatenate(
+        [resampler.process(pcm[i : i + frame]).copy() for i in range(0, len(pcm), frame)]
+    )
+
+
+def _gain_db(x: np.ndarray, y: np.ndarray) -> float:
+    return 20 * np.log10(np.std(y.astype(float)) / np.std(x.astype(float)))
+
+
+@pytest.mark.parametrize(
+    "in_rate, out_rate, frames",
+    [(8000, 48000, (80, 160, 7)), (48000, 8000, (480, 960, 13))],
+)
+def test_streaming_equals_one_shot(in_rate, out_rate, frames):
+    rng = np.random.default_rng(1)
+    pcm = (rng.standard_normal(in_rate) * 3000).astype(np.int16)
+    whole = PolyphaseResampler(in_rate, out_rate).process(pcm).copy()
+    assert len(whole) == len(pcm) * out_rate // in_rate
+    for frame in frames:
+        streamed = _stream(PolyphaseResampler(in_rate, out_rate), pcm, frame)
+        # float32 sums in a different order can round the other way: 1 LSB
+        assert np.abs(streamed.astype(np.int32) - whole).max() <= 1
+
+
+@pytest.mark.parametrize("freq", [300, 1000, 2000, 3000, 3400])
+def test_telephony_band_round_trip_is_flat(freq):
+    # 8k → 48k → 8k, as audio goes from the phone to LiveKit and back
+    pcm = _tone(freq, 8000)
+    up, down = PolyphaseResampler(8000, 48000), PolyphaseResampler(48000, 8000)
+    out = _stream(down, _stream(up, pcm, 160), 960)
+    # Skip the filters' start-up
+    assert abs(_gain_db(pcm[800:], out[800:])) <= 0.5
+
+
+def test_decimation_rejects_what_would_alias():
+    # 5 kHz at 48 kHz would fold to 3 kHz at 8 kHz
+    pcm = _tone(5000, 48000)
+    out = _stream(PolyphaseResampler(48000, 8000), pcm, 960)
+    assert _gain_db(pcm[4800:], out[800:]) < -60
+
+
+def test_reset_clears_history():
+    resampler = PolyphaseResampler(8000, 48000)
+    pcm = _tone(1000, 8000, seconds=0.02)
+    first = resampler.process(pcm).copy()
+    resampler.process(_tone(2000, 8000, seconds=0.02))
+    resampler.reset()
+    assert np.array_equal(resampler.process(pcm), first)
+
+
+def test_non_integer_ratio_is_rejected():
+    with pytest.raises(ValueError):
+        PolyphaseResampler(44100, 48000)
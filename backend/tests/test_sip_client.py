@@ -0,0 +1,95 @@
+import asyncio
+
+from custom_sip_reach.sip_client import ExotelSipClient
+from custom_sip_reach.sip_message import SipMessage
+
+
+class _Channel:
+    """Stands in for a SIP channel: records what is sent, replays responses."""
+
+    def __init__(self):
+        self.sent: list[SipMessage] = []
+        self.inbox: asyncio.Queue = asyncio.Queue()
+
+    async def send(self, data: bytes):
+        self.sent.append(SipMessage(data))
+
+    async def recv(self, timeout: float) -> SipMessage | None:
+        return await asyncio.wait_for(self.inbox.get(), timeout)
+
+    def methods(self) -> list[str]:
+        return [m.method for m in self.sent]
+
+
+def _response(client: ExotelSipClient, status: str, to_tag: str | None = None) -> SipMessage:
+    invite = client._conn.sent[0]
+    to = invite.get("to") + (f";tag={to_tag}" if to_tag else "")
+    return SipMessage(
+        f"SIP/2.0 {status}\r\n"
+        f"Via: {invite.get('via')}\r\n"
+        f"From: {invite.get('from')}\r\n"
+        f"To: {to}\r\n"
+        f"Call-ID: {client.call_id}\r\n"
+        f"CSeq: 1 INVITE\r\n"
+        "Content-Length: 0\r\n\r\n".encode()
+    )
+
+
+def _client() -> ExotelSipClient:
+    client = ExotelSipClient("08000000000", 10000)
+    client._conn = _Channel()
+    return client
+
+
+def test_failure_final_is_acked_in_the_invite_transaction():
+    async def run():
+        client = _client()
+        invite = asyncio.create_task(client.send_invite())
+        await asyncio.sleep(0)
+        client._conn.inbox.put_nowait(_response(client, "486 Busy Here", "callee1"))
+        assert await invite is None
+        return client
+
+    client = asyncio.run(run())
+    assert client.final_status == 486
+    invite, ack = client._conn.sent
+    assert ack.method == "ACK"
+    assert ack.start_line == invite.start_line.replace("INVITE", "ACK", 1)
+    assert ack.get("via") == invite.get("via")
+    assert ack.get("cseq") == "1 ACK"
+    assert ack.tag("to") == "callee1"
+
+
+def test_cancel_waits_for_the_first_provisional():
+    async def run():
+        client = _client()
+        invite = asyncio.create_task(client.send_invite())
+        await asyncio.sleep(0)
+        await client.send_cancel()
+        before = client._conn.methods()
+        client._conn.inbox.put_nowait(_response(client, "100 Trying"))
+        await asyncio.sleep(0)
+        after = client._conn.methods()
+        client._conn.inbox.put_nowait(_response(client, "487 Request Terminated", "c2"))
+        assert await invite is None
+        return client, before, after
+
+    client, before, after = asyncio.run(run())
+    assert before == ["INVITE"]
+    assert after == ["INVITE", "CANCEL"]
+    assert client._conn.methods() == ["INVITE", "CANCEL", "ACK"]
+    assert client.final_status == 487
+
+
+def test_cancel_is_dropped_when_the_invite_completes_first():
+    async def run():
+        client = _client()
+        invite = asyncio.create_task(client.send_invite())
+        await asyncio.sleep(0)
+        await client.send_cancel()
+        client._conn.inbox.put_nowait(_response(client, "503 Service Unavailable"))
+        assert await invite is None
+        return client
+
+    client = asyncio.run(run())
+    assert client._conn.methods() == ["INVITE", "ACK"]
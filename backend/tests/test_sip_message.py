@@ -0,0 +1,115 @@
+import pathlib
+
+import pytest
+
+from custom_sip_reach.sip_message import (
+    MAX_BODY_BYTES,
+    MAX_HEADER_BYTES,
+    SipFramer,
+    SipFramingError,
+    SipMessage,
+)
+
+CORPUS = pathlib.Path(__file__).parents[1] / "custom_sip_reach" / "sip_corpus"
+STREAM = b"".join(p.read_bytes() for p in sorted(CORPUS.glob("*.sip")))
+
+OPTIONS = (
+    b"OPTIONS sip:203.0.113.10:5070 SIP/2.0\r\n"
+    b"Via: SIP/2.0/TCP 198.51.100.20:5070;branch=z9hG4bK-opt\r\n"
+    b"Call-ID: options-1\r\n"
+    b"CSeq: 1 OPTIONS\r\n"
+)
+
+
+def _frame(data: bytes, size: int) -> list[SipMessage]:
+    framer, out = SipFramer(), []
+    for i in range(0, len(data), size):
+        out += framer.feed(data[i : i + size])
+    assert len(framer) == 0
+    return out
+
+
+def _snapshot(messages: list[SipMessage]) -> list[tuple]:
+    return [
+        (m.start_line, m.call_id, m.cseq_method, m.get_all("via"), m.body)
+        for m in messages
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 511, 8192])
+def test_chunked_feeds_frame_like_one_feed(size):
+    whole = _frame(STREAM, len(STREAM))
+    assert len(whole) > len(list(CORPUS.glob("*.sip")))
+    assert _snapshot(_frame(STREAM, size)) == _snapshot(whole)
+
+
+def test_keepalives_and_pipelined_messages():
+    framer = SipFramer()
+    assert framer.feed(b"\r\n\r\n") == []
+    assert len(framer) == 0
+    body = b"v=0\r\n"
+    invite = OPTIONS.replace(b"OPTIONS", b"INVITE")
+    data = (
+        invite + b"Content-Length: 5\r\n\r\n" + body
+        + b"\r\n\r\n"
+        + OPTIONS + b"\r\n"
+    )
+    # The second message is complete once its CRLFCRLF arrives
+    first = framer.feed(data[:-1])
+    assert [m.method for m in first] == ["INVITE"]
+    assert first[0].body == body
+    second = framer.feed(data[-1:])
+    assert [m.method for m in second] == ["OPTIONS"]
+    assert second[0].body == b""  # no Content-Length: empty on TCP
+
+
+def test_compact_and_folded_headers():
+    (msg,) = SipFramer().feed((CORPUS / "compact_folded.sip").read_bytes())
+    assert msg.get("Call-ID") == msg.get("i") == "4b8e-out"
+    assert msg.get("cseq") == "2 INVITE"  # continuation line joined
+    assert msg.cseq_method == "INVITE"
+    assert len(msg.body) == int(msg.get("content-length"))
+
+
+@pytest.mark.parametrize(
+    "header, via",
+    [
+        # Stray CR: the full parse drops the line
+        (b"Via: SIP/2.0/TCP 192.0.2.1\rjunk\r\n", "SIP/2.0/TCP 198.51.100.20"),
+        # Name folded off its colon: the continuation joins it
+        (b"Via\r\n : SIP/2.0/TCP 192.0.2.7\r\n", "SIP/2.0/TCP 192.0.2.7"),
+        # A bare LF starts a line too
+        (b"X-Stray: 1\nVia: SIP/2.0/TCP 192.0.2.7\r\n", "SIP/2.0/TCP 192.0.2.7"),
+    ],
+)
+def test_get_agrees_with_full_parse_on_broken_lines(header, via):
+    raw = OPTIONS.replace(b"\r\nVia", b"\r\n" + header + b"Via")
+    indexed = SipMessage(raw)
+    indexed.get_all("via")
+    for msg in (SipMessage(raw), indexed):
+        assert msg.get("via").startswith(via)
+        assert msg.get("call-id") == "options-1"
+
+
+@pytest.mark.parametrize("length", [b"", b"0", b"  12  "])
+def test_content_length_values(length):
+    body = b"x" * 12
+    data = OPTIONS + b"Content-Length: " + length + b"\r\n\r\n" + body
+    messages = SipFramer().feed(data)
+    expected = len(length.strip()) and int(length)
+    assert len(messages[0].body) == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        OPTIONS + b"Content-Length: 1e3\r\n\r\n",
+        OPTIONS + b"l: -1\r\n\r\n",
+        OPTIONS + f"Content-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode(),
+        b"HELLO\r\n\r\n",
+        OPTIONS + b"X-Pad: " + b"a" * MAX_HEADER_BYTES,
+    ],
+)
+def test_rejected_streams(data):
+    with pytest.raises(SipFramingError):
+        _frame(data, 4096)
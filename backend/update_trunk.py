@@ -2,7 +2,7 @@ import asyncio
 import json
 import os
 from dotenv import load_dotenv
-from services.lvk_services import create_sip_outbound_trunk
+from services.lvk_services import create_sip_outbound_trunk, close_livekit_api
 
 load_dotenv(override=True)
 
@@ -27,6 +27,8 @@ async def main():
         
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        await close_livekit_api()
 
 if __name__ == "__main__":
     asyncio.run(main())